@@ -0,0 +1,154 @@
+"""
+Benchmark of the piles of a player with a big deck.
+
+Compare CardContainer with a list-based pile, as CardContainer was implemented
+before (``list.pop(0)`` to draw, ``list.insert(0, ...)`` to prepend, card per card
+transfer in ``empty_to``).
+
+Run with ``python -m benchmarks.bench_cards``.
+"""
+
+import random
+import timeit
+from collections import defaultdict
+from collections.abc import Callable
+from typing import Any
+
+from dopynion.cards import Card, CardContainer, CardName
+
+
+class ListCardContainer:
+    def __init__(self) -> None:
+        self._quantities: dict[CardName, int] = defaultdict(int)
+        self._cards: list[CardName] = []
+
+    def __len__(self) -> int:
+        return len(self._cards)
+
+    def prepend(self, card_name: CardName) -> None:
+        if card_name not in Card.types:
+            raise KeyError(card_name)
+        self._cards.insert(0, card_name)
+        self._quantities[card_name] += 1
+
+    def append(self, card_name: CardName) -> None:
+        if card_name not in Card.types:
+            raise KeyError(card_name)
+        self._cards.append(card_name)
+        self._quantities[card_name] += 1
+
+    def pop(self, index: int = -1) -> CardName:
+        card_name = self._cards.pop(index)
+        self._quantities[card_name] -= 1
+        return card_name
+
+    def shuffle(self) -> None:
+        random.shuffle(self._cards)
+
+    def empty_to(self, other: "ListCardContainer") -> None:
+        while self:
+            other.append(self.pop(0))
+        self._quantities.clear()
+        self._cards.clear()
+
+
+Pile = Any  # ListCardContainer or CardContainer, duck typed
+DECK = [CardName.COPPER, CardName.ESTATE, CardName.GARDENS, CardName.WORKSHOP]
+
+
+def make_pile(container_class: type[Pile], size: int) -> Pile:
+    pile = container_class()
+    for index in range(size):
+        pile.append(DECK[index % len(DECK)])
+    return pile
+
+
+def draw_whole_deck(container_class: type[Pile], size: int) -> Callable[[], None]:
+    deck = make_pile(container_class, size)
+
+    def run() -> None:
+        while deck:
+            deck.pop(0)
+
+    return run
+
+
+def prepend_cards(container_class: type[Pile], size: int) -> Callable[[], None]:
+    deck = make_pile(container_class, size)
+
+    def run() -> None:
+        for card_name in DECK * 25:
+            deck.prepend(card_name)
+
+    return run
+
+
+def reshuffle_discard(container_class: type[Pile], size: int) -> Callable[[], None]:
+    deck = container_class()
+    discard = make_pile(container_class, size)
+
+    def run() -> None:
+        discard.empty_to(deck)
+
+    return run
+
+
+def discard_hands(container_class: type[Pile], size: int) -> Callable[[], None]:
+    discard = make_pile(container_class, size)
+    hand = container_class()
+
+    def run() -> None:
+        for _ in range(20):
+            for card_name in DECK:
+                hand.append(card_name)
+            hand.empty_to(discard)
+
+    return run
+
+
+def play_deck(container_class: type[Pile], size: int) -> Callable[[], None]:
+    deck = make_pile(container_class, size)
+    discard = container_class()
+    hand = container_class()
+
+    def run() -> None:
+        for _ in range(size // 5):
+            for _ in range(5):
+                if not deck:
+                    discard.empty_to(deck)
+                hand.append(deck.pop(0))
+            hand.empty_to(discard)
+        discard.empty_to(deck)
+
+    return run
+
+
+def measure(setup: Callable[[type[Pile], int], Callable[[], None]], size: int) -> None:
+    timings = {}
+    for container_class in (ListCardContainer, CardContainer):
+        timings[container_class] = min(
+            timeit.timeit(setup(container_class, size), number=1) for _ in range(20)
+        )
+    old, new = timings[ListCardContainer], timings[CardContainer]
+    print(
+        f"  {setup.__name__:18} {size:5} cards: "
+        f"list {old * 1e6:9.1f} us, CardContainer {new * 1e6:9.1f} us "
+        f"(x{old / new:.1f})"
+    )
+
+
+def main() -> None:
+    for size in (200, 500, 2_000):
+        print(f"pile of {size} cards")
+        for setup in (
+            draw_whole_deck,
+            prepend_cards,
+            reshuffle_discard,
+            discard_hands,
+            play_deck,
+        ):
+            measure(setup, size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark of Game.clone against copy.deepcopy of a game.
+
+A 4-player game is played with random actions and purchases up to the middle of
+a turn, then copied again and again, as a search-based bot would do to explore
+its moves.
+
+Run with ``python -m benchmarks.bench_clone``.
+"""
+
+import copy
+import random
+import timeit
+
+from dopynion.game import Game
+from dopynion.player import Player
+from dopynion.record import NullRecord
+
+
+def play_random_turns(nb_turns: int) -> Game:
+    rng = random.Random(0)  # noqa: S311
+    game = Game(NullRecord(), seed=0)
+    players = [Player(f"player {index}") for index in range(4)]
+    for player in players:
+        game.add_player(player)
+    game.start()
+    for _ in range(nb_turns):
+        for player in players:
+            player.start_turn()
+            while player.actions_left and player.hand.contains_action():
+                player.action(rng.choice(list(player.hand.action_cards)))
+            while player.purchases_left and player.hand.contains_money():
+                money = player.money + player.hand.money
+                buyables = game.supply.piles(money)
+                if not buyables:
+                    break
+                player.buy(rng.choice(buyables))
+            player.end_turn()
+    players[0].start_turn()
+    return game
+
+
+def measure(name: str, function: object, number: int) -> float:
+    timing = min(timeit.repeat(function, number=number, repeat=5)) / number  # type: ignore[arg-type]
+    print(f"  {name:16} {timing * 1e6:8.1f} us, {1 / timing:10.0f} clones/s")
+    return timing
+
+
+def main() -> None:
+    game = play_random_turns(nb_turns=10)
+    nb_cards = sum(player.possession.nb_cards for player in game.players)
+    print(f"game of 4 players, {nb_cards} cards in their piles")
+    clone = measure("Game.clone", game.clone, 2000)
+    deepcopy = measure("copy.deepcopy", lambda: copy.deepcopy(game), 50)
+    print(f"x{deepcopy / clone:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -64,3 +64,4 @@ while not game.finished:
 
 pprint(game.score())  # noqa: T203
 game.save()
+game.record.close()
@@ -4,8 +4,8 @@ import inspect
 import logging
 import random
 import sys
-from collections import defaultdict
-from typing import TYPE_CHECKING, ClassVar, Final
+from array import array
+from typing import TYPE_CHECKING, ClassVar, Final, Literal, NamedTuple, Self
 
 from dopynion.data_model import (
     CardName,
@@ -15,11 +15,14 @@ from dopynion.data_model import (
     MoneyCardsInHand,
     PossibleCards,
 )
+from dopynion.exceptions import InconsistentCardContainerError
 
 if TYPE_CHECKING:
-    from collections.abc import Callable, Iterator
+    from collections.abc import Callable, Iterable, Iterator
     from types import TracebackType
 
+    from numpy.random import Generator
+
     from dopynion.player import Player
 
 logger = logging.getLogger(__name__)
@@ -78,7 +81,10 @@ class Card(metaclass=ClassNameRepr):
 
     @staticmethod
     def class_(card_name: str) -> type[Card]:
-        return Card.types.get(CardName[card_name.upper()], Card)
+        card_id = find_card_id(card_name)
+        if card_id is None:
+            return Card.types.get(CardName[card_name.upper()], Card)
+        return card_infos[card_id].class_
 
     def __init_subclass__(cls) -> None:
         Card.types[cls.card_name()] = cls
@@ -94,10 +100,7 @@ class Card(metaclass=ClassNameRepr):
 
     @classmethod
     def action(cls, player: Player) -> None:
-        for _ in range(cls.more_cards_from_deck):
-            card_name = player.take_one_card_from_deck()
-            if card_name is not None:
-                player.hand.append(card_name)
+        player.draw(cls.more_cards_from_deck)
         player.purchases_left += cls.more_purchases
         player.actions_left += cls.more_actions
         player.money += cls.more_money
@@ -127,16 +130,18 @@ class Adventurer(Card):
 
     @classmethod
     def _action(cls, player: Player) -> None:
+        revealed_cards = CardContainer()
         nb_kept_cards = 0
         while nb_kept_cards < cls.nb_treasure_cards:
             card_name = player.take_one_card_from_deck()
             if card_name is None:
                 break
-            if Card.class_(card_name).is_treasure:
+            if card_infos_by_name[card_name].is_treasure:
                 nb_kept_cards += 1
                 player.hand.append(card_name)
             else:
-                player.discard.append(card_name)
+                revealed_cards.append(card_name)
+        revealed_cards.empty_to(player.discard)
 
 
 class Artificer(Card):
@@ -156,24 +161,21 @@ class Artificer(Card):
                 player.hooks.confirm_discard_card_from_hand,
                 CardNameAndHand(card_name=card_name, hand=list(player.hand)),
             ):
-                player.hand.remove(card_name)
-                player.discard.append(card_name)
+                player.hand.move_to(player.discard, card_name)
                 nb_discarded_cards += 1
 
-        possible_cards: list[CardName] = list({
-            card_name
-            for card_name in player.game.stock
-            if player.game.stock.quantity(card_name)
-            and Card.class_(card_name).cost == nb_discarded_cards
-        })
+        possible_cards = player.game.supply.piles(
+            nb_discarded_cards,
+            min_cost=nb_discarded_cards,
+        )
         if possible_cards:
             chosen_card_name = player.use_hook(
                 player.hooks.choose_card_to_receive_in_deck,
                 PossibleCards(possible_cards=possible_cards),
             )
-            card_name = CardName[chosen_card_name.upper()]
-            player.game.stock.remove(card_name)
-            player.deck.prepend(card_name)
+            card_id = intern_card(chosen_card_name)
+            player.game.stock.remove_id(card_id)
+            player.deck.prepend(card_names[card_id])
 
 
 class Bandit(Card):
@@ -185,25 +187,20 @@ class Bandit(Card):
     @classmethod
     def _action(cls, player: Player) -> None:
         if CardName.GOLD in player.game.stock:
-            player.game.stock.remove(CardName.GOLD)
-            player.discard.append(CardName.GOLD)
+            player.game.stock.move_to(player.discard, CardName.GOLD)
         for other_player in player.other_players():
             with ErrorManager(other_player):
-                drawn_cards = [
-                    card_name
-                    for _ in range(2)
-                    if (card_name := other_player.take_one_card_from_deck()) is not None
-                ]
+                drawn_cards = CardContainer()
+                other_player.draw(2, drawn_cards)
                 trashable_money_cards = [
                     card_name
-                    for card_name in drawn_cards
-                    if card_name in (treasure_card_name - {CardName.COPPER})
+                    for card_name in drawn_cards.money_cards.distinct()
+                    if card_name != CardName.COPPER
                 ]
-                trashable_money_cards.sort(key=lambda c: Card.class_(c).money)
+                trashable_money_cards.sort(key=lambda c: card_infos_by_name[c].money)
                 if trashable_money_cards:
                     drawn_cards.remove(trashable_money_cards[0])
-                for card_name in drawn_cards:
-                    other_player.discard.append(card_name)
+                drawn_cards.empty_to(other_player.discard)
 
 
 class Bureaucrat(Card):
@@ -221,8 +218,9 @@ class Bureaucrat(Card):
             with ErrorManager(other_player):
                 victory_cards = other_player.hand.victory_cards
                 if victory_cards:
-                    other_player.deck.prepend(victory_cards[0])
-                    other_player.hand.remove(victory_cards[0])
+                    card_name = victory_cards[0]
+                    other_player.hand.remove(card_name)
+                    other_player.deck.prepend(card_name)
 
 
 class Cellar(Card):
@@ -239,13 +237,9 @@ class Cellar(Card):
                 player.hooks.confirm_discard_card_from_hand,
                 CardNameAndHand(card_name=card_name, hand=list(player.hand)),
             ):
-                player.hand.remove(card_name)
-                player.discard.append(card_name)
+                player.hand.move_to(player.discard, card_name)
                 nb_discarded_cards += 1
-        for _ in range(nb_discarded_cards):
-            discarded_card_name = player.take_one_card_from_deck()
-            if discarded_card_name is not None:
-                player.hand.append(discarded_card_name)
+        player.draw(nb_discarded_cards)
 
 
 class Chancellor(Card):
@@ -308,9 +302,7 @@ class CouncilRoom(Card):
     def _action(cls, player: Player) -> None:
         for other_player in player.other_players():
             with ErrorManager(other_player):
-                card_name = other_player.take_one_card_from_deck()
-                if card_name is not None:
-                    other_player.hand.append(card_name)
+                other_player.draw(1)
 
 
 class Curse(Card):
@@ -332,8 +324,7 @@ class CursedGold(Card):
     @classmethod
     def _buy(cls, player: Player) -> None:
         if CardName.CURSE in player.game.stock:
-            player.game.stock.remove(CardName.CURSE)
-            player.discard.append(CardName.CURSE)
+            player.game.stock.move_to(player.discard, CardName.CURSE)
 
 
 class DistantShore(Card):
@@ -349,8 +340,7 @@ class DistantShore(Card):
     @classmethod
     def _action(cls, player: Player) -> None:
         if CardName.ESTATE in player.game.stock:
-            player.game.stock.remove(CardName.ESTATE)
-            player.discard.append(CardName.ESTATE)
+            player.game.stock.move_to(player.discard, CardName.ESTATE)
 
 
 class Duchy(Card):
@@ -387,8 +377,8 @@ class FarmingVillage(Card):
     def _action(cls, player: Player) -> None:
         drawn_cards = CardContainer()
         while (card_name := player.take_one_card_from_deck()) is not None:
-            class_ = Card.class_(card_name)
-            if class_.is_treasure or class_.is_action:
+            info = card_infos_by_name[card_name]
+            if info.is_treasure or info.is_action:
                 player.hand.append(card_name)
                 break
             drawn_cards.append(card_name)
@@ -404,20 +394,13 @@ class Feast(Card):
     @classmethod
     def _action(cls, player: Player) -> None:
         player.played_cards.pop()
-        possible_cards: list[CardName] = list({
-            card_name
-            for card_name in player.game.stock
-            if player.game.stock.quantity(card_name)
-            and Card.class_(card_name).cost <= cls.max_new_card_cost
-        })
+        possible_cards = player.game.supply.piles(cls.max_new_card_cost)
         if possible_cards:
             chosen_card_name = player.use_hook(
                 player.hooks.choose_card_to_receive_in_discard,
                 PossibleCards(possible_cards=possible_cards),
             )
-            card_name = CardName[chosen_card_name.upper()]
-            player.game.stock.remove(card_name)
-            player.discard.append(card_name)
+            player.game.stock.move_id_to(player.discard, intern_card(chosen_card_name))
 
 
 class Festival(Card):
@@ -442,7 +425,7 @@ class FortuneTeller(Card):
             with ErrorManager(other_player):
                 drawn_cards = CardContainer()
                 while (card_name := other_player.take_one_card_from_deck()) is not None:
-                    if Card.class_(card_name).is_victory:
+                    if card_infos_by_name[card_name].is_victory:
                         other_player.deck.prepend(card_name)
                         break
                     drawn_cards.append(card_name)
@@ -473,17 +456,10 @@ class Harvest(Card):
     @classmethod
     def _action(cls, player: Player) -> None:
         drawn_cards = CardContainer()
-        while (card_name := player.take_one_card_from_deck()) is not None:
-            drawn_cards.append(card_name)
-            if len(drawn_cards) == cls.nb_drawn_cards:
-                break
+        player.draw(cls.nb_drawn_cards, drawn_cards)
         nb_different_cards = len(set(drawn_cards))
         drawn_cards.empty_to(player.discard)
-        for _ in range(nb_different_cards):
-            card_name = player.take_one_card_from_deck()
-            if card_name is None:
-                break
-            player.hand.append(card_name)
+        player.draw(nb_different_cards)
 
 
 class Hireling(Card):
@@ -520,7 +496,7 @@ class Library(Card):
             card_name = player.take_one_card_from_deck()
             if card_name is None:
                 break
-            if not Card.class_(card_name).is_action:
+            if not card_infos_by_name[card_name].is_action:
                 player.hand.append(card_name)
             elif player.use_hook(
                 player.hooks.skip_card_reception_in_hand,
@@ -540,10 +516,7 @@ class Magnate(Card):
 
     @classmethod
     def _action(cls, player: Player) -> None:
-        for _ in list(player.hand.money_cards):
-            card_name = player.take_one_card_from_deck()
-            if card_name is not None:
-                player.hand.append(card_name)
+        player.draw(len(player.hand.money_cards))
 
 
 class Magpie(Card):
@@ -563,8 +536,7 @@ class Magpie(Card):
             else:
                 player.deck.prepend(card_name)
                 if CardName.MAGPIE in player.game.stock:
-                    player.game.stock.remove(CardName.MAGPIE)
-                    player.discard.append(CardName.MAGPIE)
+                    player.game.stock.move_to(player.discard, CardName.MAGPIE)
 
 
 class Market(Card):
@@ -587,17 +559,13 @@ class Marquis(Card):
 
     @classmethod
     def _action(cls, player: Player) -> None:
-        for _ in list(player.hand):
-            card_name = player.take_one_card_from_deck()
-            if card_name is not None:
-                player.hand.append(card_name)
+        player.draw(len(player.hand))
         while len(player.hand) > cls.hand_size_left:
             removed_card = player.use_hook(
                 player.hooks.discard_card_from_hand,
                 Hand(hand=list(player.hand)),
             )
-            player.hand.remove(CardName[removed_card.upper()])
-            player.discard.append(CardName[removed_card.upper()])
+            player.hand.move_id_to(player.discard, intern_card(removed_card))
 
 
 class Militia(Card):
@@ -616,8 +584,10 @@ class Militia(Card):
                         other_player.hooks.discard_card_from_hand,
                         Hand(hand=list(other_player.hand)),
                     )
-                    other_player.hand.remove(CardName[removed_card.upper()])
-                    other_player.discard.append(CardName[removed_card.upper()])
+                    other_player.hand.move_id_to(
+                        other_player.discard,
+                        intern_card(removed_card),
+                    )
 
 
 class Mine(Card):
@@ -627,26 +597,23 @@ class Mine(Card):
 
     @classmethod
     def _action(cls, player: Player) -> None:
-        money_cards: list[str] = list(set(player.hand.money_cards))
+        money_cards = player.hand.money_cards.distinct()
         if money_cards:
             trashed_card = player.use_hook(
                 player.hooks.trash_money_card_for_better_money_card,
                 MoneyCardsInHand(money_in_hand=money_cards),
             )
             if trashed_card is not None:
-                trashed_card_name = CardName[trashed_card.upper()]
-                player.hand.remove(trashed_card_name)
-                possible_money_cards = [
-                    card_name
-                    for card_name in player.game.stock
-                    if (class_ := Card.class_(card_name)).is_treasure
-                    and class_.cost <= Card.class_(trashed_card_name).cost + 3
-                    and player.game.stock.quantity(card_name)
-                ]
+                trashed_card_id = intern_card(trashed_card)
+                player.hand.remove_id(trashed_card_id)
+                possible_money_cards = player.game.supply.piles(
+                    card_infos[trashed_card_id].cost + 3,
+                    kind="treasure",
+                )
                 if possible_money_cards:
                     best_money = max(
                         possible_money_cards,
-                        key=lambda card_name: Card.class_(card_name).money,
+                        key=lambda card_name: card_infos_by_name[card_name].money,
                     )
                     player.hand.append(best_money)
 
@@ -658,7 +625,7 @@ class MoneyLender(Card):
 
     @classmethod
     def _action(cls, player: Player) -> None:
-        if player.hand.copper_qty >= 1 and player.use_hook(
+        if CardName.COPPER in player.hand and player.use_hook(
             player.hooks.confirm_trash_card_from_hand,
             CardNameAndHand(card_name=CardName.COPPER, hand=list(player.hand)),
         ):
@@ -693,8 +660,7 @@ class Poacher(Card):
                 player.hooks.discard_card_from_hand,
                 Hand(hand=list(player.hand)),
             )
-            player.hand.remove(CardName[removed_card.upper()])
-            player.discard.append(CardName[removed_card.upper()])
+            player.hand.move_id_to(player.discard, intern_card(removed_card))
 
 
 class Port(Card):
@@ -729,23 +695,16 @@ class Remake(Card):
                 player.hooks.trash_card_from_hand,
                 Hand(hand=list(player.hand)),
             )
-            trashed_card_name = CardName[trashed_card.upper()]
-            player.hand.remove(trashed_card_name)
-            possible_cards: list[CardName] = list({
-                card_name
-                for card_name in player.game.stock
-                if player.game.stock.quantity(card_name)
-                and Card.class_(card_name).cost
-                == Card.class_(trashed_card_name).cost + 1
-            })
+            trashed_card_id = intern_card(trashed_card)
+            player.hand.remove_id(trashed_card_id)
+            cost = card_infos[trashed_card_id].cost + 1
+            possible_cards = player.game.supply.piles(cost, min_cost=cost)
             if possible_cards:
                 chosen_card = player.use_hook(
                     player.hooks.choose_card_to_receive_in_discard,
                     PossibleCards(possible_cards=possible_cards),
                 )
-                chosen_card_name = CardName[chosen_card.upper()]
-                player.game.stock.remove(chosen_card_name)
-                player.discard.append(chosen_card_name)
+                player.game.stock.move_id_to(player.discard, intern_card(chosen_card))
 
 
 class Remodel(Card):
@@ -761,14 +720,11 @@ class Remodel(Card):
             player.hooks.trash_card_from_hand,
             Hand(hand=list(player.hand)),
         )
-        trashed_card_name = CardName[trashed_card.upper()]
-        player.hand.remove(trashed_card_name)
-        possible_cards: list[CardName] = list({
-            card_name
-            for card_name in player.game.stock
-            if player.game.stock.quantity(card_name)
-            and Card.class_(card_name).cost <= Card.class_(trashed_card_name).cost + 2
-        })
+        trashed_card_id = intern_card(trashed_card)
+        player.hand.remove_id(trashed_card_id)
+        possible_cards = player.game.supply.piles(
+            card_infos[trashed_card_id].cost + 2,
+        )
         if possible_cards:
             chosen_card = player.use_hook(
                 player.hooks.choose_card_to_receive_in_discard,
@@ -776,9 +732,7 @@ class Remodel(Card):
                 # dans la liste
                 PossibleCards(possible_cards=possible_cards),
             )
-            chosen_card_name = CardName[chosen_card.upper()]
-            player.game.stock.remove(chosen_card_name)
-            player.discard.append(chosen_card_name)
+            player.game.stock.move_id_to(player.discard, intern_card(chosen_card))
 
 
 class Silver(Card):
@@ -807,25 +761,24 @@ class Swap(Card):
 
     @classmethod
     def _action(cls, player: Player) -> None:
-        for trashed_card_name in list(player.hand):
-            if not Card.class_(trashed_card_name).is_action:
+        for trashed_card_name in player.hand.copy():
+            if not card_infos_by_name[trashed_card_name].is_action:
                 continue
             # TODO c'est pas vraiment un trash, il faudrait utiliser un nouveau hook
             if player.use_hook(
                 player.hooks.confirm_trash_card_from_hand,
                 CardNameAndHand(card_name=trashed_card_name, hand=list(player.hand)),
             ):
-                player.hand.remove(trashed_card_name)
-                player.game.stock.append(trashed_card_name)
+                player.hand.move_to(player.game.stock, trashed_card_name)
 
-                possible_cards: list[CardName] = list({
+                possible_cards = [
                     card_name
-                    for card_name in player.game.stock
-                    if player.game.stock.quantity(card_name)
-                    and Card.class_(card_name).cost <= cls.max_cost_swap
-                    and Card.class_(card_name).is_action
-                    and card_name != trashed_card_name
-                })
+                    for card_name in player.game.supply.piles(
+                        cls.max_cost_swap,
+                        kind="action",
+                    )
+                    if card_name != trashed_card_name
+                ]
                 if possible_cards:
                     # TODO normalement ça ne va pas en discard, mais dans la main,
                     # nouveau hook à prévoir
@@ -835,9 +788,10 @@ class Swap(Card):
                         # réponse est dans la liste
                         PossibleCards(possible_cards=possible_cards),
                     )
-                    chosen_card_name = CardName[chosen_card.upper()]
-                    player.game.stock.remove(chosen_card_name)
-                    player.discard.append(chosen_card_name)
+                    player.game.stock.move_id_to(
+                        player.discard,
+                        intern_card(chosen_card),
+                    )
 
                 break
 
@@ -860,9 +814,8 @@ class Witch(Card):
     def _action(cls, player: Player) -> None:
         for other_player in player.other_players():
             with ErrorManager(other_player):
-                if player.game.stock.curse_qty:
-                    other_player.discard.append(CardName.CURSE)
-                    player.game.stock.remove(CardName.CURSE)
+                if CardName.CURSE in player.game.stock:
+                    player.game.stock.move_to(other_player.discard, CardName.CURSE)
 
 
 class Woodcutter(Card):
@@ -881,22 +834,14 @@ class Workshop(Card):
 
     @classmethod
     def _action(cls, player: Player) -> None:
-        possible_cards: list[str] = list({
-            card_name
-            for card_name in player.game.stock
-            if player.game.stock.quantity(card_name)
-            and Card.class_(card_name).cost <= cls.max_cost_of_received_card
-        })
-        possible_cards = list(set(possible_cards))
+        possible_cards = player.game.supply.piles(cls.max_cost_of_received_card)
         logger.debug(possible_cards)
         if possible_cards:
             chosen_card = player.use_hook(
                 player.hooks.choose_card_to_receive_in_discard,
                 PossibleCards(possible_cards=possible_cards),
             )
-            chosen_card_name = CardName[chosen_card.upper()]
-            player.game.stock.remove(chosen_card_name)
-            player.discard.append(chosen_card_name)
+            player.game.stock.move_id_to(player.discard, intern_card(chosen_card))
 
 
 actions_card_name: set[CardName] = {
@@ -918,52 +863,432 @@ victory_card_name: set[CardName] = {
 }
 
 
-class CardContainer:
-    """Storage for card."""
+# implemented cards are numbered densely, in order of definition
+card_names: tuple[CardName, ...] = tuple(Card.types)
+card_ids: dict[CardName, int] = {
+    card_name: card_id for card_id, card_name in enumerate(card_names)
+}
+
+nb_card_ids: Final[int] = len(card_names)
+
+
+class CardInfo(NamedTuple):
+    """Attributes of an implemented card, read by the engine on its hot paths."""
+
+    card_id: int
+    card_name: CardName
+    class_: type[Card]
+    cost: int
+    money: int
+    victory_points: int
+    is_action: bool
+    is_kingdom: bool
+    is_treasure: bool
+    is_victory: bool
+    more_cards_from_deck: int
+    more_actions: int
+    more_purchases: int
+    more_money: int
+
+
+card_infos: tuple[CardInfo, ...] = tuple(
+    CardInfo(
+        card_id=card_id,
+        card_name=card_name,
+        class_=class_,
+        cost=class_.cost,
+        money=class_.money,
+        victory_points=class_.victory_points,
+        is_action=class_.is_action,
+        is_kingdom=class_.is_kingdom,
+        is_treasure=class_.is_treasure,
+        is_victory=class_.is_victory,
+        more_cards_from_deck=class_.more_cards_from_deck,
+        more_actions=class_.more_actions,
+        more_purchases=class_.more_purchases,
+        more_money=class_.more_money,
+    )
+    for card_id, (card_name, class_) in enumerate(Card.types.items())
+)
+card_infos_by_name: dict[CardName, CardInfo] = {
+    info.card_name: info for info in card_infos
+}
+
+# every spelling of the implemented card names, to intern them in one lookup
+_interned_ids: dict[str, int] = {}
+for card_id, card_name in enumerate(card_names):
+    for spelling in (
+        card_name.value,
+        card_name.name,
+        card_name.value.capitalize(),
+        Card.types[card_name].__name__,
+    ):
+        _interned_ids[spelling] = card_id
+
+# CardContainer attributes such as copper_qty, None for unimplemented cards
+_qty_attributes: dict[str, int | None] = {
+    f"{card_name.value}_qty": card_ids.get(card_name) for card_name in CardName
+}
+
+
+def find_card_id(card_name: str) -> int | None:
+    """
+    Find an implemented card from its name, in any case.
+
+    Returns:
+        The id of the card, None if it is unknown or not implemented.
+
+    """
+    card_id = _interned_ids.get(card_name)
+    if card_id is None:
+        card_id = _interned_ids.get(card_name.lower())
+    return card_id
+
+
+def intern_card(card_name: str) -> int:
+    """
+    Find an implemented card from its name, in any case.
+
+    Returns:
+        The id of the card.
+
+    Raises:
+        KeyError: If card_name is not an implemented card.
+
+    """
+    card_id = find_card_id(card_name)
+    if card_id is None:
+        raise KeyError(card_name)
+    return card_id
+
+
+_action_ids = tuple(sorted(card_ids[card_name] for card_name in actions_card_name))
+_treasure_ids = tuple(sorted(card_ids[card_name] for card_name in treasure_card_name))
+_victory_ids = tuple(sorted(card_ids[card_name] for card_name in victory_card_name))
+# the money and the numbers of action, treasure and victory cards of a pile are
+# packed in a single int, a field of _TOTAL_BITS bits each, so that a card is
+# accounted for with one table lookup and one addition
+_TOTAL_BITS: Final = 32
+_TOTAL_MASK: Final = (1 << _TOTAL_BITS) - 1
+_MONEY_SHIFT: Final = 0
+_ACTIONS_SHIFT: Final = _TOTAL_BITS
+_TREASURES_SHIFT: Final = 2 * _TOTAL_BITS
+_VICTORIES_SHIFT: Final = 3 * _TOTAL_BITS
+_card_totals = tuple(
+    info.money << _MONEY_SHIFT
+    | int(info.is_action) << _ACTIONS_SHIFT
+    | int(info.is_treasure) << _TREASURES_SHIFT
+    | int(info.is_victory) << _VICTORIES_SHIFT
+    for info in card_infos
+)
+_victory_points = tuple(info.victory_points for info in card_infos)
+_gardens_id = card_ids[CardName.GARDENS]
+_fairgrounds_id = card_ids[CardName.FAIRGROUNDS]
+
+
+class Possession:
+    """
+    Running totals over all the cards of a player, whatever their pile.
+
+    The piles of a player share the same Possession, and update it each time a
+    card enters or leaves them, so that the score is known without going through
+    the cards.
+    """
+
+    __slots__ = ("nb_cards", "nb_distinct_cards", "quantities", "victory_points")
+
+    def __init__(self) -> None:
+        self.quantities: list[int] = [0] * nb_card_ids
+        self.nb_cards = 0
+        self.nb_distinct_cards = 0
+        self.victory_points = 0
+
+    def add(self, card_id: int, qty: int = 1) -> None:
+        """Account for qty cards entering the possession (leaving if negative)."""
+        quantities = self.quantities
+        old_qty = quantities[card_id]
+        quantities[card_id] = old_qty + qty
+        if not old_qty:
+            self.nb_distinct_cards += 1
+        elif not old_qty + qty:
+            self.nb_distinct_cards -= 1
+        self.nb_cards += qty
+        self.victory_points += _victory_points[card_id] * qty
+
+    def quantity(self, card_name: CardName) -> int:
+        card_id = card_ids.get(card_name)
+        if card_id is None:
+            return 0
+        return self.quantities[card_id]
+
+    def copy(self) -> Self:
+        new = object.__new__(type(self))
+        new.quantities = self.quantities.copy()
+        new.nb_cards = self.nb_cards
+        new.nb_distinct_cards = self.nb_distinct_cards
+        new.victory_points = self.victory_points
+        return new
+
+    @property
+    def score(self) -> int:
+        return (
+            self.victory_points
+            + self.quantities[_gardens_id] * (self.nb_cards // 10)
+            + self.quantities[_fairgrounds_id] * (self.nb_distinct_cards // 5)
+        )
+
+
+CardKind = Literal["action", "treasure", "victory"]
+
+_kind_shifts: dict[CardKind, int] = {
+    "action": _ACTIONS_SHIFT,
+    "treasure": _TREASURES_SHIFT,
+    "victory": _VICTORIES_SHIFT,
+}
+
+
+def _kinds(info: CardInfo) -> tuple[CardKind | None, ...]:
+    kinds: list[CardKind | None] = [None]
+    if info.is_action:
+        kinds.append("action")
+    if info.is_treasure:
+        kinds.append("treasure")
+    if info.is_victory:
+        kinds.append("victory")
+    return tuple(kinds)
+
+
+_index_keys = tuple(
+    tuple((kind, info.cost) for kind in _kinds(info)) for info in card_infos
+)
+
+
+class SupplyIndex(Possession):
+    """
+    Non-empty piles of the supply, bucketed by type and by cost.
+
+    Given to the stock as its Possession, so that a pile enters its buckets when
+    its first card is added and leaves them when its last card is taken.
+    """
+
+    __slots__ = ("_buckets",)
 
     def __init__(self) -> None:
-        self._quantities: dict[CardName, int] = defaultdict(int)
-        self._cards: list[CardName] = []
+        super().__init__()
+        self._buckets: dict[tuple[CardKind | None, int], set[int]] = {}
+
+    def add(self, card_id: int, qty: int = 1) -> None:
+        old_qty = self.quantities[card_id]
+        super().add(card_id, qty)
+        if not old_qty and qty:
+            for key in _index_keys[card_id]:
+                self._buckets.setdefault(key, set()).add(card_id)
+        elif not self.quantities[card_id]:
+            for key in _index_keys[card_id]:
+                self._buckets[key].discard(card_id)
+
+    def copy(self) -> Self:
+        new = super().copy()
+        buckets = {key: ids.copy() for key, ids in self._buckets.items()}
+        new._buckets = buckets  # noqa: SLF001
+        return new
+
+    def piles(
+        self,
+        max_cost: int,
+        *,
+        min_cost: int = 0,
+        kind: CardKind | None = None,
+    ) -> list[CardName]:
+        """
+        Find the non-empty piles costing between min_cost and max_cost.
+
+        Returns:
+            The piles of the given kind (any kind if None), in card id order.
+
+        """
+        card_ids_found: list[int] = []
+        for cost in range(min_cost, max_cost + 1):
+            card_ids_found.extend(self._buckets.get((kind, cost), ()))
+        return [card_names[card_id] for card_id in sorted(card_ids_found)]
+
+
+class CardContainer:  # noqa: PLR0904
+    """
+    Storage for card.
+
+    Cards are stored as card ids (see ``card_ids``) in an ``array("H")``, with a
+    fixed-size vector holding the quantity of each card id. The top of the pile
+    starts at ``_head``: the slots before it are free, so that drawing from the
+    top and prepending do not shift the whole pile.
+
+    Every change of quantity goes through ``_count`` (inlined in the most used
+    operations), that also keeps the money and the number of action, treasure
+    and victory cards, packed in ``_totals``. The piles of a player are given
+    the Possession of the player, kept up to date the same way.
+
+    ``copy`` is copy-on-write: the copy shares the storage of the original until
+    one of them is changed, each change starting with ``_own``.
+
+    When ``debug`` is set, every change is followed by ``check_consistency``.
+    """
+
+    __slots__ = (
+        "_cards",
+        "_head",
+        "_piles",
+        "_possession",
+        "_quantities",
+        "_shared",
+        "_totals",
+    )
+    debug: ClassVar[bool] = False
+    min_room: Final[int] = 8
+
+    def __init__(self, possession: Possession | None = None) -> None:
+        self._cards = array("H")
+        self._head = 0
+        self._possession = possession
+        self._reset()
+
+    def _reset(self) -> None:
+        self._quantities: list[int] = [0] * nb_card_ids
+        self._piles: set[int] = set()
+        self._shared = False
+        self._totals = 0
+
+    def _own(self) -> None:
+        """Stop sharing the storage with copies, before a change."""
+        self._cards = self._cards[self._head :]
+        self._head = 0
+        self._quantities = self._quantities.copy()
+        self._piles = self._piles.copy()
+        self._shared = False
+
+    def _count(
+        self,
+        card_id: int,
+        qty: int,
+        *,
+        update_possession: bool = True,
+    ) -> None:
+        """Account for qty cards entering the pile (leaving if negative)."""
+        quantities = self._quantities
+        if not quantities[card_id]:
+            self._piles.add(card_id)
+        quantities[card_id] += qty
+        self._totals += _card_totals[card_id] * qty
+        if update_possession and self._possession is not None:
+            self._possession.add(card_id, qty)
+
+    def check_consistency(self) -> None:
+        """
+        Check the quantities and totals against the cards of the pile.
+
+        Raises:
+            InconsistentCardContainerError: If they do not match.
+
+        """
+        quantities = [0] * nb_card_ids
+        for card_id in self._cards[self._head :]:
+            quantities[card_id] += 1
+        expected = (
+            quantities,
+            sum(_card_totals[card_id] * qty for card_id, qty in enumerate(quantities)),
+        )
+        actual = (self._quantities, self._totals)
+        if actual != expected:
+            msg = f"{actual!r} instead of {expected!r} for {self!r}"
+            raise InconsistentCardContainerError(msg)
+        if any(
+            qty and card_id not in self._piles for card_id, qty in enumerate(quantities)
+        ):
+            msg = f"missing piles for {self!r}"
+            raise InconsistentCardContainerError(msg)
 
     def __getattr__(self, attribute: str) -> int:
-        if attribute.endswith("_qty"):
-            card_name = attribute[:-4]
-            return self._quantities.get(CardName[card_name.upper()], 0)
-        raise AttributeError
+        if attribute in _qty_attributes:
+            card_id = _qty_attributes[attribute]
+        elif attribute.lower() in _qty_attributes:
+            card_id = _qty_attributes[attribute.lower()]
+        else:
+            raise AttributeError(attribute)
+        return 0 if card_id is None else self._quantities[card_id]
 
     def __repr__(self) -> str:
-        return str(self._cards)
+        return str(list(self))
 
     def __add__(self, other: CardContainer) -> CardContainer:
         ret = CardContainer()
-        for card_name in self:
-            ret.append(card_name)
-        for card_name in other:
-            ret.append(card_name)
+        for container in (self, other):
+            ret._cards.extend(container._cards[container._head :])
+            for card_id in container._piles:
+                if qty := container._quantities[card_id]:
+                    ret._count(card_id, qty)
+        ret._piles |= self._piles | other._piles
         return ret
 
     def __contains__(self, card_name: CardName) -> bool:
-        return self._quantities.get(card_name, 0) > 0
+        return self.quantity(card_name) > 0
 
     def __len__(self) -> int:
-        return len(self._cards)
+        return len(self._cards) - self._head
 
     def __getitem__(self, index: int) -> CardName:
-        return self._cards[index]
+        size = len(self._cards) - self._head
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError(index)
+        return card_names[self._cards[self._head + index]]
 
     def __iter__(self) -> Iterator[CardName]:
-        return iter(self._cards)
+        cards = self._cards[self._head :] if self._head else self._cards
+        return map(card_names.__getitem__, cards)
 
     def clear(self) -> None:
-        self._quantities.clear()
-        self._cards.clear()
+        if self._possession is not None:
+            for card_id in self._piles:
+                if qty := self._quantities[card_id]:
+                    self._possession.add(card_id, -qty)
+        self._empty()
+
+    def _empty(self) -> None:
+        self._cards = array("H")
+        self._head = 0
+        self._reset()
+
+    def copy(self, possession: Possession | None = None) -> CardContainer:
+        """
+        Copy the pile, copy-on-write, with possession as its Possession.
+
+        possession is not updated with the cards of the copy: it is meant to be
+        a copy of the Possession of the pile.
 
-    def copy(self) -> CardContainer:
-        new = CardContainer()
-        new._quantities = self._quantities.copy()
-        new._cards = self._cards.copy()
+        Returns:
+            The copy of the pile.
+
+        """
+        # no __init__, all the slots are set below
+        new: CardContainer = CardContainer.__new__(CardContainer)
+        new._possession = possession
+        new._cards = self._cards
+        new._head = self._head
+        new._quantities = self._quantities
+        new._piles = self._piles
+        new._shared = self._shared = True
+        new._totals = self._totals
         return new
 
+    def _extend_ids(self, card_id: int, qty: int) -> None:
+        if qty > 0:
+            if self._shared:
+                self._own()
+            self._cards.extend(array("H", (card_id,)) * qty)
+            self._count(card_id, qty)
+            if CardContainer.debug:
+                self.check_consistency()
+
     def prepend(self, card_name: CardName) -> None:
         """
         Insert next card to be played.
@@ -972,94 +1297,343 @@ class CardContainer:
             KeyError: If unknown card_name.
 
         """
-        if card_name not in Card.types:
+        card_id = card_ids.get(card_name)
+        if card_id is None:
             raise KeyError(card_name)
-        self._cards.insert(0, card_name)
-        self._quantities[card_name] += 1
+        if self._shared:
+            self._own()
+        if not self._head:
+            # make room at the top, as much as the pile size: amortized O(1)
+            room = max(len(self._cards), self.min_room)
+            self._cards[0:0] = array("H", bytes(2 * room))
+            self._head = room
+        self._head -= 1
+        self._cards[self._head] = card_id
+        # inlined _count(card_id, 1)
+        quantities = self._quantities
+        if not quantities[card_id]:
+            self._piles.add(card_id)
+        quantities[card_id] += 1
+        self._totals += _card_totals[card_id]
+        if self._possession is not None:
+            self._possession.add(card_id)
+        if CardContainer.debug:
+            self.check_consistency()
 
     def append(self, card_name: CardName) -> None:
-        if card_name not in Card.types:
-            raise KeyError(card_name)
-        self._cards.append(card_name)
-        self._quantities[card_name] += 1
+        card_id = card_ids[card_name]
+        if self._shared:
+            self._own()
+        self._cards.append(card_id)
+        # inlined _count(card_id, 1), append is the most used operation
+        quantities = self._quantities
+        if not quantities[card_id]:
+            self._piles.add(card_id)
+        quantities[card_id] += 1
+        self._totals += _card_totals[card_id]
+        if self._possession is not None:
+            self._possession.add(card_id)
+        if CardContainer.debug:
+            self.check_consistency()
 
     def append_several(self, qty: int, card_name: CardName) -> None:
-        for _ in range(qty):
-            self.append(card_name)
+        self._extend_ids(card_ids[card_name], qty)
 
     def remove(self, card_name: CardName) -> None:
-        self._cards.remove(card_name)
-        self._quantities[card_name] -= 1
+        card_id = card_ids.get(card_name)
+        if card_id is None:
+            raise ValueError(card_name)
+        self.remove_id(card_id)
+
+    def remove_id(self, card_id: int) -> None:
+        """
+        Remove a card given by its id.
+
+        Raises:
+            ValueError: If there is no such card.
+
+        """
+        if not self._quantities[card_id]:
+            raise ValueError(card_names[card_id])
+        if self._shared:
+            self._own()
+        del self._cards[self._cards.index(card_id, self._head)]
+        self._count(card_id, -1)
+        if CardContainer.debug:
+            self.check_consistency()
+
+    def extend(self, card_names: Iterable[CardName]) -> None:
+        new_cards = array("H", map(card_ids.__getitem__, card_names))
+        if self._shared:
+            self._own()
+        self._cards.extend(new_cards)
+        for card_id in new_cards:
+            self._count(card_id, 1)
+        if CardContainer.debug:
+            self.check_consistency()
+
+    def _move(self, other: CardContainer, card_id: int, qty: int) -> None:
+        if self._shared:
+            self._own()
+        if other._shared:
+            other._own()
+        cards = self._cards
+        for _ in range(qty):
+            del cards[cards.index(card_id, self._head)]
+        other._cards.extend(array("H", (card_id,)) * qty)
+        same_possession = self._possession is other._possession
+        self._count(card_id, -qty, update_possession=not same_possession)
+        other._count(card_id, qty, update_possession=not same_possession)
+
+    def move_to(self, other: CardContainer, card_name: CardName, qty: int = 1) -> None:
+        """
+        Move qty cards named card_name at the bottom of other.
+
+        Raises:
+            ValueError: If there are less than qty such cards.
 
-    def shuffle(self) -> None:
-        random.shuffle(self._cards)
+        """
+        card_id = card_ids.get(card_name)
+        if card_id is None:
+            raise ValueError(card_name)
+        self.move_id_to(other, card_id, qty)
+
+    def move_id_to(self, other: CardContainer, card_id: int, qty: int = 1) -> None:
+        """
+        Move qty cards given by their id at the bottom of other.
+
+        Raises:
+            ValueError: If there are less than qty such cards.
+
+        """
+        if self._quantities[card_id] < qty:
+            raise ValueError(card_names[card_id])
+        if qty > 0:
+            self._move(other, card_id, qty)
+        if CardContainer.debug:
+            self.check_consistency()
+            other.check_consistency()
+
+    def move_several_to(
+        self,
+        other: CardContainer,
+        card_names_to_move: Iterable[CardName],
+    ) -> None:
+        """
+        Move the given cards (a card name can be given several times) to other.
+
+        Nothing is moved if one of the cards is missing.
+
+        Raises:
+            ValueError: If a card is missing.
+
+        """
+        quantities: dict[int, int] = {}
+        for card_name in card_names_to_move:
+            card_id = card_ids.get(card_name)
+            if card_id is None:
+                raise ValueError(card_name)
+            quantities[card_id] = quantities.get(card_id, 0) + 1
+        for card_id, qty in quantities.items():
+            if self._quantities[card_id] < qty:
+                raise ValueError(card_names[card_id])
+        for card_id, qty in quantities.items():
+            self._move(other, card_id, qty)
+        if CardContainer.debug:
+            self.check_consistency()
+            other.check_consistency()
+
+    def move_top_to(self, other: CardContainer, qty: int) -> int:
+        """
+        Move at most qty cards from the top to the bottom of other.
+
+        Returns:
+            The number of moved cards.
+
+        """
+        if self._shared:
+            self._own()
+        if other._shared:
+            other._own()
+        cards = self._cards
+        head = self._head
+        moved_cards = cards[head : head + qty]
+        head += len(moved_cards)
+        if head == len(cards):
+            del cards[:]
+            head = 0
+        self._head = head
+        other._cards.extend(moved_cards)
+        # inlined _count of each card, summing the totals once
+        quantities = self._quantities
+        other_quantities = other._quantities
+        other_piles = other._piles
+        totals = 0
+        for card_id in moved_cards:
+            quantities[card_id] -= 1
+            if not other_quantities[card_id]:
+                other_piles.add(card_id)
+            other_quantities[card_id] += 1
+            totals += _card_totals[card_id]
+        self._totals -= totals
+        other._totals += totals
+        self._give_cards_possession(other, moved_cards)
+        if CardContainer.debug:
+            self.check_consistency()
+            other.check_consistency()
+        return len(moved_cards)
+
+    def shuffle(self, rng: random.Random | Generator | None = None) -> None:
+        """
+        Shuffle the pile with rng, the global random generator if None.
+
+        With a NumPy Generator, the card ids are shuffled in place in a new
+        array, without converting them to Python ints: faster for big piles.
+        """
+        if self._shared:
+            self._own()
+        if rng is None or isinstance(rng, random.Random):  # noqa: S311
+            cards = self._cards[self._head :].tolist()
+            if rng is None:
+                random.shuffle(cards)
+            else:
+                rng.shuffle(cards)
+            self._cards = array("H", cards)
+        else:
+            # imported here, NumPy is an optional dependency
+            import numpy as np  # noqa: PLC0415
+
+            self._cards = self._cards[self._head :]
+            rng.shuffle(np.frombuffer(self._cards, dtype=np.uint16))
+        self._head = 0
+
+    def nb_cards_of_kind(self, kind: CardKind) -> int:
+        return (self._totals >> _kind_shifts[kind]) & _TOTAL_MASK
 
     def contains_action(self) -> bool:
-        return any(
-            card_name in actions_card_name
-            for card_name, qty in self._quantities.items()
-            if qty > 0
-        )
+        return (self._totals >> _ACTIONS_SHIFT) & _TOTAL_MASK > 0
 
     @property
-    def victory_cards(self) -> CardContainer:
-        ret = CardContainer()
-        for card_name, qty in self._quantities.items():
-            if card_name in victory_card_name:
-                ret.append_several(qty, card_name)
-        return ret
+    def victory_cards(self) -> CardView:
+        return CardView(self, _victory_ids, "victory")
 
     @property
-    def action_cards(self) -> CardContainer:
-        ret = CardContainer()
-        for card_name, qty in self._quantities.items():
-            if card_name in actions_card_name:
-                ret.append_several(qty, card_name)
-        return ret
+    def action_cards(self) -> CardView:
+        return CardView(self, _action_ids, "action")
 
     def contains_money(self) -> bool:
-        return any(
-            card_name in treasure_card_name
-            for card_name, qty in self._quantities.items()
-            if qty > 0
-        )
+        return (self._totals >> _TREASURES_SHIFT) & _TOTAL_MASK > 0
 
     @property
-    def money_cards(self) -> CardContainer:
-        ret = CardContainer()
-        for card_name, qty in self._quantities.items():
-            if card_name in treasure_card_name:
-                ret.append_several(qty, card_name)
-        return ret
+    def money_cards(self) -> CardView:
+        return CardView(self, _treasure_ids, "treasure")
 
     @property
     def money(self) -> int:
-        return sum(
-            Card.class_(card_name).money * quantity
-            for card_name, quantity in self._quantities.items()
-        )
+        return (self._totals >> _MONEY_SHIFT) & _TOTAL_MASK
 
     def pop(self, index: int = -1) -> CardName:
-        card_name = self._cards.pop(index)
-        self._quantities[card_name] -= 1
-        return card_name
+        if self._shared:
+            self._own()
+        cards = self._cards
+        head = self._head
+        if index:
+            if index > 0:
+                index += head
+            elif index < head - len(cards):
+                msg = "pop index out of range"
+                raise IndexError(msg)
+            card_id = cards.pop(index)
+        else:
+            # draw from the top: only move the head
+            card_id = cards[head]
+            head += 1
+            if head == len(cards):
+                del cards[:]
+                head = 0
+            self._head = head
+        # inlined _count(card_id, -1), pop(0) draws the cards
+        self._quantities[card_id] -= 1
+        self._totals -= _card_totals[card_id]
+        if self._possession is not None:
+            self._possession.add(card_id, -1)
+        if CardContainer.debug:
+            self.check_consistency()
+        return card_names[card_id]
 
     def quantity(self, card_name: CardName) -> int:
-        return self._quantities.get(card_name, 0)
+        card_id = card_ids.get(card_name)
+        if card_id is None:
+            return 0
+        return self._quantities[card_id]
+
+    def quantity_of_id(self, card_id: int) -> int:
+        return self._quantities[card_id]
 
     def sort(self, key: Callable, *, reverse: bool = False) -> None:
-        self._cards.sort(key=key, reverse=reverse)
+        cards = sorted(self, key=key, reverse=reverse)
+        self._cards = array("H", map(card_ids.__getitem__, cards))
+        self._head = 0
+
+    def _give_cards_possession(
+        self,
+        other: CardContainer,
+        moved_cards: Iterable[int],
+    ) -> None:
+        if self._possession is other._possession:
+            return
+        for card_id in moved_cards:
+            if self._possession is not None:
+                self._possession.add(card_id, -1)
+            if other._possession is not None:
+                other._possession.add(card_id)
+
+    def _give_possession(self, other: CardContainer) -> None:
+        for card_id in self._piles:
+            if qty := self._quantities[card_id]:
+                if self._possession is not None:
+                    self._possession.add(card_id, -qty)
+                if other._possession is not None:
+                    other._possession.add(card_id, qty)
 
     def empty_to(self, other: CardContainer) -> None:
-        while self:
-            card_name = self.pop(0)
-            other.append(card_name)
-        self._quantities.clear()
-        self._cards.clear()
+        """Move all the cards at the bottom of other, keeping their order."""
+        if self._shared:
+            self._own()
+        if other._shared:
+            other._own()
+        if self._possession is not other._possession:
+            self._give_possession(other)
+        if len(other._cards) == other._head:
+            # other is empty: hand over the storage instead of copying it
+            other._cards, self._cards = self._cards, array("H")
+            other._head, self._head = self._head, 0
+            other._quantities, self._quantities = self._quantities, other._quantities
+            other._totals, self._totals = self._totals, 0
+            other._piles |= self._piles
+            self._piles = set()
+        else:
+            if other._head > len(other._cards) >> 1:
+                del other._cards[: other._head]
+                other._head = 0
+            other._cards.extend(self._cards[self._head :])
+            quantities = self._quantities
+            other_quantities = other._quantities
+            other_piles = other._piles
+            for card_id in self._piles:
+                if qty := quantities[card_id]:
+                    other_quantities[card_id] += qty
+                    other_piles.add(card_id)
+            # the totals of the cards are the totals of self
+            other._totals += self._totals
+            self._empty()
+        if CardContainer.debug:
+            self.check_consistency()
+            other.check_consistency()
 
     @property
     def nb_empty_piles(self) -> int:
-        return sum(1 for qty in self._quantities.values() if qty == 0)
+        return sum(1 for card_id in self._piles if not self._quantities[card_id])
 
     @property
     def three_empty_piles(self) -> bool:
@@ -1070,8 +1644,70 @@ class CardContainer:
     def state(self) -> Cards:
         return Cards(
             quantities={
-                card_name: quantity
-                for card_name, quantity in self._quantities.items()
-                if quantity > 0
+                card_names[card_id]: quantity
+                for card_id in sorted(self._piles)
+                if (quantity := self._quantities[card_id]) > 0
             },
         )
+
+
+class CardView:
+    """
+    Read-only view on the cards of a container belonging to a category.
+
+    Nothing is copied: the view follows the changes of the container. The cards
+    are grouped by card name, in card id order.
+    """
+
+    __slots__ = ("_card_ids", "_container", "_kind")
+
+    def __init__(
+        self,
+        container: CardContainer,
+        category_ids: tuple[int, ...],
+        kind: CardKind,
+    ) -> None:
+        self._container = container
+        self._card_ids = category_ids
+        self._kind: CardKind = kind
+
+    def __repr__(self) -> str:
+        return str(list(self))
+
+    def __len__(self) -> int:
+        return self._container.nb_cards_of_kind(self._kind)
+
+    def __contains__(self, card_name: CardName) -> bool:
+        return self.quantity(card_name) > 0
+
+    def __getitem__(self, index: int) -> CardName:
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError(index)
+        quantity_of_id = self._container.quantity_of_id
+        for card_id in self._card_ids:
+            index -= quantity_of_id(card_id)
+            if index < 0:
+                return card_names[card_id]
+        raise IndexError(index)  # pragma: no cover
+
+    def __iter__(self) -> Iterator[CardName]:
+        quantity_of_id = self._container.quantity_of_id
+        for card_id in self._card_ids:
+            card_name = card_names[card_id]
+            for _ in range(quantity_of_id(card_id)):
+                yield card_name
+
+    def distinct(self) -> list[CardName]:
+        quantity_of_id = self._container.quantity_of_id
+        return [
+            card_names[card_id] for card_id in self._card_ids if quantity_of_id(card_id)
+        ]
+
+    def quantity(self, card_name: CardName) -> int:
+        card_id = card_ids.get(card_name)
+        if card_id is None or card_id not in self._card_ids:
+            return 0
+        return self._container.quantity_of_id(card_id)
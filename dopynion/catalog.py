@@ -0,0 +1,295 @@
+"""
+Catalog of the game records, in a SQLite database next to them.
+
+The catalog has one row per game (file name, date, kingdom, players, scores,
+winner and number of turns), so that listing games or building a leaderboard
+does not parse the records. Record adds a game to the catalog of records_dir
+when the game is saved finished.
+
+Rebuild it from the existing records, list the games or show the leaderboard
+with ``python -m dopynion.catalog rebuild|list|leaderboard [--records-dir DIR]``.
+"""
+
+import argparse
+import datetime
+import itertools
+import json
+import logging
+import sqlite3
+from collections.abc import Iterable
+from pathlib import Path
+from types import TracebackType
+from typing import NamedTuple, Self
+
+from dopynion.cards import card_infos_by_name
+from dopynion.data_model import CardName, Cards
+
+CATALOG_NAME = "catalog.sqlite"
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    name TEXT PRIMARY KEY,
+    date TEXT NOT NULL,
+    kingdom TEXT NOT NULL,
+    players TEXT NOT NULL,
+    scores TEXT NOT NULL,
+    winner TEXT,
+    nb_turns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_date ON games (date);
+CREATE TABLE IF NOT EXISTS scores (
+    name TEXT NOT NULL REFERENCES games (name) ON DELETE CASCADE,
+    player TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    winner INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scores_name ON scores (name);
+CREATE INDEX IF NOT EXISTS scores_player ON scores (player);
+"""
+
+
+class CatalogEntry(NamedTuple):
+    name: str
+    date: datetime.datetime
+    kingdom: list[CardName]
+    players: list[str]
+    scores: dict[str, int]
+    winner: str | None
+    nb_turns: int
+
+
+class LeaderboardEntry(NamedTuple):
+    player: str
+    nb_games: int
+    nb_wins: int
+    mean_score: float
+
+
+def catalog_entry(
+    name: str,
+    date: datetime.datetime,
+    stock: Cards,
+    scores: dict[str, int],
+    nb_turns: int,
+) -> CatalogEntry:
+    """
+    Summarize a game for the catalog.
+
+    The kingdom is made of the kingdom cards of the initial stock, and the
+    winner is the player with the best score, None on a tie.
+
+    Returns:
+        The catalog entry of the game.
+
+    """
+    kingdom = [
+        card_name
+        for card_name in stock.quantities
+        if card_name in card_infos_by_name and card_infos_by_name[card_name].is_kingdom
+    ]
+    ranking = sorted(scores.values(), reverse=True)
+    winner = None
+    if ranking and (len(ranking) == 1 or ranking[0] > ranking[1]):
+        winner = max(scores, key=scores.__getitem__)
+    return CatalogEntry(name, date, kingdom, list(scores), scores, winner, nb_turns)
+
+
+class Catalog:
+    """SQLite catalog of the game records, usable as a context manager."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        self._connection.executescript(_SCHEMA)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def add(self, entry: CatalogEntry) -> None:
+        """Add a game, or replace it if it has the same name."""
+        with self._connection:
+            self._add(entry)
+
+    def _add(self, entry: CatalogEntry) -> None:
+        self._connection.execute("DELETE FROM games WHERE name = ?", (entry.name,))
+        self._connection.execute(
+            "INSERT INTO games VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                entry.name,
+                entry.date.isoformat(),
+                json.dumps(entry.kingdom),
+                json.dumps(entry.players),
+                json.dumps(entry.scores),
+                entry.winner,
+                entry.nb_turns,
+            ),
+        )
+        self._connection.executemany(
+            "INSERT INTO scores VALUES (?, ?, ?, ?)",
+            [
+                (entry.name, player, score, player == entry.winner)
+                for player, score in entry.scores.items()
+            ],
+        )
+
+    def remove(self, names: Iterable[str]) -> None:
+        """Remove games, ignoring the ones not in the catalog."""
+        with self._connection:
+            self._connection.executemany(
+                "DELETE FROM games WHERE name = ?",
+                ((name,) for name in names),
+            )
+
+    def rebuild(self, records_dir: Path) -> int:
+        """
+        Replace the content of the catalog with the records of records_dir.
+
+        The archived records of records_dir are cataloged too. The records
+        without scores (games not started) are skipped, and so are the records
+        that cannot be read, with a warning.
+
+        Returns:
+            The number of cataloged games.
+
+        """
+        # imported here, dopynion.record and dopynion.retention import this module
+        from dopynion.record import RecordReader  # noqa: PLC0415
+        from dopynion.retention import Archives  # noqa: PLC0415
+
+        entries: list[CatalogEntry] = []
+        for path in sorted(records_dir.glob("game__*.dop")):
+            if not path.stat().st_size:
+                continue
+            try:
+                reader = RecordReader(path)
+                entry = catalog_entry(
+                    path.name,
+                    reader.date(),
+                    reader.stock(),
+                    reader.scores(),
+                    reader.nb_turns,
+                )
+            except (OSError, ValueError):
+                logger.warning("cannot read the game record %s", path, exc_info=True)
+                continue
+            entries.append(entry)
+        entries.extend(
+            catalog_entry(
+                name,
+                game_record.date,
+                game_record.stock,
+                game_record.scores,
+                len(game_record.turns),
+            )
+            for name, game_record in Archives(records_dir).games()
+        )
+        entries = [entry for entry in entries if entry.scores]
+        with self._connection:
+            self._connection.execute("DELETE FROM games")
+            for entry in entries:
+                self._add(entry)
+        return len(entries)
+
+    def games(
+        self,
+        *,
+        player: str | None = None,
+        since: datetime.datetime | None = None,
+        limit: int | None = None,
+    ) -> list[CatalogEntry]:
+        """
+        List the games, the most recent first.
+
+        Returns:
+            The games, of player and since the date if given.
+
+        """
+        query = "SELECT * FROM games"
+        conditions = []
+        parameters: list[str | int] = []
+        if player is not None:
+            conditions.append("name IN (SELECT name FROM scores WHERE player = ?)")
+            parameters.append(player)
+        if since is not None:
+            conditions.append("date >= ?")
+            parameters.append(since.isoformat())
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY date DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            parameters.append(limit)
+        return [
+            CatalogEntry(
+                name,
+                datetime.datetime.fromisoformat(date),
+                [CardName(card_name) for card_name in json.loads(kingdom)],
+                json.loads(players),
+                json.loads(scores),
+                winner,
+                nb_turns,
+            )
+            for name, date, kingdom, players, scores, winner, nb_turns in (
+                self._connection.execute(query, parameters)
+            )
+        ]
+
+    def leaderboard(self) -> list[LeaderboardEntry]:
+        """
+        Rank the players by number of wins, then by mean score.
+
+        Returns:
+            One entry per player.
+
+        """
+        rows = self._connection.execute(
+            "SELECT player, COUNT(*), SUM(winner), AVG(score) FROM scores"
+            " GROUP BY player ORDER BY SUM(winner) DESC, AVG(score) DESC",
+        )
+        return list(itertools.starmap(LeaderboardEntry, rows))
+
+
+def main(argv: list[str] | None = None) -> None:
+    # imported here, dopynion.record imports this module
+    from dopynion.record import records_dir  # noqa: PLC0415
+
+    parser = argparse.ArgumentParser(
+        prog="python -m dopynion.catalog",
+        description="Rebuild or query the catalog of the game records.",
+    )
+    parser.add_argument("command", choices=["rebuild", "list", "leaderboard"])
+    parser.add_argument("--records-dir", type=Path, default=records_dir)
+    args = parser.parse_args(argv)
+    with Catalog(args.records_dir / CATALOG_NAME) as catalog:
+        if args.command == "rebuild":
+            nb_games = catalog.rebuild(args.records_dir)
+            print(f"{nb_games} games cataloged")
+        elif args.command == "list":
+            for entry in catalog.games():
+                scores = ", ".join(f"{p}: {s}" for p, s in entry.scores.items())
+                print(f"{entry.date:%Y-%m-%d %H:%M} {entry.name} ({scores})")
+        else:
+            for player in catalog.leaderboard():
+                print(
+                    f"{player.player}: {player.nb_wins} wins in {player.nb_games} "
+                    f"games, mean score {player.mean_score:.1f}",
+                )
+
+
+if __name__ == "__main__":
+    main()
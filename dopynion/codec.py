@@ -0,0 +1,469 @@
+"""
+Binary encoding of game records.
+
+A binary record starts with ``MAGIC`` and the format version, followed by a
+string table (player names, actions, errors, hook names, date), a card table
+(the card names used in the record) and a table of the distinct player
+snapshots. The body then refers to strings, cards and player snapshots by their
+index in these tables. All the integers are varints, zigzag encoded when they
+can be negative. Version 1 records, without the seed of the game, and version
+2 records, with an unsigned seed, are still decoded.
+
+Each decoded event has its own Player model, even when the snapshot is shared.
+
+Convert records with ``python -m dopynion.codec to-binary|to-json SOURCE DEST``.
+"""
+
+import argparse
+import datetime
+from pathlib import Path
+from typing import Any, Final, Literal
+
+import pydantic
+from pydantic import BaseModel
+
+from dopynion.data_model import (
+    ActionRecord,
+    CardName,
+    CardNameAndHand,
+    Cards,
+    ErrorRecord,
+    GameRecord,
+    Hand,
+    HookCallArgs,
+    HookCallRecord,
+    HookCallResult,
+    HookResultRecord,
+    MoneyCardsInHand,
+    Player,
+    PlayerTurnRecord,
+    PossibleCards,
+    RecordEvent,
+)
+from dopynion.exceptions import InvalidRecordError
+
+MAGIC: Final[bytes] = b"DOPB"
+# 2: seed of the game, after the date
+# 3: signed seed of the game, after a flag
+VERSION: Final[int] = 3
+
+# tags of the events, of the hook call arguments and of the hook results
+_ACTION, _ERROR, _HOOK_CALL, _HOOK_RESULT = range(4)
+_NO_ARGS, _CARD_NAME_AND_HAND, _HAND, _POSSIBLE_CARDS, _MONEY_CARDS_IN_HAND = range(5)
+_NONE, _FALSE, _TRUE, _CARD_NAME = range(4)
+_ERROR_TYPES: Final[tuple[Literal["error", "warning"], ...]] = ("error", "warning")
+
+
+# oldest and newest pydantic versions the fast construction is tested with
+_FAST_CONSTRUCT_VERSIONS: Final[tuple[tuple[int, int], tuple[int, int]]] = (
+    (2, 11),
+    (2, 14),
+)
+_PYDANTIC_SLOTS: Final[tuple[str, ...]] = (
+    "__pydantic_fields_set__",
+    "__pydantic_extra__",
+    "__pydantic_private__",
+)
+
+
+def _fast_construct_supported(version: str = pydantic.VERSION) -> bool:
+    """
+    Tell if the models can be built by setting their pydantic slots directly.
+
+    Returns:
+        True with a tested pydantic version, that has exactly the expected
+        slots.
+
+    """
+    oldest, newest = _FAST_CONSTRUCT_VERSIONS
+    major, minor = (int(part) for part in version.split(".")[:2])
+    return oldest <= (major, minor) <= newest and BaseModel.__slots__ == (
+        "__dict__",
+        *_PYDANTIC_SLOTS,
+    )
+
+
+_new = object.__new__
+_set_dict = object.__setattr__
+_slot_setters = (
+    [BaseModel.__dict__[name].__set__ for name in _PYDANTIC_SLOTS]
+    if _fast_construct_supported()
+    else []
+)
+
+
+def _fast_construct[Model: BaseModel](
+    model_class: type[Model],
+    fields: dict[str, Any],
+) -> Model:
+    """
+    Build a model without validation, as model_construct, but much faster.
+
+    It relies on the private slots of pydantic models, hence the version check
+    (test_fast_construct_layout fails when they change). model_construct would
+    make decode about as slow as GameRecord.model_validate_json.
+
+    Returns:
+        The model, with fields as its __dict__.
+
+    """
+    set_fields_set, set_extra, set_private = _slot_setters
+    model = _new(model_class)
+    _set_dict(model, "__dict__", fields)
+    set_fields_set(model, set(fields))
+    set_extra(model, None)
+    set_private(model, None)
+    return model
+
+
+def _model_construct[Model: BaseModel](
+    model_class: type[Model],
+    fields: dict[str, Any],
+) -> Model:
+    return model_class.model_construct(**fields)
+
+
+_construct = _fast_construct if _slot_setters else _model_construct
+
+
+class _Encoder:
+    def __init__(self) -> None:
+        self.out = bytearray()
+        self.strings: dict[str, int] = {}
+        self.cards: dict[CardName, int] = {}
+        self.players: dict[tuple, int] = {}
+        self.player_models: list[Player] = []
+
+    def unsigned(self, value: int) -> None:
+        out = self.out
+        while value >= 0x80:  # noqa: PLR2004
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+
+    def signed(self, value: int) -> None:
+        self.unsigned(value << 1 if value >= 0 else (-value << 1) - 1)
+
+    def string(self, string: str) -> None:
+        self.unsigned(self.strings.setdefault(string, len(self.strings)))
+
+    def card(self, card_name: CardName) -> None:
+        self.unsigned(self.cards.setdefault(card_name, len(self.cards)))
+
+    def card_list(self, card_names: list[CardName]) -> None:
+        self.unsigned(len(card_names))
+        for card_name in card_names:
+            self.card(card_name)
+
+    def quantities(self, cards: Cards) -> None:
+        self.unsigned(len(cards.quantities))
+        for card_name, qty in cards.quantities.items():
+            self.card(card_name)
+            self.signed(qty)
+
+    def player(self, player: Player) -> None:
+        hand = player.hand
+        key = (
+            player.name,
+            player.score,
+            None if hand is None else tuple(hand.quantities.items()),
+        )
+        index = self.players.get(key)
+        if index is None:
+            index = self.players[key] = len(self.players)
+            self.player_models.append(player)
+        self.unsigned(index)
+
+    def player_snapshot(self, player: Player) -> None:
+        self.string(player.name)
+        self.signed(player.score)
+        if player.hand is None:
+            self.unsigned(0)
+        else:
+            self.unsigned(1)
+            self.quantities(player.hand)
+
+    def hook_call_args(self, args: HookCallArgs) -> None:
+        if args is None:
+            self.unsigned(_NO_ARGS)
+        elif isinstance(args, CardNameAndHand):
+            self.unsigned(_CARD_NAME_AND_HAND)
+            self.card(args.card_name)
+            self.card_list(args.hand)
+        elif isinstance(args, Hand):
+            self.unsigned(_HAND)
+            self.card_list(args.hand)
+        elif isinstance(args, PossibleCards):
+            self.unsigned(_POSSIBLE_CARDS)
+            self.card_list(args.possible_cards)
+        else:
+            self.unsigned(_MONEY_CARDS_IN_HAND)
+            self.card_list(args.money_in_hand)
+
+    def hook_call_result(self, result: HookCallResult) -> None:
+        if result is None:
+            self.unsigned(_NONE)
+        elif isinstance(result, CardName):
+            self.unsigned(_CARD_NAME)
+            self.card(result)
+        else:
+            self.unsigned(_TRUE if result else _FALSE)
+
+    def event(self, event: RecordEvent) -> None:
+        if isinstance(event, ActionRecord):
+            self.unsigned(_ACTION)
+            self.string(event.action)
+            self.signed(event.score)
+        elif isinstance(event, ErrorRecord):
+            self.unsigned(_ERROR)
+            self.string(event.error)
+            self.unsigned(_ERROR_TYPES.index(event.type))
+        elif isinstance(event, HookCallRecord):
+            self.unsigned(_HOOK_CALL)
+            self.string(event.name)
+            self.hook_call_args(event.args)
+        else:
+            self.unsigned(_HOOK_RESULT)
+            self.hook_call_result(event.result)
+        self.player(event.player)
+
+    def game_record(self, game_record: GameRecord) -> bytes:
+        self.string(game_record.date.isoformat())
+        if game_record.seed is None:
+            self.unsigned(0)
+        else:
+            self.unsigned(1)
+            self.signed(game_record.seed)
+        self.quantities(game_record.stock)
+        self.unsigned(len(game_record.turns))
+        for turn in game_record.turns:
+            self.unsigned(len(turn.actions))
+            for event in turn.actions:
+                self.event(event)
+        self.unsigned(len(game_record.scores))
+        for name, score in game_record.scores.items():
+            self.string(name)
+            self.signed(score)
+        body = self.out
+        self.out = bytearray()
+        self.unsigned(len(self.player_models))
+        for player in self.player_models:
+            self.player_snapshot(player)
+        body = self.out + body
+        for card_name in self.cards:
+            self.strings.setdefault(card_name.value, len(self.strings))
+        self.out = bytearray(MAGIC)
+        self.unsigned(VERSION)
+        self.unsigned(len(self.strings))
+        for string in self.strings:
+            encoded = string.encode()
+            self.unsigned(len(encoded))
+            self.out += encoded
+        self.unsigned(len(self.cards))
+        for card_name in self.cards:
+            self.string(card_name.value)
+        return bytes(self.out + body)
+
+
+class _Decoder:
+    def __init__(self, data: bytes) -> None:
+        if not data.startswith(MAGIC):
+            msg = "not a binary game record"
+            raise InvalidRecordError(msg)
+        self.data = data
+        self.pos = len(MAGIC)
+        self.version = self.unsigned()
+        if not 1 <= self.version <= VERSION:
+            msg = f"unknown binary game record version {self.version}"
+            raise InvalidRecordError(msg)
+        self.strings: list[str] = []
+        for _ in range(self.unsigned()):
+            size = self.unsigned()
+            self.strings.append(data[self.pos : self.pos + size].decode())
+            self.pos += size
+        self.cards = [CardName(self.string()) for _ in range(self.unsigned())]
+        self.players = [self.player_snapshot() for _ in range(self.unsigned())]
+
+    def seed(self) -> int | None:
+        if self.version == 1:
+            return None
+        if self.version == 2:  # noqa: PLR2004
+            value = self.unsigned()
+            return value - 1 if value else None
+        return self.signed() if self.unsigned() else None
+
+    def unsigned(self) -> int:
+        data = self.data
+        pos = self.pos
+        byte = data[pos]
+        pos += 1
+        value = byte & 0x7F
+        shift = 7
+        while byte & 0x80:
+            byte = data[pos]
+            pos += 1
+            value |= (byte & 0x7F) << shift
+            shift += 7
+        self.pos = pos
+        return value
+
+    def signed(self) -> int:
+        value = self.unsigned()
+        return -((value + 1) >> 1) if value & 1 else value >> 1
+
+    def string(self) -> str:
+        return self.strings[self.unsigned()]
+
+    def card(self) -> CardName:
+        return self.cards[self.unsigned()]
+
+    def card_list(self) -> list[CardName]:
+        cards = self.cards
+        return [cards[self.unsigned()] for _ in range(self.unsigned())]
+
+    def quantities(self) -> Cards:
+        quantities = {}
+        for _ in range(self.unsigned()):
+            card_name = self.card()
+            quantities[card_name] = self.signed()
+        return _construct(Cards, {"quantities": quantities})
+
+    def player(self) -> Player:
+        name, score, quantities = self.players[self.unsigned()]
+        hand = None
+        if quantities is not None:
+            hand = _construct(Cards, {"quantities": quantities.copy()})
+        return _construct(Player, {"name": name, "hand": hand, "score": score})
+
+    def player_snapshot(self) -> tuple[str, int, dict[CardName, int] | None]:
+        name = self.string()
+        score = self.signed()
+        quantities = self.quantities().quantities if self.unsigned() else None
+        return name, score, quantities
+
+    def hook_call_args(self) -> HookCallArgs:
+        tag = self.unsigned()
+        if tag == _NO_ARGS:
+            return None
+        if tag == _CARD_NAME_AND_HAND:
+            card_name = self.card()
+            return _construct(
+                CardNameAndHand,
+                {"card_name": card_name, "hand": self.card_list()},
+            )
+        if tag == _HAND:
+            return _construct(Hand, {"hand": self.card_list()})
+        if tag == _POSSIBLE_CARDS:
+            return _construct(PossibleCards, {"possible_cards": self.card_list()})
+        return _construct(MoneyCardsInHand, {"money_in_hand": self.card_list()})
+
+    def hook_call_result(self) -> HookCallResult:
+        tag = self.unsigned()
+        if tag == _CARD_NAME:
+            return self.card()
+        if tag == _NONE:
+            return None
+        return tag == _TRUE
+
+    def event(self) -> RecordEvent:
+        tag = self.unsigned()
+        if tag == _ACTION:
+            action = self.string()
+            score = self.signed()
+            return _construct(
+                ActionRecord,
+                {"action": action, "player": self.player(), "score": score},
+            )
+        if tag == _ERROR:
+            error = self.string()
+            type_ = _ERROR_TYPES[self.unsigned()]
+            return _construct(
+                ErrorRecord,
+                {"error": error, "player": self.player(), "type": type_},
+            )
+        if tag == _HOOK_CALL:
+            name = self.string()
+            args = self.hook_call_args()
+            return _construct(
+                HookCallRecord,
+                {"name": name, "player": self.player(), "args": args},
+            )
+        result = self.hook_call_result()
+        return _construct(
+            HookResultRecord,
+            {"player": self.player(), "result": result},
+        )
+
+    def game_record(self) -> GameRecord:
+        date = datetime.datetime.fromisoformat(self.string())
+        seed = self.seed()
+        stock = self.quantities()
+        turns = [
+            _construct(
+                PlayerTurnRecord,
+                {"actions": [self.event() for _ in range(self.unsigned())]},
+            )
+            for _ in range(self.unsigned())
+        ]
+        scores = {}
+        for _ in range(self.unsigned()):
+            name = self.string()
+            scores[name] = self.signed()
+        return _construct(
+            GameRecord,
+            {
+                "date": date,
+                "seed": seed,
+                "stock": stock,
+                "turns": turns,
+                "scores": scores,
+            },
+        )
+
+
+def encode(game_record: GameRecord) -> bytes:
+    return _Encoder().game_record(game_record)
+
+
+def decode(data: bytes) -> GameRecord:
+    """
+    Decode a binary game record.
+
+    Returns:
+        The decoded game record.
+
+    Raises:
+        InvalidRecordError: If data is not a binary game record.
+
+    """
+    try:
+        return _Decoder(data).game_record()
+    except (IndexError, ValueError) as error:
+        msg = f"corrupted binary game record: {error}"
+        raise InvalidRecordError(msg) from error
+
+
+def main(argv: list[str] | None = None) -> None:
+    # imported here, dopynion.record imports this module
+    from dopynion.record import Record  # noqa: PLC0415
+
+    parser = argparse.ArgumentParser(
+        prog="python -m dopynion.codec",
+        description="Convert game records between the JSON and binary formats.",
+    )
+    parser.add_argument("direction", choices=["to-binary", "to-json"])
+    parser.add_argument("source", type=Path)
+    parser.add_argument("destination", type=Path)
+    args = parser.parse_args(argv)
+    game_record = Record.load(args.source)
+    if args.direction == "to-binary":
+        args.destination.write_bytes(encode(game_record))
+    else:
+        args.destination.write_text(
+            game_record.model_dump_json(indent=None),
+            encoding="utf-8",
+        )
+
+
+if __name__ == "__main__":
+    main()
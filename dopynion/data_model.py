@@ -1,6 +1,6 @@
 from datetime import datetime
 from enum import StrEnum
-from typing import Literal
+from typing import Annotated, Any, Literal
 
 from pydantic import BaseModel, Field
 
@@ -826,14 +826,102 @@ class HookResultRecord(BaseModel):
     result: HookCallResult
 
 
+RecordEvent = ActionRecord | ErrorRecord | HookCallRecord | HookResultRecord
+
+
 class PlayerTurnRecord(BaseModel):
-    actions: list[ActionRecord | ErrorRecord | HookCallRecord | HookResultRecord] = (
-        Field(default_factory=list)
-    )
+    actions: list[RecordEvent] = Field(default_factory=list)
 
 
 class GameRecord(BaseModel):
     date: datetime
+    seed: int | None = None
     stock: Cards
     turns: list[PlayerTurnRecord] = Field(default_factory=list)
     scores: dict[str, int] = Field(default_factory=dict)
+
+
+# lines of the JSON Lines record format, one event per line
+
+
+class HeaderLine(BaseModel):
+    kind: Literal["header"] = "header"
+    date: datetime
+
+
+class StockLine(BaseModel):
+    kind: Literal["stock"] = "stock"
+    stock: Cards
+    seed: int | None = None
+
+
+class TurnLine(BaseModel):
+    kind: Literal["turn"] = "turn"
+
+
+class EventLine(BaseModel):
+    kind: Literal["event"] = "event"
+    event: RecordEvent
+
+
+class EventRefLine(BaseModel):
+    """Event without its player, same as in the previous event of this player."""
+
+    kind: Literal["event_ref"] = "event_ref"
+    player: str
+    event: dict[str, Any]
+
+
+class ScoresLine(BaseModel):
+    kind: Literal["scores"] = "scores"
+    scores: dict[str, int]
+
+
+RecordLine = Annotated[
+    HeaderLine | StockLine | TurnLine | EventLine | EventRefLine | ScoresLine,
+    Field(discriminator="kind"),
+]
+
+
+# replay record format, the full GameRecord is rebuilt by replaying the game
+
+ReplayCommand = (
+    tuple[int, str]
+    | tuple[int, Literal["HOOK"], HookCallResult]
+    | tuple[int, Literal["HOOK ERROR"], str, str]
+)
+RandomBackend = Literal["random", "numpy"]
+
+
+class ReplayRecord(BaseModel):
+    """
+    Seed, kingdom and decisions of a game.
+
+    Each command is the index of the player in players and either an action
+    ("START OF TURN", "BUY copper"...), "HOOK" with the result of the hook, or
+    "HOOK ERROR" with the type and the message of the exception of the hook.
+    """
+
+    kind: Literal["replay"] = "replay"
+    date: datetime
+    seed: int
+    random_backend: RandomBackend = "random"
+    players: list[str]
+    kingdom: list[CardName]
+    commands: list[ReplayCommand] = Field(default_factory=list)
+
+
+class RecordIndex(BaseModel):
+    """
+    Byte offsets of the lines of a JSON Lines record, saved next to it.
+
+    snapshots gives, for each turn, the offsets of the last event line with the
+    full snapshot of each player before this turn (needed by event_ref lines).
+    """
+
+    size: int = 0
+    stock: int | None = None
+    scores: int | None = None
+    turns: list[int] = Field(default_factory=list)
+    snapshots: list[dict[str, int]] = Field(default_factory=list)
+    last_snapshots: dict[str, int] = Field(default_factory=dict)
@@ -0,0 +1,334 @@
+"""
+Inverted index of the events of the game records, in a SQLite database.
+
+The index maps (card, kind, player, turn) to the games where it happened, so
+that questions like "games where toto bought a witch before turn 5" or "games
+with a chapel in the kingdom" are answered without parsing the records. The
+kinds are "buy", "action", "kingdom" (with an empty player and turn 0) and, for
+the hooks answered with a card, the name of the hook. The turn of an event is
+the number of turns of its player so far, 1 for the first one. The buys and
+actions that failed are not indexed (the errors they triggered, like the error
+of a hook of the player, do not make them fail), and the cards are found by
+their name in any case.
+
+Record adds a game to the index of records_dir when the game is saved finished.
+Index the records not indexed yet or modified since they were indexed (so that
+a game indexed in progress is indexed again), rebuild the index or query it with
+``python -m dopynion.event_index update|rebuild|query [--records-dir DIR]``.
+"""
+
+import argparse
+import os
+import sqlite3
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from types import TracebackType
+from typing import NamedTuple, Self
+
+from dopynion.cards import card_infos_by_name, card_names, find_card_id
+from dopynion.data_model import (
+    ActionRecord,
+    CardName,
+    Cards,
+    ErrorRecord,
+    HookCallRecord,
+    HookResultRecord,
+    PlayerTurnRecord,
+    RecordEvent,
+)
+
+EVENT_INDEX_NAME = "events.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    size INTEGER,
+    mtime INTEGER
+);
+CREATE TABLE IF NOT EXISTS events (
+    card TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    player TEXT NOT NULL,
+    turn INTEGER NOT NULL,
+    game INTEGER NOT NULL REFERENCES games (id) ON DELETE CASCADE,
+    PRIMARY KEY (card, kind, player, turn, game)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS events_player ON events (player, kind);
+CREATE INDEX IF NOT EXISTS events_game ON events (game);
+"""
+
+_ACTION_KINDS = {"BUY": "buy", "ACTION": "action"}
+# errors of what a command triggered (the card effect, a hook, an elimination),
+# recorded by ErrorManager and by the record itself, not of the command
+_TRIGGERED_ERRORS = ("Error: ", "Hook error", "Elimination")
+
+
+class GameEvent(NamedTuple):
+    card: str
+    kind: str
+    player: str
+    turn: int
+
+
+def _kingdom_events(stock: Cards) -> Iterator[GameEvent]:
+    for card_name in stock.quantities:
+        info = card_infos_by_name.get(card_name)
+        if info is not None and info.is_kingdom:
+            yield GameEvent(card_name.value, "kingdom", "", 0)
+
+
+def _command_event(event: ActionRecord, turn: int) -> GameEvent | None:
+    verb, _, card = event.action.partition(" ")
+    card_id = find_card_id(card)
+    if verb not in _ACTION_KINDS or card_id is None:
+        return None
+    return GameEvent(
+        card_names[card_id].value, _ACTION_KINDS[verb], event.player.name, turn
+    )
+
+
+def _is_failure(event: RecordEvent, command: GameEvent) -> bool:
+    return (
+        isinstance(event, ErrorRecord)
+        and event.type == "error"
+        and event.player.name == command.player
+        and not event.error.startswith(_TRIGGERED_ERRORS)
+    )
+
+
+def _version(stat: os.stat_result | None) -> tuple[int | None, int | None]:
+    if stat is None:
+        return None, None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def game_events(
+    stock: Cards,
+    turns: Iterable[PlayerTurnRecord],
+) -> Iterator[GameEvent]:
+    """
+    Extract the indexed events of a game.
+
+    Yields:
+        The kingdom cards, then the buys, actions and cards chosen in hooks.
+
+    """
+    yield from _kingdom_events(stock)
+    nb_turns: dict[str, int] = {}
+    hook_names: dict[str, str] = {}
+    for turn in turns:
+        if turn.actions:
+            owner = turn.actions[0].player.name
+            nb_turns[owner] = nb_turns.get(owner, 0) + 1
+        # a buy or an action is indexed once it is known not to have failed
+        command: GameEvent | None = None
+        for event in turn.actions:
+            player = event.player.name
+            if command is not None and not _is_failure(event, command):
+                yield command
+            command = None
+            if isinstance(event, ActionRecord):
+                command = _command_event(event, nb_turns.get(player, 0))
+            elif isinstance(event, HookCallRecord):
+                hook_names[player] = event.name
+            elif isinstance(event, HookResultRecord) and isinstance(
+                event.result,
+                CardName,
+            ):
+                kind = hook_names.get(player, "hook")
+                yield GameEvent(
+                    event.result.value, kind, player, nb_turns.get(player, 0)
+                )
+        if command is not None:
+            yield command
+
+
+class EventIndex:
+    """SQLite inverted index of the game events, usable as a context manager."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        self._connection.executescript(_SCHEMA)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def add(
+        self,
+        name: str,
+        events: Iterable[GameEvent],
+        stat: os.stat_result | None = None,
+    ) -> None:
+        """
+        Index the events of a game, replacing its previous events.
+
+        stat is the status of the record file when the events were read, so
+        that update() indexes the game again once the file is modified.
+        """
+        with self._connection:
+            self._add(name, events, stat)
+
+    def _add(
+        self,
+        name: str,
+        events: Iterable[GameEvent],
+        stat: os.stat_result | None = None,
+    ) -> None:
+        self._connection.execute("DELETE FROM games WHERE name = ?", (name,))
+        game_id = self._connection.execute(
+            "INSERT INTO games (name, size, mtime) VALUES (?, ?, ?)",
+            (name, *_version(stat)),
+        ).lastrowid
+        self._connection.executemany(
+            "INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?, ?)",
+            ((*event, game_id) for event in events),
+        )
+
+    def remove(self, names: Iterable[str]) -> None:
+        """Remove the events of games, ignoring the games not indexed."""
+        with self._connection:
+            self._connection.executemany(
+                "DELETE FROM games WHERE name = ?",
+                ((name,) for name in names),
+            )
+
+    def update(self, records_dir: Path) -> int:
+        """
+        Index the records of records_dir not indexed yet or modified since.
+
+        The archived records of records_dir are indexed too.
+
+        Returns:
+            The number of indexed games.
+
+        """
+        # imported here, dopynion.record and dopynion.retention import this module
+        from dopynion.record import RecordReader  # noqa: PLC0415
+        from dopynion.retention import Archives  # noqa: PLC0415
+
+        indexed = {
+            name: (size, mtime)
+            for name, size, mtime in self._connection.execute(
+                "SELECT name, size, mtime FROM games",
+            )
+        }
+        nb_games = 0
+        with self._connection:
+            for path in sorted(records_dir.glob("game__*.dop")):
+                stat = path.stat()
+                if not stat.st_size or indexed.get(path.name) == _version(stat):
+                    continue
+                reader = RecordReader(path)
+                self._add(
+                    path.name,
+                    game_events(reader.stock(), reader.turns()),
+                    stat,
+                )
+                nb_games += 1
+            archives = Archives(records_dir)
+            for name, game_record in archives.games(archives.index.keys() - indexed):
+                self._add(name, game_events(game_record.stock, game_record.turns))
+                nb_games += 1
+        return nb_games
+
+    def rebuild(self, records_dir: Path) -> int:
+        """
+        Replace the content of the index with the records of records_dir.
+
+        Returns:
+            The number of indexed games.
+
+        """
+        with self._connection:
+            self._connection.execute("DELETE FROM games")
+        return self.update(records_dir)
+
+    def games(
+        self,
+        *,
+        card: str | None = None,
+        kind: str | None = None,
+        player: str | None = None,
+        before_turn: int | None = None,
+        after_turn: int | None = None,
+    ) -> set[str]:
+        """
+        Find the games with an event matching all the given criteria.
+
+        For instance, games(card=CardName.WITCH, kind="buy", player="toto",
+        before_turn=5) or games(card=CardName.CHAPEL, kind="kingdom").
+
+        Returns:
+            The names of the record files of the games.
+
+        """
+        if card is not None and (card_id := find_card_id(card)) is not None:
+            card = card_names[card_id].value
+        conditions = []
+        parameters: list[str | int] = []
+        for column, value in (("card", card), ("kind", kind), ("player", player)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                parameters.append(value)
+        if before_turn is not None:
+            conditions.append("turn < ?")
+            parameters.append(before_turn)
+        if after_turn is not None:
+            conditions.append("turn > ?")
+            parameters.append(after_turn)
+        query = "SELECT DISTINCT name FROM events JOIN games ON game = games.id"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        return {name for (name,) in self._connection.execute(query, parameters)}
+
+
+def main(argv: list[str] | None = None) -> None:
+    # imported here, dopynion.record imports this module
+    from dopynion.record import records_dir  # noqa: PLC0415
+
+    parser = argparse.ArgumentParser(
+        prog="python -m dopynion.event_index",
+        description="Update, rebuild or query the index of the game events.",
+    )
+    parser.add_argument("command", choices=["update", "rebuild", "query"])
+    parser.add_argument("--records-dir", type=Path, default=records_dir)
+    parser.add_argument("--card")
+    parser.add_argument("--kind")
+    parser.add_argument("--player")
+    parser.add_argument("--before-turn", type=int)
+    parser.add_argument("--after-turn", type=int)
+    args = parser.parse_args(argv)
+    with EventIndex(args.records_dir / EVENT_INDEX_NAME) as event_index:
+        if args.command == "update":
+            print(f"{event_index.update(args.records_dir)} games indexed")
+        elif args.command == "rebuild":
+            print(f"{event_index.rebuild(args.records_dir)} games indexed")
+        else:
+            games = event_index.games(
+                card=args.card,
+                kind=args.kind,
+                player=args.player,
+                before_turn=args.before_turn,
+                after_turn=args.after_turn,
+            )
+            for name in sorted(games):
+                print(name)
+
+
+if __name__ == "__main__":
+    main()
@@ -28,3 +28,19 @@ class NotEnoughMoneyError(InvalidCommandError):
 
 class InvalidDiscardError(InvalidCommandError):
     pass
+
+
+class InconsistentCardContainerError(Exception):
+    pass
+
+
+class InvalidRecordError(Exception):
+    pass
+
+
+class HookError(Exception):
+    """Replayed error of a hook, whose type cannot be created again."""
+
+    def __init__(self, type_name: str, message: str) -> None:
+        super().__init__(message)
+        self.type_name = type_name
@@ -1,24 +1,60 @@
+import copy
 import operator
 import random
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from dopynion.cards import Card, CardContainer, CardName
+from dopynion.cards import Card, CardContainer, CardName, SupplyIndex, card_ids
 from dopynion.constants import MAX_NB_PLAYERS
 from dopynion.data_model import Game as GameData
+from dopynion.data_model import RandomBackend
 from dopynion.exceptions import (
     AddPlayerDuringGameError,
     InvalidCommandError,
 )
 from dopynion.player import Player
-from dopynion.record import Record
+from dopynion.record import NullRecord, Record, RecordBackend
+
+if TYPE_CHECKING:
+    from numpy.random import Generator
+
+
+_NUMPY_SEED_MASK = 2**64 - 1
 
 
 class Game:
-    def __init__(self) -> None:
-        self.record = Record()
+    """
+    A game, with its own random generator, seeded by seed (random if None).
+
+    The generator picks the kingdom cards and shuffles the decks, so that a
+    game is reproduced by its seed, whatever the other games of the process.
+    With the "numpy" random_backend, the decks are shuffled by a NumPy
+    Generator seeded by seed (NumPy is an optional dependency), faster for very
+    big decks. NumPy only takes non-negative seeds, so it is seeded by the 64
+    low bits of seed.
+    """
+
+    def __init__(
+        self,
+        record: RecordBackend | None = None,
+        seed: int | None = None,
+        random_backend: RandomBackend = "random",
+    ) -> None:
+        self.record = Record() if record is None else record
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.random = random.Random(self.seed)  # noqa: S311
+        self.random_backend = random_backend
+        self.shuffle_random: random.Random | Generator = self.random
+        if random_backend == "numpy":
+            # imported here, NumPy is an optional dependency
+            import numpy as np  # noqa: PLC0415
+
+            self.shuffle_random = np.random.default_rng(self.seed & _NUMPY_SEED_MASK)
         self.players: list[Player] = []
         self.started = False
-        self.stock = CardContainer()
+        self.kingdom: list[CardName] = []
+        self.supply = SupplyIndex()
+        self.stock = CardContainer(self.supply)
         if CardName.PLATINUM in Card.types:
             self.stock.append_several(12, CardName.PLATINUM)
         self.stock.append_several(30, CardName.GOLD)
@@ -32,18 +68,62 @@ class Game:
         if CardName.CURSE in Card.types:
             self.stock.append_several(30, CardName.CURSE)
 
+    def clone(self) -> "Game":
+        """
+        Copy the game, for instance to explore moves without changing it.
+
+        Only the mutable state is copied: the piles (copied on write), the
+        counters and state machines of the players and the state of the random
+        generators. The card tables are shared, as well as the hooks of the
+        players. The clone is not recorded (NullRecord).
+
+        Returns:
+            The copy of the game.
+
+        """
+        new = Game.__new__(Game)
+        new.record = NullRecord()
+        new.seed = self.seed
+        # no __init__, that would seed the generator before setstate
+        new.random = random.Random.__new__(random.Random)  # noqa: S311
+        new.random.setstate(self.random.getstate())
+        new.random_backend = self.random_backend
+        new.shuffle_random = new.random
+        if self.shuffle_random is not self.random:
+            new.shuffle_random = copy.deepcopy(self.shuffle_random)
+        new.started = self.started
+        new.kingdom = self.kingdom.copy()
+        new.supply = self.supply.copy()
+        new.stock = self.stock.copy(new.supply)
+        new.players = [player.clone(new) for player in self.players]
+        return new
+
     def __getattr__(self, name: str) -> int:
         if name.endswith("_qty"):
             return getattr(self.stock, name)
         raise AttributeError
 
+    def _set_stock_quantity(self, card_name: CardName, qty: int) -> None:
+        if card_name not in Card.types:
+            return
+        card_id = card_ids[card_name]
+        missing = qty - self.stock.quantity_of_id(card_id)
+        if missing > 0:
+            self.stock.append_several(missing, card_name)
+        for _ in range(-missing):
+            self.stock.remove_id(card_id)
+
     def add_player(self, player: Player) -> None:
         if self.started:
             raise AddPlayerDuringGameError
         if len(self.players) < MAX_NB_PLAYERS:
             self.players.append(player)
             player.game = self
-            self.copper_qty -= 7  # type: ignore[attr-defined]
+            player.deal()
+            self._set_stock_quantity(
+                CardName.COPPER,
+                self.stock.quantity(CardName.COPPER) - 7,
+            )
         else:
             msg = f"At most {MAX_NB_PLAYERS} players"
             raise InvalidCommandError(msg)
@@ -51,15 +131,15 @@ class Game:
     def start(self) -> None:
         self.started = True
         if len(self.players) <= 2:  # noqa: PLR2004
-            self.estate_qty = 8
-            self.duchy_qty = 8
-            self.province_qty = 8
-            self.colony_qty = 8
-            self.curse_qty = 10
+            self._set_stock_quantity(CardName.ESTATE, 8)
+            self._set_stock_quantity(CardName.DUCHY, 8)
+            self._set_stock_quantity(CardName.PROVINCE, 8)
+            self._set_stock_quantity(CardName.COLONY, 8)
+            self._set_stock_quantity(CardName.CURSE, 10)
         elif len(self.players) == 3:  # noqa: PLR2004
-            self.curse_qty = 20
+            self._set_stock_quantity(CardName.CURSE, 20)
         elif len(self.players) == 4:  # noqa: PLR2004
-            self.curse_qty = 30
+            self._set_stock_quantity(CardName.CURSE, 30)
         possible_kingdoms: list[CardName] = [
             CardName[name.upper()]
             for name, class_ in Card.types.items()
@@ -68,20 +148,30 @@ class Game:
         for _ in range(10):
             if not possible_kingdoms:
                 break
-            card_name = random.choice(possible_kingdoms)  # noqa: S311
+            card_name = self.random.choice(possible_kingdoms)
+            self.kingdom.append(card_name)
             if card_name == CardName.GARDENS:
-                self.stock.append_several(self.duchy_qty, card_name)
+                self.stock.append_several(
+                    self.stock.quantity(CardName.DUCHY),
+                    card_name,
+                )
             else:
                 self.stock.append_several(10, card_name)
             possible_kingdoms.remove(card_name)
+        self.record.add_setup(
+            self.seed,
+            [player.name for player in self.players],
+            self.kingdom,
+            self.random_backend,
+        )
         self.record.add_stock(self.stock.state)
         self.save()
 
     @property
     def finished(self) -> bool:
         return (
-            (self.stock.province_qty == 0)
-            or (self.stock.colony_qty == 0 and CardName.COLONY in Card.types)
+            (CardName.PROVINCE not in self.stock)
+            or (CardName.COLONY not in self.stock and CardName.COLONY in Card.types)
             or self.stock.three_empty_piles
             or all(player.eliminated for player in self.players)
         )
@@ -104,5 +194,5 @@ class Game:
         ret["leaderboard"] = leaderboard
         return ret
 
-    def save(self) -> Path:
+    def save(self) -> Path | None:
         return self.record.save(self.state)
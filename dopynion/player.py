@@ -5,7 +5,14 @@ from abc import ABC, abstractmethod
 from enum import Enum
 from typing import TYPE_CHECKING, TypeVar, cast, overload
 
-from dopynion.cards import Card, CardContainer
+from dopynion.cards import (
+    Card,
+    CardContainer,
+    Possession,
+    card_infos,
+    card_infos_by_name,
+    find_card_id,
+)
 from dopynion.data_model import (
     CardName,
     CardNameAndHand,
@@ -25,7 +32,7 @@ from dopynion.exceptions import (
 )
 
 if TYPE_CHECKING:
-    from collections.abc import Callable, Generator
+    from collections.abc import Callable, Generator, Iterable
 
     import dopynion.game
 
@@ -161,17 +168,17 @@ class Player:
     def __init__(self, name: str) -> None:
         self.game: dopynion.game.Game = None  # type: ignore[assignment]
         self.name = name
-        self.deck = CardContainer()
+        self.possession = Possession()
+        self.deck = CardContainer(self.possession)
         self.deck.append_several(6, CardName.COPPER)
         if CardName.CURSEDGOLD in Card.types:
             self.deck.append(CardName.CURSEDGOLD)
         else:
             self.deck.append(CardName.COPPER)
         self.deck.append_several(3, CardName.ESTATE)
-        self.deck.shuffle()
-        self.hand = CardContainer()
-        self.discard = CardContainer()
-        self.played_cards = CardContainer()
+        self.hand = CardContainer(self.possession)
+        self.discard = CardContainer(self.possession)
+        self.played_cards = CardContainer(self.possession)
         self.actions_left: int = 0
         self.purchases_left: int = 0
         self.money: int = 0
@@ -182,6 +189,34 @@ class Player:
         self.hooks: PlayerHooks = DefaultPlayerHooks()
         self._adjust()
 
+    def clone(self, game: dopynion.game.Game) -> Player:
+        """
+        Copy the player for a clone of its game, see Game.clone.
+
+        The piles are copied on write, the hooks are shared.
+
+        Returns:
+            The copy of the player, in game.
+
+        """
+        new = Player.__new__(Player)
+        new.game = game
+        new.name = self.name
+        new.possession = possession = self.possession.copy()
+        new.deck = self.deck.copy(possession)
+        new.hand = self.hand.copy(possession)
+        new.discard = self.discard.copy(possession)
+        new.played_cards = self.played_cards.copy(possession)
+        new.actions_left = self.actions_left
+        new.purchases_left = self.purchases_left
+        new.money = self.money
+        new.playing = self.playing
+        new.state_machine = self.state_machine
+        new.eliminated = self.eliminated
+        new.nb_hireling = self.nb_hireling
+        new.hooks = self.hooks
+        return new
+
     def __repr__(self) -> str:
         ret = f"Player: {self.name}\n"
         ret += f" - actions left: {self.actions_left}, "
@@ -207,16 +242,13 @@ class Player:
 
     def start_turn(self) -> None:
         logger.debug("start turn (%s, %d)", self.name, id(self))
-        self.game.record.start_turn()
+        self.game.record.start_turn(self)
         self.playing = True
         self.state_machine = State.ACTION
         self.actions_left = 1
         self.purchases_left = 1
         self.money = 0
-        for _ in range(self.nb_hireling):
-            card_name = self.take_one_card_from_deck()
-            if card_name is not None:
-                self.hand.append(card_name)
+        self.draw(self.nb_hireling)
         self._check_for_action_to_buy_transition()
 
     def end_turn(self) -> None:
@@ -228,36 +260,62 @@ class Player:
     def take_one_card_from_deck(self) -> CardName | None:
         if not self.deck:
             self.discard.empty_to(self.deck)
-            self.deck.shuffle()
+            self.deck.shuffle(self.game.shuffle_random)
         if not self.deck:
             return None
         return self.deck.pop(0)
 
+    def draw(self, nb_cards: int, destination: CardContainer | None = None) -> int:
+        """
+        Draw nb_cards from the deck into the hand (or destination).
+
+        The discard is shuffled into the deck at most once.
+
+        Returns:
+            The number of drawn cards.
+
+        """
+        if destination is None:
+            destination = self.hand
+        nb_drawn_cards = self.deck.move_top_to(destination, nb_cards)
+        if nb_drawn_cards < nb_cards and self.discard:
+            self.discard.empty_to(self.deck)
+            self.deck.shuffle(self.game.shuffle_random)
+            nb_drawn_cards += self.deck.move_top_to(
+                destination,
+                nb_cards - nb_drawn_cards,
+            )
+        return nb_drawn_cards
+
+    def deal(self) -> None:
+        """Shuffle the initial cards with the random generator of the game."""
+        self.hand.empty_to(self.deck)
+        self.deck.shuffle(self.game.shuffle_random)
+        self.draw(5)
+
     def _adjust(self) -> None:
         self.played_cards.empty_to(self.discard)
         self.hand.empty_to(self.discard)
-        for _ in range(5):
-            card_name = self.take_one_card_from_deck()
-            if card_name is not None:
-                self.hand.append(card_name)
+        self.draw(5)
         self.state_machine = State.ADJUST
 
     def _prepare_money(self, money: int) -> None:
-        money_cards = self.hand.money_cards
-        money_cards.sort(
+        money_cards = sorted(
+            self.hand.money_cards.distinct(),
             key=lambda card_name: (
                 card_name == CardName.CURSEDGOLD,
-                Card.class_(card_name).money,
+                card_infos_by_name[card_name].money,
             ),
         )
-        while self.money < money:
-            if not money_cards:
-                break
-            money_card = money_cards.pop(0)
-            self.money += Card.class_(money_card).money
-            Card.class_(money_card).buy(self)
-            self.hand.remove(money_card)
-            self.played_cards.append(money_card)
+        for money_card in money_cards:
+            card = card_infos_by_name[money_card]
+            quantity = self.hand.quantity(money_card)
+            nb_played_cards = 0
+            while self.money < money and nb_played_cards < quantity:
+                self.money += card.money
+                card.class_.buy(self)
+                nb_played_cards += 1
+            self.hand.move_to(self.played_cards, money_card, nb_played_cards)
 
     def buy(self, card_name: CardName) -> None:
         logger.debug("> BUY %s", card_name)
@@ -266,21 +324,22 @@ class Player:
             msg = "No more buy available"
             self.game.record.add_error(msg, self)
             raise InvalidBuyError(msg)
-        quantity = getattr(self.game.stock, card_name + "_qty")
-        if not quantity:
+        card_id = find_card_id(card_name)
+        if card_id is None or not self.game.stock.quantity_of_id(card_id):
             self.game.record.add_error(f"Invalid buy, no {card_name} in stock", self)
             raise InvalidBuyError(card_name)
-        card = Card.class_(card_name)
+        card = card_infos[card_id]
         if self.money + self.hand.money < card.cost:
             self.game.record.add_error("Invalid buy, not enough money", self)
             raise NotEnoughMoneyError
         self._prepare_money(card.cost)
         self.money -= card.cost
-        nb_bought_cards = 2 if card_name == CardName.PORT else 1
-        for _ in range(nb_bought_cards):
-            if card_name in self.game.stock:
-                self.game.stock.remove(card_name)
-                self.discard.append(card_name)
+        nb_bought_cards = 2 if card.card_name == CardName.PORT else 1
+        self.game.stock.move_id_to(
+            self.discard,
+            card_id,
+            min(nb_bought_cards, self.game.stock.quantity_of_id(card_id)),
+        )
         self.purchases_left -= 1
         self._check_for_buy_to_adjust_transition()
 
@@ -293,14 +352,14 @@ class Player:
             logger.debug(self.state)
             self.game.record.add_error("Tried action during buy phase", self)
             raise ActionDuringBuyError(card_name)
-        if card_name not in self.hand:
+        card_id = find_card_id(card_name)
+        if card_id is None or not self.hand.quantity_of_id(card_id):
             logger.debug(self.state)
             self.game.record.add_error(f"Invalid action, {card_name} not in hand", self)
             raise InvalidActionError(card_name)
         self.actions_left -= 1
-        self.hand.remove(card_name)
-        self.played_cards.append(card_name)
-        Card.class_(card_name).action(self)
+        self.hand.move_id_to(self.played_cards, card_id)
+        card_infos[card_id].class_.action(self)
         self._check_for_action_to_buy_transition()
 
     @property
@@ -313,31 +372,40 @@ class Player:
 
     def eliminate(self) -> None:
         self.eliminated = True
-        self.game.record.add_error("Elimination", self)
+        self.game.record.add_elimination(self)
 
     def score(self) -> dict:
-        cards = self.hand + self.discard + self.deck + self.played_cards
         if self.eliminated:
             return {"score": -10000}
+        possession = self.possession
         return {
-            "colony_qty": cards.colony_qty,
-            "province_qty": cards.province_qty,
-            "duchy_qty": cards.duchy_qty,
-            "estate_qty": cards.estate_qty,
-            "curse_qty": cards.curse_qty,
-            "gardens_qty": cards.gardens_qty,
-            "score": sum(Card.class_(card_name).victory_points for card_name in cards)
-            + cards.gardens_qty * (len(cards) // 10)
-            + cards.fairgrounds_qty * (len(set(cards)) // 5),
+            "colony_qty": possession.quantity(CardName.COLONY),
+            "province_qty": possession.quantity(CardName.PROVINCE),
+            "duchy_qty": possession.quantity(CardName.DUCHY),
+            "estate_qty": possession.quantity(CardName.ESTATE),
+            "curse_qty": possession.quantity(CardName.CURSE),
+            "gardens_qty": possession.quantity(CardName.GARDENS),
+            "score": possession.score,
         }
 
     def discard_one_card_from_hand(self, card_name: CardName) -> None:
-        if card_name not in self.hand:
+        self.game.record.add_action(f"DISCARD {card_name}", self)
+        card_id = find_card_id(card_name)
+        if card_id is None or not self.hand.quantity_of_id(card_id):
             msg = f"{card_name} not in player hand"
             self.game.record.add_error("Invalid discard, " + msg, self)
             raise InvalidDiscardError(msg)
-        self.hand.remove(card_name)
-        self.discard.append(card_name)
+        self.hand.move_id_to(self.discard, card_id)
+
+    def discard_cards(self, card_names: Iterable[CardName]) -> None:
+        card_names = list(card_names)
+        self.game.record.add_action(f"DISCARD {' '.join(card_names)}", self)
+        try:
+            self.hand.move_several_to(self.discard, card_names)
+        except ValueError as error:
+            msg = f"{error} not in player hand"
+            self.game.record.add_error("Invalid discard, " + msg, self)
+            raise InvalidDiscardError(msg) from error
 
     def other_players(self) -> Generator[Player, None, None]:
         for other_player in self.game.players:
@@ -359,11 +427,15 @@ class Player:
         args: HookArg | None = None,
     ) -> HookRet:
         self.game.record.add_hook_call(self, hook.__name__, args)
-        if args is None:
-            zero_arg_hook = cast("Callable[[], HookRet]", hook)
-            result = zero_arg_hook()
-        else:
-            arg_hook = cast("Callable[[HookArg], HookRet]", hook)
-            result = arg_hook(args)
+        try:
+            if args is None:
+                zero_arg_hook = cast("Callable[[], HookRet]", hook)
+                result = zero_arg_hook()
+            else:
+                arg_hook = cast("Callable[[HookArg], HookRet]", hook)
+                result = arg_hook(args)
+        except Exception as error:
+            self.game.record.add_hook_error(self, error)
+            raise
         self.game.record.add_hook_result(self, result)
         return result
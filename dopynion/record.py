@@ -1,62 +1,584 @@
+import atexit
+import contextlib
 import datetime
+import json
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
+from enum import IntEnum
 from pathlib import Path
-from typing import Literal
+from typing import BinaryIO, Literal, cast
 from zoneinfo import ZoneInfo
 
+from pydantic import BaseModel, TypeAdapter
+
+from dopynion import codec
+from dopynion.catalog import CATALOG_NAME, Catalog, catalog_entry
 from dopynion.data_model import (
     ActionRecord,
+    CardName,
     Cards,
     ErrorRecord,
+    EventLine,
+    EventRefLine,
     Game,
     GameRecord,
+    HeaderLine,
     HookCallArgs,
     HookCallRecord,
     HookCallResult,
     HookResultRecord,
     PlayerTurnRecord,
+    RandomBackend,
+    RecordEvent,
+    RecordIndex,
+    RecordLine,
+    ReplayRecord,
+    ScoresLine,
+    StockLine,
+    TurnLine,
 )
+from dopynion.data_model import Player as PlayerData
+from dopynion.event_index import EVENT_INDEX_NAME, EventIndex, game_events
+from dopynion.exceptions import HookError
 from dopynion.player import Player
 
 records_dir = Path.cwd() / "games"
-records_dir.mkdir(parents=True, exist_ok=True)
+RECORD_NAME_FORMAT = "game__%Y_%m_%d__%H_%M_%S_%f.dop"
 
+RecordFormat = Literal["json", "jsonl", "replay"]
 
-class Record:
-    def __init__(self) -> None:
-        now = datetime.datetime.now(tz=ZoneInfo("Europe/Paris"))
-        now_str = now.strftime("%Y_%m_%d__%H_%M_%S_%f")
-        self._file = records_dir / f"game__{now_str}.dop"
-        if self._file.exists():
-            msg = f"game record is already created ({self._file})"
+
+class RecordLevel(IntEnum):
+    """What is recorded, each level recording also what the lower ones do."""
+
+    SCORES = 0
+    ERRORS = 1
+    COMMANDS = 2
+    HOOKS = 3
+
+
+_record_line_adapter: TypeAdapter[RecordLine] = TypeAdapter(RecordLine)
+_record_event_adapter: TypeAdapter[RecordEvent] = TypeAdapter(RecordEvent)
+
+
+def _load_lines(lines: list[str]) -> GameRecord:
+    header = HeaderLine.model_validate_json(lines[0])
+    game_record = GameRecord(date=header.date, stock=Cards())
+    players: dict[str, PlayerData] = {}
+    for raw_line in lines[1:]:
+        if not raw_line:
+            continue
+        line = _record_line_adapter.validate_json(raw_line)
+        if isinstance(line, EventLine):
+            players[line.event.player.name] = line.event.player
+            game_record.turns[-1].actions.append(line.event)
+        elif isinstance(line, EventRefLine):
+            event = _record_event_adapter.validate_python(
+                {**line.event, "player": players[line.player]},
+            )
+            game_record.turns[-1].actions.append(event)
+        elif isinstance(line, TurnLine):
+            game_record.turns.append(PlayerTurnRecord())
+        elif isinstance(line, StockLine):
+            game_record.stock = line.stock
+            game_record.seed = line.seed
+        elif isinstance(line, ScoresLine):
+            game_record.scores = line.scores
+    return game_record
+
+
+_HEADER_PREFIX = b'{"kind":"header"'
+_TURN_PREFIX = b'{"kind":"turn"'
+_EVENT_PREFIX = b'{"kind":"event",'
+_STOCK_PREFIX = b'{"kind":"stock"'
+_SCORES_PREFIX = b'{"kind":"scores"'
+_PLAYER_NAME = '"player":{"name":'
+_json_decoder = json.JSONDecoder()
+
+
+class RecordReader:
+    """
+    Lazy reader of a game record.
+
+    JSON Lines records are read line by line. A sidecar index (the .idx file
+    next to the record, see RecordIndex) gives the offsets of the turns, of the
+    stock and of the scores, so that turn(n) and scores() only parse the lines
+    they need. The index is built on first use, without parsing the lines, and
+    updated incrementally as the record grows. When the index file cannot be
+    written (a read-only directory), the index is only kept in memory.
+
+    Records in the other formats are loaded whole on first use.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.index_path = path.with_name(path.name + ".idx")
+        with path.open("rb") as file:
+            self._lines = file.read(len(_HEADER_PREFIX)) == _HEADER_PREFIX
+        self._index: RecordIndex | None = None
+        self._game_record: GameRecord | None = None
+
+    def _loaded(self) -> GameRecord:
+        if self._game_record is None:
+            self._game_record = Record.load(self.path)
+        return self._game_record
+
+    @property
+    def index(self) -> RecordIndex:
+        """
+        Index of the record, read from the index file and updated if needed.
+
+        Returns:
+            The index, empty if the record is not in the JSON Lines format.
+
+        """
+        if not self._lines:
+            return RecordIndex()
+        size = self.path.stat().st_size
+        if self._index is None and self.index_path.exists():
+            self._index = RecordIndex.model_validate_json(self.index_path.read_bytes())
+        if self._index is None or self._index.size > size:
+            self._index = RecordIndex()
+        if self._index.size < size:
+            self._update_index(self._index)
+            with contextlib.suppress(OSError):
+                self.index_path.write_text(
+                    self._index.model_dump_json(),
+                    encoding="utf-8",
+                )
+        return self._index
+
+    def _update_index(self, index: RecordIndex) -> None:
+        with self.path.open("rb") as file:
+            file.seek(index.size)
+            offset = index.size
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break  # being written
+                if line.startswith(_TURN_PREFIX):
+                    index.turns.append(offset)
+                    index.snapshots.append(index.last_snapshots.copy())
+                elif line.startswith(_EVENT_PREFIX):
+                    text = line.decode()
+                    start = text.index(_PLAYER_NAME) + len(_PLAYER_NAME)
+                    name, _ = _json_decoder.raw_decode(text, start)
+                    index.last_snapshots[name] = offset
+                elif line.startswith(_STOCK_PREFIX):
+                    index.stock = offset
+                elif line.startswith(_SCORES_PREFIX):
+                    index.scores = offset
+                offset += len(line)
+            index.size = offset
+
+    @staticmethod
+    def _read_line(file: BinaryIO, offset: int) -> RecordLine:
+        file.seek(offset)
+        return _record_line_adapter.validate_json(file.readline())
+
+    def date(self) -> datetime.datetime:
+        if not self._lines:
+            return self._loaded().date
+        with self.path.open("rb") as file:
+            return cast("HeaderLine", self._read_line(file, 0)).date
+
+    @property
+    def nb_turns(self) -> int:
+        if not self._lines:
+            return len(self._loaded().turns)
+        return len(self.index.turns)
+
+    def _stock_line(self) -> StockLine:
+        if self.index.stock is None:
+            return StockLine(stock=Cards())
+        with self.path.open("rb") as file:
+            return cast("StockLine", self._read_line(file, self.index.stock))
+
+    def stock(self) -> Cards:
+        if not self._lines:
+            return self._loaded().stock
+        return self._stock_line().stock
+
+    def seed(self) -> int | None:
+        if not self._lines:
+            return self._loaded().seed
+        return self._stock_line().seed
+
+    def scores(self) -> dict[str, int]:
+        if not self._lines:
+            return self._loaded().scores
+        if self.index.scores is None:
+            return {}
+        with self.path.open("rb") as file:
+            line = self._read_line(file, self.index.scores)
+        return cast("ScoresLine", line).scores
+
+    def _turns_and_events(
+        self,
+        start: int,
+    ) -> Iterator[PlayerTurnRecord | RecordEvent]:
+        # a new PlayerTurnRecord at each turn, followed by the events of the turn
+        if not self._lines:
+            for turn in self._loaded().turns[start:]:
+                yield PlayerTurnRecord()
+                yield from turn.actions
+            return
+        index = self.index
+        if start >= len(index.turns):
+            return
+        players: dict[str, PlayerData] = {}
+        with self.path.open("rb") as file:
+            for name, offset in index.snapshots[start].items():
+                players[name] = cast(
+                    "EventLine", self._read_line(file, offset)
+                ).event.player
+            file.seek(index.turns[start])
+            for raw_line in file:
+                line = _record_line_adapter.validate_json(raw_line)
+                if isinstance(line, TurnLine):
+                    yield PlayerTurnRecord()
+                elif isinstance(line, EventLine):
+                    players[line.event.player.name] = line.event.player
+                    yield line.event
+                elif isinstance(line, EventRefLine):
+                    yield _record_event_adapter.validate_python(
+                        {**line.event, "player": players[line.player]},
+                    )
+
+    def events(self, start: int = 0) -> Iterator[tuple[int, RecordEvent]]:
+        """
+        Iterate lazily the events, from turn start.
+
+        Yields:
+            The turn number and the event.
+
+        """
+        number = start - 1
+        for item in self._turns_and_events(start):
+            if isinstance(item, PlayerTurnRecord):
+                number += 1
+            else:
+                yield number, item
+
+    def turns(self, start: int = 0) -> Iterator[PlayerTurnRecord]:
+        """
+        Iterate lazily the turns, from turn start.
+
+        Yields:
+            The turns, with their events.
+
+        """
+        turn = None
+        for item in self._turns_and_events(start):
+            if isinstance(item, PlayerTurnRecord):
+                if turn is not None:
+                    yield turn
+                turn = item
+            elif turn is not None:
+                turn.actions.append(item)
+        if turn is not None:
+            yield turn
+
+    def turn(self, number: int) -> PlayerTurnRecord:
+        """
+        Read a single turn.
+
+        Returns:
+            The turn with its events.
+
+        Raises:
+            IndexError: If there is no such turn.
+
+        """
+        for turn in self.turns(number):
+            return turn
+        msg = f"no turn {number} in {self.path}"
+        raise IndexError(msg)
+
+
+class BackgroundWriter:
+    """
+    Append models as JSON lines to a file, from a thread.
+
+    The models are queued (write blocks while the queue is full) and written by
+    batches of at most flush_size lines, at least every flush_interval seconds.
+    close() is registered with atexit, so that nothing is lost on an orderly exit.
+    If the thread dies on an exception, write, flush and close raise it again
+    instead of waiting for it.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        flush_interval: float = 1.0,
+        flush_size: int = 1000,
+        max_queued: int = 100_000,
+    ) -> None:
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._queue: queue.Queue[BaseModel | threading.Event | None] = queue.Queue(
+            max_queued,
+        )
+        self._closed = False
+        self._error: Exception | None = None
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"record writer ({path.name})",
+            daemon=True,
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _check(self) -> None:
+        """Raise again the exception that stopped the thread, if any."""
+        if self._error is not None:
+            raise self._error
+
+    def _put(self, item: BaseModel | threading.Event | None) -> None:
+        """Queue an item, checking the thread while the queue is full."""
+        while True:
+            self._check()
+            try:
+                self._queue.put(item, timeout=self.flush_interval)
+            except queue.Full:
+                continue
+            return
+
+    def write(self, model: BaseModel) -> None:
+        if self._closed:
+            msg = f"record writer of {self.path} is closed"
             raise ValueError(msg)
-        self._file.write_text("", encoding="utf-8")
+        self._put(model)
+
+    def flush(self) -> None:
+        """Wait until everything written so far is on disk."""
+        if self._closed:
+            return
+        flushed = threading.Event()
+        self._put(flushed)
+        while not flushed.wait(self.flush_interval):
+            if not self._thread.is_alive():
+                self._check()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        self._put(None)
+        self._thread.join()
+        self._check()
+
+    def _next_batch(self) -> list[BaseModel | threading.Event | None]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while isinstance(batch[-1], BaseModel) and len(batch) < self.flush_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        try:
+            self._write_batches()
+        except Exception as error:  # noqa: BLE001
+            self._error = error
+
+    def _write_batches(self) -> None:
+        with self.path.open("a", encoding="utf-8") as file:
+            while True:
+                batch = self._next_batch()
+                file.writelines(
+                    item.model_dump_json() + "\n"
+                    for item in batch
+                    if isinstance(item, BaseModel)
+                )
+                file.flush()
+                if isinstance(batch[-1], threading.Event):
+                    batch[-1].set()
+                elif batch[-1] is None:
+                    return
+
+
+def error_type(error: Exception) -> str:
+    """
+    Get the name of the type of an error, as saved in the records.
+
+    Returns:
+        The module and the qualified name of the type, like "builtins.ValueError".
+
+    """
+    if isinstance(error, HookError):
+        return error.type_name
+    error_class = type(error)
+    return f"{error_class.__module__}.{error_class.__qualname__}"
+
+
+class RecordBackend(ABC):
+    """What a Game records, see NullRecord, MemoryRecord and Record."""
+
+    @abstractmethod
+    def save(self, game: Game) -> Path | None:
+        pass
+
+    def flush(self) -> None:  # noqa: B027
+        """Wait until the record is written."""
+
+    def close(self) -> None:  # noqa: B027
+        """Release the resources of the record, at the end of the game."""
+
+    @abstractmethod
+    def add_setup(
+        self,
+        seed: int,
+        players: list[str],
+        kingdom: list[CardName],
+        random_backend: RandomBackend = "random",
+    ) -> None:
+        pass
+
+    @abstractmethod
+    def start_turn(self, player: Player | None = None) -> None:
+        pass
+
+    @abstractmethod
+    def add_stock(self, stock: Cards) -> None:
+        pass
+
+    @abstractmethod
+    def add_action(self, action: str, player: Player) -> None:
+        pass
+
+    @abstractmethod
+    def add_error(self, error: str, player: Player) -> None:
+        pass
+
+    @abstractmethod
+    def add_warning(self, error: str, player: Player) -> None:
+        pass
+
+    @abstractmethod
+    def add_elimination(self, player: Player) -> None:
+        pass
+
+    @abstractmethod
+    def add_hook_call(self, player: Player, name: str, args: HookCallArgs) -> None:
+        pass
+
+    @abstractmethod
+    def add_hook_result(self, player: Player, result: HookCallResult) -> None:
+        pass
+
+    @abstractmethod
+    def add_hook_error(self, player: Player, error: Exception) -> None:
+        pass
+
+
+class NullRecord(RecordBackend):
+    """Record nothing, for the fastest simulations."""
+
+    def save(self, game: Game) -> None:
+        pass
+
+    def add_setup(
+        self,
+        seed: int,
+        players: list[str],
+        kingdom: list[CardName],
+        random_backend: RandomBackend = "random",
+    ) -> None:
+        pass
+
+    def start_turn(self, player: Player | None = None) -> None:
+        pass
+
+    def add_stock(self, stock: Cards) -> None:
+        pass
+
+    def add_action(self, action: str, player: Player) -> None:
+        pass
+
+    def add_error(self, error: str, player: Player) -> None:
+        pass
+
+    def add_warning(self, error: str, player: Player) -> None:
+        pass
+
+    def add_elimination(self, player: Player) -> None:
+        pass
+
+    def add_hook_call(self, player: Player, name: str, args: HookCallArgs) -> None:
+        pass
+
+    def add_hook_result(self, player: Player, result: HookCallResult) -> None:
+        pass
+
+    def add_hook_error(self, player: Player, error: Exception) -> None:
+        pass
+
+
+class MemoryRecord(RecordBackend):
+    """
+    Record of a game kept in memory only, as a GameRecord.
+
+    Below the level of an event, neither the event nor the player snapshot is
+    built: at RecordLevel.SCORES, only the stock, the scores and the (empty)
+    turns are recorded. nb_turns counts the turns, as a record rebuilt from
+    its file does.
+    """
+
+    def __init__(self, level: RecordLevel = RecordLevel.HOOKS) -> None:
+        now = datetime.datetime.now(tz=ZoneInfo("Europe/Paris"))
+        self.level = level
+        self.nb_turns = 0
         self._game_record = GameRecord(date=now, stock=Cards())
-        self.save(Game(finished=False, players=[], stock=Cards()))
 
-    @staticmethod
-    def load(path: Path) -> GameRecord:
-        return GameRecord.model_validate_json(path.read_text(encoding="utf-8"))
+    @property
+    def game_record(self) -> GameRecord:
+        return self._game_record
 
-    def save(self, game: Game) -> Path:
+    def save(self, game: Game) -> Path | None:
         for player in game.players:
             self._game_record.scores[player.name] = player.score
-        self._file.write_text(self._game_record.model_dump_json(indent=None))
-        return self._file
+        return None
 
-    def start_turn(self) -> None:
+    def _add_event(self, event: RecordEvent) -> None:
+        self._game_record.turns[-1].actions.append(event)
+
+    def add_setup(
+        self,
+        seed: int,
+        players: list[str],  # noqa: ARG002
+        kingdom: list[CardName],  # noqa: ARG002
+        random_backend: RandomBackend = "random",  # noqa: ARG002
+    ) -> None:
+        self._game_record.seed = seed
+
+    def start_turn(self, player: Player | None = None) -> None:  # noqa: ARG002
+        # the turn markers are kept at every level, to count the turns
+        self.nb_turns += 1
         self._game_record.turns.append(PlayerTurnRecord())
 
     def add_stock(self, stock: Cards) -> None:
         self._game_record.stock = stock
 
     def add_action(self, action: str, player: Player) -> None:
-        turn = self._game_record.turns[-1]
-        action_record = ActionRecord(
-            action=action,
-            player=player.state,
-            score=player.score()["score"],
+        if self.level < RecordLevel.COMMANDS:
+            return
+        self._add_event(
+            ActionRecord(
+                action=action,
+                player=player.state,
+                score=player.score()["score"],
+            ),
         )
-        turn.actions.append(action_record)
 
     def add_error(self, error: str, player: Player) -> None:
         self._add_error(error, player, "error")
@@ -64,6 +586,9 @@ class Record:
     def add_warning(self, error: str, player: Player) -> None:
         self._add_error(error, player, "warning")
 
+    def add_elimination(self, player: Player) -> None:
+        self._add_error("Elimination", player, "error")
+
     def _add_error(
         self,
         error: str,
@@ -71,15 +596,253 @@ class Record:
         type_: Literal["error", "warning"],
     ) -> None:
         if not self._game_record.turns:
-            self._game_record.turns.append(PlayerTurnRecord())
-        turn = self._game_record.turns[-1]
-        error_record = ErrorRecord(error=error, player=player.state, type=type_)
-        turn.actions.append(error_record)
+            self.start_turn()
+        if self.level < RecordLevel.ERRORS:
+            return
+        self._add_event(ErrorRecord(error=error, player=player.state, type=type_))
 
     def add_hook_call(self, player: Player, name: str, args: HookCallArgs) -> None:
-        turn = self._game_record.turns[-1]
-        turn.actions.append(HookCallRecord(name=name, player=player.state, args=args))
+        if self.level < RecordLevel.HOOKS:
+            return
+        self._add_event(HookCallRecord(name=name, player=player.state, args=args))
+
+    def add_hook_result(self, player: Player, result: HookCallResult) -> None:
+        if self.level < RecordLevel.HOOKS:
+            return
+        self._add_event(HookResultRecord(player=player.state, result=result))
+
+    def add_hook_error(self, player: Player, error: Exception) -> None:
+        if self.level < RecordLevel.HOOKS:
+            return
+        self._add_event(
+            ErrorRecord(
+                error=f"Hook error, {error_type(error)}: {error}",
+                player=player.state,
+            ),
+        )
+
+
+class Record(MemoryRecord):
+    """
+    Record of a game, saved in a .dop file of the records_dir directory.
+
+    With the "json" format, each save rewrites the whole GameRecord. With the
+    "jsonl" format, the file is made of JSON lines (a header, then one line per
+    turn, event or stock, and a line of scores when they change) and each save
+    only appends the lines of the new events.
+
+    With background set (only for the "jsonl" format), the lines are written by
+    a BackgroundWriter as soon as the events happen; save() does not wait for
+    them, flush() does, and close() must be called at the end of the game.
+
+    With delta set (only for the "jsonl" format), an event whose player snapshot
+    did not change since the previous event of this player is written without
+    it, as an EventRefLine. load() puts the snapshots back.
+
+    When saved with a finished game, the game is added to the Catalog and to
+    the EventIndex of records_dir.
+
+    With spill set (only for the "jsonl" format), the lines of a turn are
+    written when the next turn starts and the completed turns are dropped from
+    memory: game_record only holds the current turn, whatever the length of the
+    game. Read the whole game from the file, with load() or a RecordReader.
+
+    With the "replay" format, only the seed, the kingdom and the commands and
+    hook results of the players are saved, as a ReplayRecord; load() replays
+    the game to rebuild the GameRecord.
+
+    level limits what is recorded, see MemoryRecord (the replay format always
+    saves every command and hook result).
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        record_format: RecordFormat = "json",
+        *,
+        level: RecordLevel = RecordLevel.HOOKS,
+        background: bool = False,
+        delta: bool = False,
+        spill: bool = False,
+        flush_interval: float = 1.0,
+        flush_size: int = 1000,
+    ) -> None:
+        super().__init__(level)
+        now = self._game_record.date
+        records_dir.mkdir(parents=True, exist_ok=True)
+        self._file = records_dir / now.strftime(RECORD_NAME_FORMAT)
+        if self._file.exists():
+            msg = f"game record is already created ({self._file})"
+            raise ValueError(msg)
+        self._file.write_text("", encoding="utf-8")
+        self._format = record_format
+        self._pending_lines: list[RecordLine] = []
+        self._writer: BackgroundWriter | None = None
+        if (background or delta or spill) and record_format != "jsonl":
+            msg = "background, delta and spill are only available for the jsonl format"
+            raise ValueError(msg)
+        self._delta = delta
+        self._spill = spill
+        self._last_players: dict[str, PlayerData] = {}
+        if background:
+            self._writer = BackgroundWriter(self._file, flush_interval, flush_size)
+        self._append(HeaderLine(date=now))
+        self._saved_scores: dict[str, int] | None = None
+        self._replay_record: ReplayRecord | None = None
+        self._player_indices: dict[str, int] = {}
+        self._cataloged = False
+        self.save(Game(finished=False, players=[], stock=Cards()))
+
+    @staticmethod
+    def load(path: Path) -> GameRecord:
+        return Record.loads(path.read_bytes())
+
+    @staticmethod
+    def loads(content: bytes) -> GameRecord:
+        if content.startswith(codec.MAGIC):
+            return codec.decode(content)
+        if content.startswith(_HEADER_PREFIX):
+            return _load_lines(content.decode().splitlines())
+        if content.startswith(b'{"kind":"replay"'):
+            # imported here, dopynion.replay needs the game and thus this module
+            from dopynion.replay import replay  # noqa: PLC0415
+
+            return replay(ReplayRecord.model_validate_json(content))
+        return GameRecord.model_validate_json(content)
+
+    @property
+    def path(self) -> Path:
+        return self._file
+
+    def _append(self, line: RecordLine) -> None:
+        if self._writer is not None:
+            self._writer.write(line)
+        elif self._format == "jsonl":
+            self._pending_lines.append(line)
+
+    def _add_event(self, event: RecordEvent) -> None:
+        super()._add_event(event)
+        if self._delta:
+            name = event.player.name
+            if self._last_players.get(name) == event.player:
+                self._append(
+                    EventRefLine(
+                        player=name,
+                        event=event.model_dump(mode="json", exclude={"player"}),
+                    ),
+                )
+                return
+            self._last_players[name] = event.player
+        self._append(EventLine(event=event))
+
+    def save(self, game: Game) -> Path:
+        super().save(game)
+        if self._format == "jsonl":
+            if self._game_record.scores != self._saved_scores:
+                self._saved_scores = self._game_record.scores.copy()
+                self._append(ScoresLine(scores=self._saved_scores))
+            self._write_pending_lines()
+        elif self._format == "replay":
+            if self._replay_record is not None:
+                self._file.write_text(self._replay_record.model_dump_json())
+        else:
+            self._file.write_text(self._game_record.model_dump_json(indent=None))
+        if game.finished and not self._cataloged:
+            self._cataloged = True
+            self._catalog()
+        return self._file
+
+    def _catalog(self) -> None:
+        with Catalog(self._file.parent / CATALOG_NAME) as catalog:
+            catalog.add(
+                catalog_entry(
+                    self._file.name,
+                    self._game_record.date,
+                    self._game_record.stock,
+                    self._game_record.scores,
+                    self.nb_turns,
+                ),
+            )
+        turns: Iterable[PlayerTurnRecord] = self._game_record.turns
+        if self._spill:
+            self.flush()
+            turns = RecordReader(self._file).turns()
+        with EventIndex(self._file.parent / EVENT_INDEX_NAME) as event_index:
+            event_index.add(
+                self._file.name,
+                game_events(self._game_record.stock, turns),
+                self._file.stat(),
+            )
+
+    def _write_pending_lines(self) -> None:
+        if self._pending_lines:
+            with self._file.open("a", encoding="utf-8") as file:
+                file.writelines(
+                    line.model_dump_json() + "\n" for line in self._pending_lines
+                )
+            self._pending_lines.clear()
+
+    def flush(self) -> None:
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+    def _add_command(self, player: Player, action: str) -> None:
+        if self._replay_record is not None:
+            index = self._player_indices[player.name]
+            self._replay_record.commands.append((index, action))
+
+    def add_setup(
+        self,
+        seed: int,
+        players: list[str],
+        kingdom: list[CardName],
+        random_backend: RandomBackend = "random",
+    ) -> None:
+        super().add_setup(seed, players, kingdom, random_backend)
+        if self._format == "replay":
+            self._replay_record = ReplayRecord(
+                date=self._game_record.date,
+                seed=seed,
+                random_backend=random_backend,
+                players=players,
+                kingdom=kingdom,
+            )
+            self._player_indices = {name: index for index, name in enumerate(players)}
+
+    def start_turn(self, player: Player | None = None) -> None:
+        if player is not None:
+            self._add_command(player, "START OF TURN")
+        if self._spill:
+            self._write_pending_lines()
+            self._game_record.turns.clear()
+        super().start_turn(player)
+        self._append(TurnLine())
+
+    def add_stock(self, stock: Cards) -> None:
+        super().add_stock(stock)
+        self._append(StockLine(stock=stock, seed=self._game_record.seed))
+
+    def add_action(self, action: str, player: Player) -> None:
+        self._add_command(player, action)
+        super().add_action(action, player)
+
+    def add_elimination(self, player: Player) -> None:
+        self._add_command(player, "ELIMINATION")
+        super().add_elimination(player)
 
     def add_hook_result(self, player: Player, result: HookCallResult) -> None:
-        turn = self._game_record.turns[-1]
-        turn.actions.append(HookResultRecord(player=player.state, result=result))
+        if self._replay_record is not None:
+            index = self._player_indices[player.name]
+            self._replay_record.commands.append((index, "HOOK", result))
+        super().add_hook_result(player, result)
+
+    def add_hook_error(self, player: Player, error: Exception) -> None:
+        if self._replay_record is not None:
+            index = self._player_indices[player.name]
+            self._replay_record.commands.append(
+                (index, "HOOK ERROR", error_type(error), str(error)),
+            )
+        super().add_hook_error(player, error)
@@ -0,0 +1,245 @@
+"""
+Deterministic replay of the games saved with the "replay" record format.
+
+A ReplayRecord only holds the seed, the players, the kingdom and the ordered
+commands and hook results of the players. As the game only depends on its
+random generator and on these decisions, running the commands again on a Game
+created with the same seed rebuilds the full GameRecord.
+
+A hook that raised an exception raises it again when replayed. The builtin and
+dopynion exceptions are created again with their type, the other ones as a
+HookError subclass with the same name. The elimination of a player by the game
+(the exception of a card or of the hook of an attacked player) is replayed by
+the command or the hook that caused it, so the ELIMINATION command it recorded
+is skipped.
+"""
+
+import builtins
+import contextlib
+from collections.abc import Iterable, Iterator
+from types import ModuleType
+from typing import Self, cast
+
+from dopynion import exceptions
+from dopynion.data_model import (
+    CardName,
+    CardNameAndHand,
+    GameRecord,
+    Hand,
+    HookCallResult,
+    MoneyCardsInHand,
+    PossibleCards,
+    ReplayCommand,
+    ReplayRecord,
+)
+from dopynion.exceptions import HookError, InvalidCommandError, InvalidRecordError
+from dopynion.game import Game
+from dopynion.player import Player, PlayerHooks
+from dopynion.record import MemoryRecord
+
+_ERROR_MODULES: dict[str, ModuleType] = {
+    "builtins": builtins,
+    "dopynion.exceptions": exceptions,
+}
+
+
+_replayed_error_classes: dict[str, type[HookError]] = {}
+
+
+def _hook_error(type_name: str, message: str) -> Exception:
+    """
+    Create again the exception of a hook, from its type name and message.
+
+    Returns:
+        An exception of the same type, or else of a HookError subclass with the
+        same name.
+
+    """
+    module_name, _, qualname = type_name.rpartition(".")
+    error_class = getattr(_ERROR_MODULES.get(module_name), qualname, None)
+    if isinstance(error_class, type) and issubclass(error_class, Exception):
+        with contextlib.suppress(TypeError):
+            error = error_class(message)
+            if str(error) == message:
+                return error
+    if type_name not in _replayed_error_classes:
+        _replayed_error_classes[type_name] = type(
+            qualname.rpartition(".")[2],
+            (HookError,),
+            {"__module__": module_name, "__qualname__": qualname},
+        )
+    return _replayed_error_classes[type_name](type_name, message)
+
+
+class _ReplayedRecord(MemoryRecord):
+    """MemoryRecord counting the eliminations of each player."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.nb_eliminations: dict[str, int] = {}
+
+    def add_elimination(self, player: Player) -> None:
+        name = player.name
+        self.nb_eliminations[name] = self.nb_eliminations.get(name, 0) + 1
+        super().add_elimination(player)
+
+
+class _ReplayedCommands:
+    """
+    Iterator of the commands to replay, shared by the hooks and the game loop.
+
+    The ELIMINATION commands already reproduced by the game (by ErrorManager,
+    for instance when the hook of an attacked player raises) are skipped, so
+    that they are not handed to the next hook.
+    """
+
+    def __init__(
+        self,
+        commands: Iterable[ReplayCommand],
+        record: _ReplayedRecord,
+        names: list[str],
+    ) -> None:
+        self._commands = iter(commands)
+        self._record = record
+        self._names = names
+        self._nb_eliminations: dict[str, int] = {}
+
+    def __iter__(self) -> Self:
+        return self
+
+    def __next__(self) -> ReplayCommand:
+        for command in self._commands:
+            if command[1] == "ELIMINATION":
+                name = self._names[command[0]]
+                nb_eliminations = self._nb_eliminations.get(name, 0) + 1
+                self._nb_eliminations[name] = nb_eliminations
+                if self._record.nb_eliminations.get(name, 0) >= nb_eliminations:
+                    continue
+            return command
+        raise StopIteration
+
+
+class ReplayHooks(PlayerHooks):
+    """Hooks answering with the hook results of a ReplayRecord."""
+
+    def __init__(self, commands: Iterator[ReplayCommand], index: int) -> None:
+        self.commands = commands
+        self.index = index
+
+    def _result(self) -> HookCallResult:
+        command = next(self.commands, None)
+        if command is not None and command[0] == self.index:
+            if len(command) == 3:  # noqa: PLR2004
+                return command[2]
+            if len(command) == 4:  # noqa: PLR2004
+                raise _hook_error(command[2], command[3])
+        msg = f"expected a hook result of player {self.index}, got {command}"
+        raise InvalidRecordError(msg)
+
+    def confirm_discard_card_from_hand(
+        self,
+        _decision_input: CardNameAndHand,
+    ) -> bool:
+        return cast("bool", self._result())
+
+    def confirm_trash_card_from_hand(
+        self,
+        _decision_input: CardNameAndHand,
+    ) -> bool:
+        return cast("bool", self._result())
+
+    def discard_card_from_hand(self, _decision_input: Hand) -> CardName:
+        return cast("CardName", self._result())
+
+    def trash_card_from_hand(self, _decision_input: Hand) -> CardName:
+        return cast("CardName", self._result())
+
+    def confirm_discard_deck(self) -> bool:
+        return cast("bool", self._result())
+
+    def choose_card_to_receive_in_discard(
+        self,
+        _decision_input: PossibleCards,
+    ) -> CardName:
+        return cast("CardName", self._result())
+
+    def choose_card_to_receive_in_deck(
+        self,
+        _decision_input: PossibleCards,
+    ) -> CardName:
+        return cast("CardName", self._result())
+
+    def skip_card_reception_in_hand(
+        self,
+        _decision_input: CardNameAndHand,
+    ) -> bool:
+        return cast("bool", self._result())
+
+    def trash_money_card_for_better_money_card(
+        self,
+        _decision_input: MoneyCardsInHand,
+    ) -> CardName | None:
+        return cast("CardName | None", self._result())
+
+
+def _card_name(name: str) -> CardName:
+    # unknown card names are replayed as they were given
+    return CardName(name) if name in CardName else cast("CardName", name)
+
+
+def _run_command(player: Player, action: str) -> None:
+    if action == "START OF TURN":
+        player.start_turn()
+    elif action == "END OF TURN":
+        player.end_turn()
+    elif action == "ELIMINATION":
+        player.eliminate()
+    elif action.startswith("BUY "):
+        player.buy(_card_name(action.removeprefix("BUY ")))
+    elif action.startswith("ACTION "):
+        player.action(_card_name(action.removeprefix("ACTION ")))
+    elif action.startswith("DISCARD "):
+        player.discard_cards(map(_card_name, action.removeprefix("DISCARD ").split()))
+    else:
+        msg = f"unknown command {action!r}"
+        raise InvalidRecordError(msg)
+
+
+def replay(replay_record: ReplayRecord) -> GameRecord:
+    """
+    Replay a game to rebuild its full record.
+
+    Returns:
+        The record of the game, as if it had been saved with the "json" format.
+
+    Raises:
+        InvalidRecordError: If the commands cannot be replayed.
+
+    """
+    record = _ReplayedRecord()
+    game = Game(
+        record,
+        seed=replay_record.seed,
+        random_backend=replay_record.random_backend,
+    )
+    commands = _ReplayedCommands(
+        replay_record.commands,
+        record,
+        replay_record.players,
+    )
+    players = [Player(name) for name in replay_record.players]
+    for index, player in enumerate(players):
+        player.hooks = ReplayHooks(commands, index)
+        game.add_player(player)
+    game.start()
+    if game.kingdom != replay_record.kingdom:
+        msg = f"replayed kingdom {game.kingdom} differs from {replay_record.kingdom}"
+        raise InvalidRecordError(msg)
+    for index, action, *_ in commands:
+        # errors are already recorded, as in the original game
+        with contextlib.suppress(InvalidCommandError):
+            _run_command(players[index], action)
+    game.save()
+    game_record = record.game_record
+    game_record.date = replay_record.date
+    return game_record
@@ -0,0 +1,374 @@
+"""
+Retention and archival of the game records.
+
+The records older than a day are compressed (LZMA) into one zip archive per
+day, in the archives directory of records_dir, so that the directory keeps a
+small number of files. An index (archives/index.json) maps each archived game
+to its archive, and load_game reads a single game in place, without extracting
+the archive. The catalog and the event index keep the archived games, and
+rebuilding them reads the archives as well as the records that are not archived.
+
+The games past the horizon of the RetentionPolicy (too old, too many, or too
+big all together) are deleted, from the records directory or from their
+archive, and removed from the catalog and the event index. The age of a game is
+given by the name of its record file, and an unfinished game is archived only
+once its record is no longer modified.
+
+Apply a policy or read a game with
+``python -m dopynion.retention apply|read [--records-dir DIR] ...``.
+"""
+
+import argparse
+import datetime
+import json
+import zipfile
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import NamedTuple
+from zoneinfo import ZoneInfo
+
+from pydantic import BaseModel
+
+from dopynion import record
+from dopynion.catalog import CATALOG_NAME, Catalog
+from dopynion.data_model import GameRecord
+from dopynion.event_index import EVENT_INDEX_NAME, EventIndex
+from dopynion.record import RECORD_NAME_FORMAT, Record
+
+ARCHIVES_DIR_NAME = "archives"
+
+_INDEX_NAME = "index.json"
+_TIMEZONE = ZoneInfo("Europe/Paris")
+
+
+class RetentionPolicy(BaseModel):
+    """
+    What to keep in a records directory.
+
+    archive_after: age of the games to archive, None to never archive.
+    delete_after: age of the games to delete, None to keep them forever.
+    max_games: number of most recent games to keep, None for no limit.
+    max_size: total size in bytes of the most recent games to keep (archived
+    games count for their compressed size), None for no limit.
+    """
+
+    archive_after: datetime.timedelta | None = datetime.timedelta(days=1)
+    delete_after: datetime.timedelta | None = None
+    max_games: int | None = None
+    max_size: int | None = None
+
+
+class RetentionReport(NamedTuple):
+    archived: list[str]
+    deleted: list[str]
+
+
+def game_date(name: str) -> datetime.datetime:
+    """
+    Get the date of a game from the name of its record file.
+
+    The name is parsed with RECORD_NAME_FORMAT, ValueError is raised if it does
+    not match.
+
+    Returns:
+        The date of creation of the record.
+
+    """
+    return datetime.datetime.strptime(name, RECORD_NAME_FORMAT).replace(
+        tzinfo=_TIMEZONE,
+    )
+
+
+def _is_record_name(name: str) -> bool:
+    try:
+        game_date(name)
+    except ValueError:
+        return False
+    return True
+
+
+class Archives:
+    """Per-day zip archives of the records of a directory, with their index."""
+
+    def __init__(self, records_dir: Path) -> None:
+        self.records_dir = records_dir
+        self.path = records_dir / ARCHIVES_DIR_NAME
+        self._index_path = self.path / _INDEX_NAME
+        self.index: dict[str, str] = {}
+        if self._index_path.exists():
+            self.index = json.loads(self._index_path.read_text(encoding="utf-8"))
+
+    def _save_index(self) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._index_path.write_text(json.dumps(self.index), encoding="utf-8")
+
+    @staticmethod
+    def archive_name(name: str) -> str:
+        """
+        Get the name of the archive of a game, from the day of the game.
+
+        Returns:
+            The file name of the archive, in the archives directory.
+
+        """
+        return f"games__{game_date(name):%Y_%m_%d}.zip"
+
+    def add(self, paths: Iterable[Path]) -> None:
+        """
+        Move record files into their archive, with their .idx file if any.
+
+        The files not named like records are left in place.
+        """
+        by_archive: dict[str, list[Path]] = {}
+        for path in paths:
+            if path.name not in self.index and _is_record_name(path.name):
+                by_archive.setdefault(self.archive_name(path.name), []).append(path)
+        if not by_archive:
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        for archive_name, archive_paths in by_archive.items():
+            with zipfile.ZipFile(
+                self.path / archive_name,
+                "a",
+                compression=zipfile.ZIP_LZMA,
+            ) as archive:
+                for path in archive_paths:
+                    archive.write(path, path.name)
+                    self.index[path.name] = archive_name
+        self._save_index()
+        for archive_paths in by_archive.values():
+            for path in archive_paths:
+                _unlink_record(path)
+
+    def read(self, name: str) -> bytes:
+        """
+        Read a record, archived or not.
+
+        Returns:
+            The content of the record file.
+
+        Raises:
+            FileNotFoundError: if there is no such game.
+
+        """
+        path = self.records_dir / name
+        if path.exists():
+            return path.read_bytes()
+        if name not in self.index:
+            raise FileNotFoundError(path)
+        with zipfile.ZipFile(self.path / self.index[name]) as archive:
+            return archive.read(name)
+
+    def games(
+        self,
+        names: Iterable[str] | None = None,
+    ) -> Iterator[tuple[str, GameRecord]]:
+        """
+        Load archived games, all of them by default, reading each archive once.
+
+        Yields:
+            The name and the record of each archived game among names.
+
+        """
+        by_archive: dict[str, list[str]] = {}
+        for name in sorted(self.index if names is None else names):
+            if name in self.index:
+                by_archive.setdefault(self.index[name], []).append(name)
+        for archive_name, archived in sorted(by_archive.items()):
+            with zipfile.ZipFile(self.path / archive_name) as archive:
+                for name in archived:
+                    yield name, Record.loads(archive.read(name))
+
+    def sizes(self) -> dict[str, int]:
+        """
+        Get the compressed size of the archived games.
+
+        Returns:
+            The size in bytes of each archived game.
+
+        """
+        sizes = {}
+        for archive_name in set(self.index.values()):
+            with zipfile.ZipFile(self.path / archive_name) as archive:
+                for info in archive.infolist():
+                    sizes[info.filename] = info.compress_size
+        return sizes
+
+    def remove(self, names: Iterable[str]) -> None:
+        """Remove games from their archive, deleting the emptied archives."""
+        by_archive: dict[str, set[str]] = {}
+        for name in names:
+            if name in self.index:
+                by_archive.setdefault(self.index.pop(name), set()).add(name)
+        for archive_name, removed in by_archive.items():
+            path = self.path / archive_name
+            new_path = path.with_suffix(".tmp")
+            with (
+                zipfile.ZipFile(path) as archive,
+                zipfile.ZipFile(
+                    new_path,
+                    "w",
+                    compression=zipfile.ZIP_LZMA,
+                ) as new_archive,
+            ):
+                kept = [i for i in archive.infolist() if i.filename not in removed]
+                for info in kept:
+                    new_archive.writestr(info, archive.read(info))
+            if kept:
+                new_path.replace(path)
+            else:
+                new_path.unlink()
+                path.unlink()
+        if by_archive:
+            self._save_index()
+
+
+def _unlink_record(path: Path) -> None:
+    path.unlink(missing_ok=True)
+    path.with_name(path.name + ".idx").unlink(missing_ok=True)
+
+
+def load_game(records_dir: Path, name: str) -> GameRecord:
+    """
+    Load a game, reading it in place from its archive if it is archived.
+
+    Returns:
+        The record of the game.
+
+    """
+    return Record.loads(Archives(records_dir).read(name))
+
+
+def expired_games(
+    sizes: dict[str, int],
+    policy: RetentionPolicy,
+    now: datetime.datetime,
+) -> set[str]:
+    """
+    Select the games past the horizon of the policy.
+
+    Returns:
+        The names of the games to delete, among the keys of sizes.
+
+    """
+    names = sorted(sizes, reverse=True)  # the most recent first
+    expired: set[str] = set()
+    if policy.delete_after is not None:
+        horizon = now - policy.delete_after
+        expired.update(name for name in names if game_date(name) < horizon)
+    if policy.max_games is not None:
+        expired.update(names[policy.max_games :])
+    if policy.max_size is not None:
+        total_size = 0
+        for name in names:
+            total_size += sizes[name]
+            if total_size > policy.max_size:
+                expired.add(name)
+    return expired
+
+
+def _finished_games(records_dir: Path) -> set[str]:
+    # the catalog only has the finished games, Record adds them when finished
+    if not (records_dir / CATALOG_NAME).exists():
+        return set()
+    with Catalog(records_dir / CATALOG_NAME) as catalog:
+        return {entry.name for entry in catalog.games()}
+
+
+def _archivable(
+    path: Path,
+    horizon: datetime.datetime,
+    finished: set[str],
+) -> bool:
+    if game_date(path.name) >= horizon:
+        return False
+    if path.name in finished:
+        return True
+    # a game still written to is not archived, whatever its age
+    modified = datetime.datetime.fromtimestamp(path.stat().st_mtime, tz=_TIMEZONE)
+    return modified < horizon
+
+
+def apply_retention(
+    records_dir: Path,
+    policy: RetentionPolicy,
+    now: datetime.datetime | None = None,
+) -> RetentionReport:
+    """
+    Archive and delete the games of records_dir according to the policy.
+
+    A game is archived when it is older than archive_after and either finished
+    (in the catalog) or not modified for archive_after. The files not named
+    like records are ignored.
+
+    Returns:
+        The names of the archived and of the deleted games.
+
+    """
+    if now is None:
+        now = datetime.datetime.now(tz=_TIMEZONE)
+    archives = Archives(records_dir)
+    loose = {
+        path.name: path
+        for path in records_dir.glob("game__*.dop")
+        if _is_record_name(path.name)
+    }
+
+    archived = []
+    if policy.archive_after is not None:
+        horizon = now - policy.archive_after
+        finished = _finished_games(records_dir)
+        archived = [
+            name
+            for name in sorted(loose)
+            if _archivable(loose[name], horizon, finished)
+        ]
+        archives.add(loose.pop(name) for name in archived)
+
+    sizes = {name: path.stat().st_size for name, path in loose.items()}
+    deleted = expired_games(sizes | archives.sizes(), policy, now)
+    for name in deleted & loose.keys():
+        _unlink_record(loose[name])
+    archives.remove(deleted)
+    if deleted and (records_dir / CATALOG_NAME).exists():
+        with Catalog(records_dir / CATALOG_NAME) as catalog:
+            catalog.remove(deleted)
+    if deleted and (records_dir / EVENT_INDEX_NAME).exists():
+        with EventIndex(records_dir / EVENT_INDEX_NAME) as event_index:
+            event_index.remove(deleted)
+    return RetentionReport(archived, sorted(deleted))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m dopynion.retention",
+        description="Archive and delete old game records, or read a record.",
+    )
+    parser.add_argument("command", choices=["apply", "read"])
+    parser.add_argument("name", nargs="?", help="record file name, for read")
+    parser.add_argument("--records-dir", type=Path, default=record.records_dir)
+    parser.add_argument("--archive-after-days", type=float, default=1.0)
+    parser.add_argument("--delete-after-days", type=float)
+    parser.add_argument("--max-games", type=int)
+    parser.add_argument("--max-size", type=int, help="in bytes")
+    args = parser.parse_args(argv)
+    if args.command == "read":
+        if args.name is None:
+            parser.error("read needs the name of a record file")
+        print(load_game(args.records_dir, args.name).model_dump_json())
+        return
+    delete_after = None
+    if args.delete_after_days is not None:
+        delete_after = datetime.timedelta(days=args.delete_after_days)
+    policy = RetentionPolicy(
+        archive_after=datetime.timedelta(days=args.archive_after_days),
+        delete_after=delete_after,
+        max_games=args.max_games,
+        max_size=args.max_size,
+    )
+    report = apply_retention(args.records_dir, policy)
+    print(f"{len(report.archived)} games archived, {len(report.deleted)} deleted")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""
+Headless simulation of many games, played by bots in parallel processes.
+
+A bot is the policy of a player: it plays the action and buy phases of its
+turns, and answers the hooks of the cards. The bots are given by name, either
+one of the bots of this module ("big_money", "random") or "module:Class" for a
+Bot subclass of another module, so that they are created in the worker
+processes.
+
+The games are played with a NullRecord and print nothing. They are dispatched
+in chunks to a ProcessPoolExecutor, the result of each chunk is appended to a
+JSON Lines file as soon as it is finished, and SimulationStats aggregates the
+win rates, scores and lengths of the games. Each game has its own seed, drawn
+from the seed of the simulation, so a simulation can be reproduced.
+
+Run with
+``python -m dopynion.simulation big_money random --games 1000 [--output FILE]``.
+"""
+
+import argparse
+import concurrent.futures
+import contextlib
+import importlib
+import json
+import os
+import random
+from abc import ABC, abstractmethod
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+from typing import NamedTuple
+
+from dopynion.cards import CardName
+from dopynion.exceptions import InvalidCommandError
+from dopynion.game import Game
+from dopynion.player import DefaultPlayerHooks, Player, PlayerHooks
+from dopynion.record import NullRecord
+
+MAX_NB_TURNS = 100
+
+
+class Bot(ABC):
+    """
+    Policy of a player, playing its turns and answering its hooks.
+
+    The random generator of a bot is its own, so that its choices do not change
+    the draws of the game. play_game seeds it from the seed of the game and the
+    index of the player.
+    """
+
+    def __init__(self) -> None:
+        self.hooks: PlayerHooks = DefaultPlayerHooks()
+        self.random = random.Random()  # noqa: S311
+
+    @abstractmethod
+    def play_turn(self, player: Player) -> None:
+        """Play the action and buy phases, between start_turn and end_turn."""
+
+
+class BigMoneyBot(Bot):
+    """Play no action, buy the best of province, gold and silver."""
+
+    def play_turn(self, player: Player) -> None:  # noqa: PLR6301
+        stock = player.game.stock
+        money = player.money + player.hand.money
+        for card_name, cost in (
+            (CardName.PROVINCE, 8),
+            (CardName.GOLD, 6),
+            (CardName.SILVER, 3),
+        ):
+            if money >= cost and card_name in stock:
+                player.buy(card_name)
+                return
+
+
+class RandomBot(Bot):
+    """Play random actions, then buy random cards, or nothing."""
+
+    def play_turn(self, player: Player) -> None:
+        while player.actions_left and player.hand.contains_action():
+            player.action(self.random.choice(list(player.hand.action_cards)))
+        while player.purchases_left:
+            money = player.money + player.hand.money
+            buyables = player.game.supply.piles(money)
+            if not buyables or self.random.random() < 1 / (len(buyables) + 1):
+                return
+            player.buy(self.random.choice(buyables))
+
+
+bots: dict[str, type[Bot]] = {"big_money": BigMoneyBot, "random": RandomBot}
+
+
+def load_bot(name: str) -> Bot:
+    """
+    Create a bot from its name, in bots or as "module:Class".
+
+    Returns:
+        A new bot.
+
+    Raises:
+        ValueError: if there is no such bot.
+        TypeError: if module:Class is not a Bot subclass.
+
+    """
+    if name in bots:
+        return bots[name]()
+    module_name, _, class_name = name.partition(":")
+    if not class_name:
+        msg = f"unknown bot {name!r}, expected one of {sorted(bots)} or module:Class"
+        raise ValueError(msg)
+    bot_class = getattr(importlib.import_module(module_name), class_name)
+    if not (isinstance(bot_class, type) and issubclass(bot_class, Bot)):
+        msg = f"{name} is not a Bot"
+        raise TypeError(msg)
+    return bot_class()
+
+
+class GameResult(NamedTuple):
+    seed: int
+    scores: list[int]
+    winners: list[int]
+    nb_turns: int
+
+
+def play_game(bot_names: Sequence[str], seed: int) -> GameResult:
+    """
+    Play a game between bots, without recording it.
+
+    A bot raising an InvalidCommandError is eliminated. The game stops after
+    MAX_NB_TURNS rounds if it is not finished.
+
+    Returns:
+        The scores of the bots, the indices of the winners and the number of
+        rounds.
+
+    """
+    game = Game(NullRecord(), seed=seed)
+    players = []
+    game_bots = [load_bot(name) for name in bot_names]
+    for index, (name, bot) in enumerate(zip(bot_names, game_bots, strict=True)):
+        player = Player(f"{index} {name}")
+        player.hooks = bot.hooks
+        bot.random.seed(f"{seed} {index}")
+        game.add_player(player)
+        players.append(player)
+    game.start()
+    nb_turns = 0
+    while not game.finished and nb_turns < MAX_NB_TURNS:
+        nb_turns += 1
+        for player, bot in zip(players, game_bots, strict=True):
+            if game.finished:
+                break
+            if player.eliminated:
+                continue
+            player.start_turn()
+            try:
+                bot.play_turn(player)
+            except InvalidCommandError:
+                player.eliminate()
+            player.end_turn()
+    scores = [player.score()["score"] for player in players]
+    best_score = max(scores)
+    winners = [index for index, score in enumerate(scores) if score == best_score]
+    return GameResult(seed, scores, winners, nb_turns)
+
+
+def play_games(bot_names: Sequence[str], seeds: Sequence[int]) -> list[GameResult]:
+    """
+    Play a chunk of games, in a worker process.
+
+    Returns:
+        The results of the games, in the order of the seeds.
+
+    """
+    return [play_game(bot_names, seed) for seed in seeds]
+
+
+class BotStats(NamedTuple):
+    bot: str
+    nb_wins: float
+    win_rate: float
+    mean_score: float
+
+
+class SimulationStats:
+    """Aggregate of the results of the games, updated game by game."""
+
+    def __init__(self, bot_names: Sequence[str]) -> None:
+        self.bot_names = list(bot_names)
+        self.nb_games = 0
+        self.nb_wins = [0.0] * len(bot_names)
+        self.total_scores = [0] * len(bot_names)
+        self.lengths: dict[int, int] = {}
+
+    def add(self, result: GameResult) -> None:
+        """Count a game, a tie giving a fraction of win to each winner."""
+        self.nb_games += 1
+        for index in result.winners:
+            self.nb_wins[index] += 1 / len(result.winners)
+        for index, score in enumerate(result.scores):
+            self.total_scores[index] += score
+        self.lengths[result.nb_turns] = self.lengths.get(result.nb_turns, 0) + 1
+
+    @property
+    def bots(self) -> list[BotStats]:
+        nb_games = self.nb_games or 1
+        return [
+            BotStats(name, nb_wins, nb_wins / nb_games, total_score / nb_games)
+            for name, nb_wins, total_score in zip(
+                self.bot_names,
+                self.nb_wins,
+                self.total_scores,
+                strict=True,
+            )
+        ]
+
+    @property
+    def mean_length(self) -> float:
+        total = sum(length * nb for length, nb in self.lengths.items())
+        return total / (self.nb_games or 1)
+
+    def __str__(self) -> str:
+        lines = [f"{self.nb_games} games, {self.mean_length:.1f} rounds on average"]
+        lines.extend(
+            f"{index} {bot.bot}: {bot.win_rate:.1%} wins, "
+            f"mean score {bot.mean_score:.1f}"
+            for index, bot in enumerate(self.bots)
+        )
+        return "\n".join(lines)
+
+
+def _results(
+    bot_names: list[str],
+    seeds: list[int],
+    workers: int,
+    chunk_size: int,
+) -> Iterator[list[GameResult]]:
+    chunks = [
+        seeds[start : start + chunk_size] for start in range(0, len(seeds), chunk_size)
+    ]
+    if workers == 1:
+        for chunk in chunks:
+            yield play_games(bot_names, chunk)
+        return
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(play_games, bot_names, chunk) for chunk in chunks]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+
+def simulate(  # noqa: PLR0913
+    bot_names: Sequence[str],
+    nb_games: int,
+    *,
+    seed: int | None = None,
+    workers: int | None = None,
+    output: Path | None = None,
+    chunk_size: int | None = None,
+) -> SimulationStats:
+    """
+    Play nb_games games between the bots, in workers processes.
+
+    With a single worker, the games are played in the current process. The
+    results are appended to output, one JSON line per game, as the chunks of
+    games finish: the order of the lines depends on the workers.
+
+    Returns:
+        The aggregated results.
+
+    """
+    for name in bot_names:
+        load_bot(name)  # fail early on an unknown bot
+    rng = random.Random(seed)  # noqa: S311
+    seeds = [rng.getrandbits(64) for _ in range(nb_games)]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunk_size is None:
+        # a few chunks per worker, to balance the load without much overhead
+        chunk_size = max(1, min(100, nb_games // (4 * workers)))
+    stats = SimulationStats(bot_names)
+    with contextlib.ExitStack() as stack:
+        file = None
+        if output is not None:
+            file = stack.enter_context(output.open("a", encoding="utf-8"))
+        for results in _results(list(bot_names), seeds, workers, chunk_size):
+            for result in results:
+                stats.add(result)
+            if file is not None:
+                file.writelines(
+                    json.dumps(result._asdict()) + "\n" for result in results
+                )
+                file.flush()
+    return stats
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m dopynion.simulation",
+        description="Play many games between bots, in parallel.",
+    )
+    parser.add_argument("bots", nargs="+", help="bot names, or module:Class")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--workers", type=int, help="default: number of CPUs")
+    parser.add_argument("--output", type=Path, help="JSON Lines file of results")
+    args = parser.parse_args(argv)
+    stats = simulate(
+        args.bots,
+        args.games,
+        seed=args.seed,
+        workers=args.workers,
+        output=args.output,
+    )
+    print(stats)
+
+
+if __name__ == "__main__":
+    main()
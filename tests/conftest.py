@@ -1,13 +1,29 @@
+from collections.abc import Callable
+from pathlib import Path
+
 import pytest
 
-from dopynion.cards import CardName
+from dopynion.cards import CardContainer, CardName
 from dopynion.game import Game
-from dopynion.player import Player
+from dopynion.player import Player, PlayerHooks
+from dopynion.record import MemoryRecord
+
+PLAYER_NAMES = ("toto", "tata", "titi", "tutu")
+
+
+@pytest.fixture(autouse=True)
+def _check_card_containers(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(CardContainer, "debug", True)
+
+
+@pytest.fixture(autouse=True)
+def _records_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("dopynion.record.records_dir", tmp_path / "games")
 
 
 @pytest.fixture(name="game")
 def _game() -> Game:
-    return Game()
+    return Game(MemoryRecord())
 
 
 @pytest.fixture(name="player")
@@ -41,3 +57,52 @@ def _game_with_two_players(game: Game) -> tuple[Game, Player, Player]:
     game.add_player(enemy)
     game.start()
     return game, player, enemy
+
+
+def _play_empty_turn(player: Player) -> None:
+    player.start_turn()
+    player.end_turn()
+
+
+@pytest.fixture(name="play_a_game")
+def _play_a_game() -> Callable[..., Game]:
+    def play_a_game(  # noqa: PLR0913
+        game: Game,
+        play_turn: Callable[[Player], None] = _play_empty_turn,
+        *,
+        nb_players: int = 2,
+        nb_rounds: int = 1,
+        hooks_class: type[PlayerHooks] | None = None,
+        finish: bool = True,
+    ) -> Game:
+        """
+        Play nb_rounds rounds of a game, then save it.
+
+        The players are the first nb_players of toto, tata, titi and tutu.
+
+        play_turn plays a turn, from start_turn to end_turn, until the game is
+        finished. With finish, the provinces are then removed from the stock,
+        so that the game is saved finished.
+
+        Returns:
+            The game.
+
+        """
+        for name in PLAYER_NAMES[:nb_players]:
+            player = Player(name)
+            if hooks_class is not None:
+                player.hooks = hooks_class()
+            game.add_player(player)
+        game.start()
+        for _ in range(nb_rounds):
+            for player in game.players:
+                if game.finished:
+                    break
+                play_turn(player)
+        if finish:
+            while CardName.PROVINCE in game.stock:
+                game.stock.remove(CardName.PROVINCE)
+        game.save()
+        return game
+
+    return play_a_game
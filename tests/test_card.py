@@ -1,8 +1,24 @@
+import random
 from dataclasses import dataclass
+from typing import Any
 
 import pytest
 
-from dopynion.cards import Card, CardContainer, CardName, Village, treasure_card_name
+from dopynion.cards import (
+    Card,
+    CardContainer,
+    CardName,
+    Possession,
+    SupplyIndex,
+    Village,
+    card_ids,
+    card_infos,
+    card_infos_by_name,
+    card_names,
+    find_card_id,
+    intern_card,
+    treasure_card_name,
+)
 from dopynion.data_model import (
     CardName as CardNameDataModel,
 )
@@ -13,6 +29,7 @@ from dopynion.data_model import (
     MoneyCardsInHand,
     PossibleCards,
 )
+from dopynion.exceptions import InconsistentCardContainerError
 from dopynion.game import Game
 from dopynion.player import DefaultPlayerHooks, Player
 
@@ -1272,3 +1289,336 @@ def test_cards_quantities() -> None:
     cards.append(CardName.DUCHY)
     cards.remove(CardName.VILLAGE)
     assert cards.state == Cards(quantities={CardName.DUCHY: 1})
+
+
+def test_cards_ids() -> None:
+    assert len(card_names) == len(Card.types)
+    for card_name, card_id in card_ids.items():
+        assert card_names[card_id] == card_name
+
+
+def test_card_infos() -> None:
+    assert len(card_infos) == len(card_names)
+    for card_id, info in enumerate(card_infos):
+        assert info.card_id == card_id
+        assert card_infos_by_name[info.card_name] is info
+        assert info.class_ is Card.class_(info.card_name)
+        assert info.cost == info.class_.cost
+        assert info.money == info.class_.money
+        assert info.is_action == info.class_.is_action
+        assert info.more_cards_from_deck == info.class_.more_cards_from_deck
+    assert card_infos_by_name[CardName.GOLD].money == 3
+    assert card_infos_by_name[CardName.PROVINCE].victory_points == 6
+
+
+def test_intern_card() -> None:
+    card_id = card_ids[CardName.COUNCILROOM]
+    for spelling in ("councilroom", "COUNCILROOM", "CouncilRoom", "cOuNcIlRoOm"):
+        assert intern_card(spelling) == card_id
+        assert find_card_id(spelling) == card_id
+    assert find_card_id(CardName.MOAT) is None
+    assert find_card_id("foobar") is None
+    with pytest.raises(KeyError):
+        intern_card("foobar")
+
+
+def test_cards_container_api() -> None:
+    cards = CardContainer()
+    cards.append_several(3, CardName.COPPER)
+    cards.prepend(CardName.GOLD)
+    cards.append(CardName.ESTATE)
+    assert list(cards) == [
+        CardName.GOLD,
+        CardName.COPPER,
+        CardName.COPPER,
+        CardName.COPPER,
+        CardName.ESTATE,
+    ]
+    assert cards.copper_qty == 3
+    assert cards.quantity(CardName.GOLD) == 1
+    assert cards.money == 6
+    assert cards.pop() == CardName.ESTATE
+    assert cards.pop(0) == CardName.GOLD
+    assert cards.estate_qty == 0
+    assert cards.state == Cards(quantities={CardName.COPPER: 3})
+
+
+def test_cards_container_unknown_card() -> None:
+    cards = CardContainer()
+    with pytest.raises(KeyError):
+        cards.append(CardName.MOAT)
+    with pytest.raises(KeyError):
+        cards.prepend(CardName.MOAT)
+    with pytest.raises(ValueError, match="village"):
+        cards.remove(CardName.VILLAGE)
+    assert CardName.MOAT not in cards
+    assert cards.moat_qty == 0
+    with pytest.raises(AttributeError):
+        cards.foobar_qty  # noqa: B018
+
+
+def test_cards_container_empty_to() -> None:
+    cards = CardContainer()
+    cards.append(CardName.VILLAGE)
+    cards.append(CardName.DUCHY)
+    other = CardContainer()
+    other.append(CardName.GOLD)
+    cards.empty_to(other)
+    assert not cards
+    assert list(other) == [CardName.GOLD, CardName.VILLAGE, CardName.DUCHY]
+    assert other.state == Cards(
+        quantities={CardName.GOLD: 1, CardName.VILLAGE: 1, CardName.DUCHY: 1},
+    )
+
+
+def test_cards_container_empty_piles() -> None:
+    cards = CardContainer()
+    cards.append(CardName.VILLAGE)
+    cards.append_several(2, CardName.DUCHY)
+    cards.remove(CardName.VILLAGE)
+    cards.remove(CardName.DUCHY)
+    assert cards.nb_empty_piles == 1
+    assert not cards.three_empty_piles
+
+
+def test_cards_container_draw_and_prepend() -> None:
+    cards = CardContainer()
+    for card_name in (CardName.COPPER, CardName.SILVER, CardName.GOLD):
+        cards.append(card_name)
+    assert cards.pop(0) == CardName.COPPER
+    cards.prepend(CardName.ESTATE)
+    cards.prepend(CardName.DUCHY)
+    assert list(cards) == [
+        CardName.DUCHY,
+        CardName.ESTATE,
+        CardName.SILVER,
+        CardName.GOLD,
+    ]
+    assert cards[0] == CardName.DUCHY
+    assert cards[-1] == CardName.GOLD
+    assert len(cards) == 4
+    cards.remove(CardName.SILVER)
+    assert cards.pop(1) == CardName.ESTATE
+    assert cards.pop() == CardName.GOLD
+    assert cards.pop(0) == CardName.DUCHY
+    assert not cards
+    with pytest.raises(IndexError):
+        cards.pop()
+    with pytest.raises(IndexError):
+        cards[0]
+
+
+def test_cards_container_draw_whole_big_pile() -> None:
+    cards = CardContainer()
+    for _ in range(100):
+        cards.append(CardName.COPPER)
+        cards.append(CardName.ESTATE)
+    drawn = [cards.pop(0) for _ in range(150)]
+    assert drawn == [CardName.COPPER, CardName.ESTATE] * 75
+    assert cards.copper_qty == 25
+    assert cards.estate_qty == 25
+    assert list(cards) == [CardName.COPPER, CardName.ESTATE] * 25
+
+
+def test_cards_container_empty_to_empty_container() -> None:
+    cards = CardContainer()
+    cards.append(CardName.VILLAGE)
+    cards.append(CardName.DUCHY)
+    cards.pop(0)
+    other = CardContainer()
+    cards.empty_to(other)
+    cards.append(CardName.GOLD)
+    assert list(cards) == [CardName.GOLD]
+    assert cards.state == Cards(quantities={CardName.GOLD: 1})
+    assert list(other) == [CardName.DUCHY]
+    assert other.state == Cards(quantities={CardName.DUCHY: 1})
+
+
+def test_cards_container_totals() -> None:
+    cards = CardContainer()
+    assert not cards.contains_action()
+    assert not cards.contains_money()
+    cards.append_several(2, CardName.GOLD)
+    cards.append(CardName.VILLAGE)
+    cards.prepend(CardName.DISTANTSHORE)
+    assert cards.money == 6
+    assert cards.contains_action()
+    assert cards.contains_money()
+    cards.remove(CardName.GOLD)
+    cards.pop(0)
+    cards.pop()
+    assert cards.money == 3
+    assert not cards.contains_action()
+    other = CardContainer()
+    cards.empty_to(other)
+    assert cards.money == 0
+    assert not cards.contains_money()
+    assert other.money == 3
+    assert other.contains_money()
+
+
+def test_cards_container_consistency_check() -> None:
+    cards = CardContainer()
+    cards.append(CardName.GOLD)
+    cards.check_consistency()
+    cards._totals += 1  # noqa: SLF001
+    with pytest.raises(InconsistentCardContainerError):
+        cards.check_consistency()
+
+
+def test_cards_container_views() -> None:
+    cards = CardContainer()
+    cards.append(CardName.GOLD)
+    cards.append(CardName.VILLAGE)
+    cards.append(CardName.COPPER)
+    cards.append(CardName.ESTATE)
+    cards.append(CardName.COPPER)
+    money_cards = cards.money_cards
+    assert len(money_cards) == 3
+    assert sorted(money_cards) == [CardName.COPPER, CardName.COPPER, CardName.GOLD]
+    assert money_cards[0] in {CardName.COPPER, CardName.GOLD}
+    assert money_cards[-1] == money_cards[2]
+    assert sorted(money_cards.distinct()) == [CardName.COPPER, CardName.GOLD]
+    assert money_cards.quantity(CardName.COPPER) == 2
+    assert money_cards.quantity(CardName.ESTATE) == 0
+    assert CardName.GOLD in money_cards
+    assert CardName.VILLAGE not in money_cards
+    with pytest.raises(IndexError):
+        money_cards[3]
+    assert list(cards.action_cards) == [CardName.VILLAGE]
+    assert list(cards.victory_cards) == [CardName.ESTATE]
+
+    cards.remove(CardName.GOLD)
+    cards.remove(CardName.VILLAGE)
+    assert list(money_cards) == [CardName.COPPER, CardName.COPPER]
+    assert not cards.action_cards
+    assert repr(money_cards) == "[Copper, Copper]"
+
+
+def test_cards_container_moves() -> None:
+    cards = CardContainer()
+    cards.extend([CardName.GOLD, CardName.VILLAGE, CardName.COPPER, CardName.GOLD])
+    other = CardContainer()
+    other.append(CardName.ESTATE)
+
+    cards.move_to(other, CardName.GOLD, 2)
+    assert list(cards) == [CardName.VILLAGE, CardName.COPPER]
+    assert list(other) == [CardName.ESTATE, CardName.GOLD, CardName.GOLD]
+    assert other.money == 6
+    with pytest.raises(ValueError, match="gold"):
+        cards.move_to(other, CardName.GOLD)
+    with pytest.raises(ValueError, match="copper"):
+        cards.move_to(other, CardName.COPPER, 2)
+
+    with pytest.raises(ValueError, match="estate"):
+        other.move_several_to(cards, [CardName.ESTATE, CardName.GOLD] * 2)
+    assert len(other) == 3
+    other.move_several_to(cards, [CardName.GOLD, CardName.ESTATE])
+    assert list(other) == [CardName.GOLD]
+    assert cards.quantity(CardName.GOLD) == 1
+    assert cards.quantity(CardName.ESTATE) == 1
+
+    assert cards.move_top_to(other, 2) == 2
+    assert list(other) == [CardName.GOLD, CardName.VILLAGE, CardName.COPPER]
+    assert cards.move_top_to(other, 5) == 2
+    assert not cards
+    assert cards.move_top_to(other, 1) == 0
+    assert len(other) == 5
+
+
+def test_cards_container_moves_keep_possession() -> None:
+    possession = Possession()
+    deck = CardContainer(possession)
+    hand = CardContainer(possession)
+    stock = CardContainer()
+    stock.append_several(3, CardName.PROVINCE)
+    deck.append_several(3, CardName.ESTATE)
+
+    deck.move_top_to(hand, 2)
+    stock.move_to(hand, CardName.PROVINCE, 2)
+    assert possession.score == 3 + 2 * 6
+    hand.move_to(stock, CardName.ESTATE)
+    assert possession.score == 2 + 2 * 6
+    assert possession.quantity(CardName.ESTATE) == 2
+
+
+def test_supply_index() -> None:
+    supply = SupplyIndex()
+    stock = CardContainer(supply)
+    stock.append_several(2, CardName.VILLAGE)
+    stock.append_several(2, CardName.SILVER)
+    stock.append(CardName.ESTATE)
+    stock.append(CardName.GOLD)
+    stock.append(CardName.SMITHY)
+    assert supply.piles(3) == sorted(
+        [CardName.VILLAGE, CardName.SILVER, CardName.ESTATE],
+        key=card_ids.__getitem__,
+    )
+    assert supply.piles(4, min_cost=4) == [CardName.SMITHY]
+    assert supply.piles(6, kind="treasure") == sorted(
+        [CardName.SILVER, CardName.GOLD],
+        key=card_ids.__getitem__,
+    )
+    assert supply.piles(5, kind="action") == sorted(
+        [CardName.VILLAGE, CardName.SMITHY],
+        key=card_ids.__getitem__,
+    )
+    assert supply.piles(1, kind="victory") == []
+
+    hand = CardContainer()
+    stock.move_to(hand, CardName.VILLAGE, 2)
+    stock.remove(CardName.SMITHY)
+    assert supply.piles(5, kind="action") == []
+    hand.move_to(stock, CardName.VILLAGE)
+    assert supply.piles(5, kind="action") == [CardName.VILLAGE]
+
+
+def test_cards_container_copy_on_write() -> None:
+    possession = Possession()
+    hand = CardContainer(possession)
+    hand.extend([CardName.GOLD, CardName.VILLAGE, CardName.COPPER])
+    snapshot = hand.copy()
+    snapshot_of_snapshot = snapshot.copy()
+    discard = CardContainer(possession)
+
+    seen = []
+    for card_name in snapshot:
+        seen.append(card_name)
+        hand.move_to(discard, card_name)
+        hand.append(CardName.ESTATE)
+    assert seen == [CardName.GOLD, CardName.VILLAGE, CardName.COPPER]
+    assert list(snapshot) == seen
+    assert snapshot.money == 4
+    assert list(hand) == [CardName.ESTATE] * 3
+    assert hand.money == 0
+
+    snapshot.pop(0)
+    snapshot.prepend(CardName.SILVER)
+    assert list(snapshot) == [CardName.SILVER, CardName.VILLAGE, CardName.COPPER]
+    assert list(snapshot_of_snapshot) == seen
+    assert possession.nb_cards == 6
+
+    discard.copy().empty_to(hand)
+    assert len(discard) == 3
+    assert len(hand) == 6
+
+
+@pytest.mark.parametrize("random_backend", ["random", "numpy"])
+def test_cards_container_shuffle_copy_on_write(random_backend: str) -> None:
+    rng: Any = random.Random(0)  # noqa: S311
+    if random_backend == "numpy":
+        np = pytest.importorskip("numpy")
+        rng = np.random.default_rng(0)
+    deck = CardContainer()
+    deck.append_several(5, CardName.COPPER)
+    deck.append_several(3, CardName.ESTATE)
+    snapshot = deck.copy()
+
+    deck.shuffle(rng)
+    deck.append(CardName.SILVER)
+    assert snapshot.quantity(CardName.SILVER) == 0
+    assert len(snapshot) == 8
+    assert snapshot.money == 5
+    assert list(snapshot) == [CardName.COPPER] * 5 + [CardName.ESTATE] * 3
+    assert deck.quantity(CardName.SILVER) == 1
+    assert len(deck) == 9
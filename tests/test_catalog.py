@@ -0,0 +1,136 @@
+import datetime
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from dopynion import catalog
+from dopynion.catalog import CATALOG_NAME, Catalog, catalog_entry
+from dopynion.data_model import CardName, Cards
+from dopynion.game import Game
+from dopynion.player import Player
+from dopynion.record import Record, RecordFormat, RecordLevel
+
+
+def province_for(winner: str) -> Callable[[Player], None]:
+    def play_turn(player: Player) -> None:
+        player.start_turn()
+        if player.name == winner:
+            player.deck.append(CardName.PROVINCE)
+            player.draw(1)
+        player.end_turn()
+
+    return play_turn
+
+
+def test_catalog_entry() -> None:
+    date = datetime.datetime.now(tz=datetime.UTC)
+    stock = Cards(quantities={CardName.COPPER: 46, CardName.MILITIA: 10})
+    entry = catalog_entry("game", date, stock, {"toto": 3, "tata": 9}, 4)
+    assert entry.kingdom == [CardName.MILITIA]
+    assert entry.players == ["toto", "tata"]
+    assert entry.winner == "tata"
+    assert catalog_entry("game", date, stock, {"toto": 3, "tata": 3}, 4).winner is None
+    assert catalog_entry("game", date, stock, {"toto": 3}, 4).winner == "toto"
+
+
+def test_record_updates_catalog(play_a_game: Callable[..., Game]) -> None:
+    record = Record()
+    game = play_a_game(Game(record), province_for("tata"))
+    game.save()
+
+    with Catalog(record.path.parent / CATALOG_NAME) as games_catalog:
+        entries = games_catalog.games()
+        assert len(entries) == 1
+        entry = entries[0]
+        assert entry.name == record.path.name
+        assert entry.date == record.game_record.date
+        assert set(entry.kingdom) == set(game.kingdom)
+        assert entry.scores == {"toto": 3, "tata": 9}
+        assert entry.winner == "tata"
+        assert entry.nb_turns == 2
+        assert games_catalog.leaderboard()[0][:3] == ("tata", 1, 1)
+
+
+@pytest.mark.parametrize("record_format", ["json", "jsonl"])
+def test_rebuild_catalog(
+    record_format: RecordFormat,
+    capsys: pytest.CaptureFixture[str],
+    play_a_game: Callable[..., Game],
+) -> None:
+    records = [Record(record_format) for _ in range(3)]
+    for record, winner in zip(records, ("toto", "tata", "toto"), strict=True):
+        play_a_game(Game(record), province_for(winner))
+    records_dir = records[0].path.parent
+    with Catalog(records_dir / CATALOG_NAME) as games_catalog:
+        entries = games_catalog.games()
+    (records_dir / CATALOG_NAME).unlink()
+
+    catalog.main(["rebuild", "--records-dir", str(records_dir)])
+    assert "3 games" in capsys.readouterr().out
+    with Catalog(records_dir / CATALOG_NAME) as games_catalog:
+        assert games_catalog.games() == entries
+        assert [entry.name for entry in games_catalog.games(limit=2)] == [
+            record.path.name for record in records[:0:-1]
+        ]
+        assert games_catalog.games(player="titi") == []
+        since = records[1].game_record.date
+        assert len(games_catalog.games(player="toto", since=since)) == 2
+        leaderboard = games_catalog.leaderboard()
+        assert [entry.player for entry in leaderboard] == ["toto", "tata"]
+        assert leaderboard[0].nb_wins == 2
+
+    catalog.main(["leaderboard", "--records-dir", str(records_dir)])
+    assert "toto: 2 wins in 3 games" in capsys.readouterr().out
+    catalog.main(["list", "--records-dir", str(records_dir)])
+    assert records[0].path.name in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("record_format", ["json", "jsonl", "replay"])
+@pytest.mark.parametrize("level", list(RecordLevel))
+def test_live_and_rebuilt_catalog_entries(
+    record_format: RecordFormat,
+    level: RecordLevel,
+) -> None:
+    record = Record(record_format, level=level)
+    game = Game(record)
+    for name in ("toto", "tata"):
+        game.add_player(Player(name))
+    game.start()
+    game.players[1].eliminate()  # an error before the first turn
+    for player in game.players:
+        player.start_turn()
+        player.end_turn()
+    while CardName.PROVINCE in game.stock:
+        game.stock.remove(CardName.PROVINCE)
+    game.save()
+    records_dir = record.path.parent
+    with Catalog(records_dir / CATALOG_NAME) as games_catalog:
+        live_entries = games_catalog.games()
+        assert games_catalog.rebuild(records_dir) == 1
+        assert games_catalog.games() == live_entries
+
+
+def test_empty_catalog(tmp_path: Path) -> None:
+    with Catalog(tmp_path / "catalog" / CATALOG_NAME) as games_catalog:
+        assert games_catalog.rebuild(tmp_path) == 0
+        assert games_catalog.games() == []
+        assert games_catalog.leaderboard() == []
+
+
+@pytest.mark.parametrize("record_format", ["json", "jsonl"])
+def test_rebuild_skips_unstarted_and_unreadable_records(
+    record_format: RecordFormat,
+    caplog: pytest.LogCaptureFixture,
+    play_a_game: Callable[..., Game],
+) -> None:
+    record = Record(record_format)
+    play_a_game(Game(record), province_for("toto"))
+    Record(record_format)  # not started
+    records_dir = record.path.parent
+    broken = records_dir / "game__broken.dop"
+    broken.write_text("not a record\n", encoding="utf-8")
+    with Catalog(records_dir / CATALOG_NAME) as games_catalog:
+        assert games_catalog.rebuild(records_dir) == 1
+        assert [entry.name for entry in games_catalog.games()] == [record.path.name]
+    assert str(broken) in caplog.text
@@ -0,0 +1,186 @@
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from dopynion import event_index
+from dopynion.data_model import (
+    ActionRecord,
+    CardName,
+    Cards,
+    ErrorRecord,
+    PlayerTurnRecord,
+)
+from dopynion.data_model import Player as PlayerData
+from dopynion.event_index import EVENT_INDEX_NAME, EventIndex, GameEvent, game_events
+from dopynion.exceptions import ActionDuringBuyError, NotEnoughMoneyError
+from dopynion.game import Game
+from dopynion.player import Player
+from dopynion.record import Record, RecordFormat
+
+
+def workshop_and_silver_for(buyer: str) -> Callable[[Player], None]:
+    def play_turn(player: Player) -> None:
+        if player.name == buyer:
+            player.hand.append(CardName.WORKSHOP)
+            player.hand.append(CardName.GOLD)
+        player.start_turn()
+        if player.name == buyer:
+            player.action(CardName.WORKSHOP)
+            player.buy(CardName.SILVER)
+        player.end_turn()
+
+    return play_turn
+
+
+def test_game_events(play_a_game: Callable[..., Game]) -> None:
+    record = Record()
+    game = play_a_game(Game(record), workshop_and_silver_for("tata"), nb_rounds=2)
+    events = list(game_events(record.game_record.stock, record.game_record.turns))
+
+    kingdom = {event.card for event in events if event.kind == "kingdom"}
+    assert kingdom == set(game.kingdom)
+    assert GameEvent("workshop", "action", "tata", 1) in events
+    assert GameEvent("silver", "buy", "tata", 2) in events
+    assert {event.kind for event in events} == {
+        "kingdom",
+        "action",
+        "buy",
+        "choose_card_to_receive_in_discard",
+    }
+    assert all(event.player == "tata" for event in events if event.kind != "kingdom")
+
+
+def test_failed_commands_are_not_indexed() -> None:
+    record = Record()
+    game = Game(record)
+    for name in ("toto", "tata"):
+        game.add_player(Player(name))
+    game.start()
+    toto = game.players[0]
+    toto.start_turn()
+    with pytest.raises(ActionDuringBuyError):
+        toto.action(CardName.WITCH)
+    with pytest.raises(NotEnoughMoneyError):
+        toto.buy(CardName.PROVINCE)
+    toto.buy("Copper")  # type: ignore[arg-type]
+    toto.end_turn()
+    events = list(game_events(record.game_record.stock, record.game_record.turns))
+
+    assert [event for event in events if event.kind != "kingdom"] == [
+        GameEvent("copper", "buy", "toto", 1),
+    ]
+
+
+def test_triggered_errors_do_not_fail_commands() -> None:
+    toto = PlayerData(name="toto", hand=None, score=3)
+    turn = PlayerTurnRecord(
+        actions=[
+            ActionRecord(action="ACTION militia", player=toto, score=3),
+            ErrorRecord(error="Error: ValueError() ValueError()", player=toto),
+            ErrorRecord(error="Elimination", player=toto),
+            ActionRecord(action="ACTION witch", player=toto, score=3),
+            ErrorRecord(error="Hook error, ValueError: oops", player=toto),
+        ],
+    )
+
+    assert list(game_events(Cards(), [turn])) == [
+        GameEvent("militia", "action", "toto", 1),
+        GameEvent("witch", "action", "toto", 1),
+    ]
+
+
+def test_update_indexes_games_in_progress_again() -> None:
+    record = Record("jsonl")
+    game = Game(record)
+    for name in ("toto", "tata"):
+        game.add_player(Player(name))
+    game.start()
+    toto, tata = game.players
+    toto.start_turn()
+    toto.end_turn()
+    game.save()
+    records_dir = record.path.parent
+    with EventIndex(records_dir / EVENT_INDEX_NAME) as index:
+        assert index.update(records_dir) == 1
+        assert index.games(kind="buy") == set()
+
+        tata.hand.append(CardName.GOLD)
+        tata.start_turn()
+        tata.buy(CardName.SILVER)
+        tata.end_turn()
+        game.save()
+        assert index.update(records_dir) == 1
+        assert index.games(kind="buy") == {record.path.name}
+        assert index.update(records_dir) == 0
+
+
+@pytest.mark.parametrize("spill", [False, True])
+def test_record_updates_event_index(
+    play_a_game: Callable[..., Game],
+    *,
+    spill: bool,
+) -> None:
+    records = [
+        Record("jsonl", spill=spill, background=spill),
+        Record("jsonl", spill=spill),
+    ]
+    games = [
+        play_a_game(Game(record), workshop_and_silver_for(buyer), nb_rounds=2)
+        for record, buyer in zip(records, ("toto", "tata"), strict=True)
+    ]
+    names = [record.path.name for record in records]
+
+    with EventIndex(records[0].path.parent / EVENT_INDEX_NAME) as index:
+        assert index.games(card=CardName.SILVER, kind="buy") == set(names)
+        assert index.games(card=CardName.SILVER, player="toto") == {names[0]}
+        assert index.games(card=CardName.SILVER, before_turn=2) == set(names)
+        assert index.games(card=CardName.SILVER, after_turn=2) == set()
+        assert index.games(player="titi") == set()
+        card_name = games[0].kingdom[0]
+        assert names[0] in index.games(card=card_name, kind="kingdom")
+    for record in records:
+        record.close()
+
+
+@pytest.mark.parametrize("record_format", ["json", "jsonl"])
+def test_rebuild_event_index(
+    record_format: RecordFormat,
+    capsys: pytest.CaptureFixture[str],
+    play_a_game: Callable[..., Game],
+) -> None:
+    records = [Record(record_format) for _ in range(3)]
+    for record, buyer in zip(records, ("toto", "tata", "toto"), strict=True):
+        play_a_game(Game(record), workshop_and_silver_for(buyer), nb_rounds=2)
+    records_dir = records[0].path.parent
+    with EventIndex(records_dir / EVENT_INDEX_NAME) as index:
+        bought_by_toto = index.games(card=CardName.SILVER, player="toto")
+    assert len(bought_by_toto) == 2
+    (records_dir / EVENT_INDEX_NAME).unlink()
+
+    event_index.main(["update", "--records-dir", str(records_dir)])
+    assert "3 games" in capsys.readouterr().out
+    event_index.main(["update", "--records-dir", str(records_dir)])
+    assert "0 games" in capsys.readouterr().out
+    event_index.main(["rebuild", "--records-dir", str(records_dir)])
+    assert "3 games" in capsys.readouterr().out
+    event_index.main(
+        [
+            "query",
+            "--records-dir",
+            str(records_dir),
+            "--card",
+            "silver",
+            "--player",
+            "toto",
+            "--before-turn",
+            "5",
+        ],
+    )
+    assert set(capsys.readouterr().out.split()) == bought_by_toto
+
+
+def test_empty_event_index(tmp_path: Path) -> None:
+    with EventIndex(tmp_path / "index" / EVENT_INDEX_NAME) as index:
+        assert index.rebuild(tmp_path) == 0
+        assert index.games() == set()
@@ -1,11 +1,15 @@
+import random
+
 import pytest
 
+from dopynion.data_model import CardName, RandomBackend
 from dopynion.exceptions import (
     AddPlayerDuringGameError,
     InvalidCommandError,
 )
 from dopynion.game import Game
 from dopynion.player import Player
+from dopynion.record import MemoryRecord, NullRecord
 
 
 def test_can_add_player(game: Game) -> None:
@@ -39,6 +43,7 @@ def test_initial_money(game: Game) -> None:
     assert game.gold_qty == 30
     assert game.silver_qty == 40
     assert game.copper_qty == 60 - 7 * 2
+    assert game.stock.quantity(CardName.COPPER) == 60 - 7 * 2
 
 
 def test_initial_estates_2_players(game: Game) -> None:
@@ -49,6 +54,7 @@ def test_initial_estates_2_players(game: Game) -> None:
     assert game.duchy_qty == 8
     assert game.province_qty == 8
     assert game.colony_qty == 8
+    assert game.stock.quantity(CardName.PROVINCE) == 8
 
 
 def test_initial_estates_3_players(game: Game) -> None:
@@ -62,6 +68,26 @@ def test_initial_estates_3_players(game: Game) -> None:
     assert game.colony_qty == 12
 
 
+@pytest.mark.parametrize(
+    ("nb_players", "victory_qty", "curse_qty"),
+    [(2, 8, 10), (3, 12, 20), (4, 12, 30)],
+)
+def test_stock_quantities_per_nb_players(
+    game: Game,
+    nb_players: int,
+    victory_qty: int,
+    curse_qty: int,
+) -> None:
+    for index in range(nb_players):
+        game.add_player(Player(str(index)))
+    game.start()
+    for card_name in (CardName.ESTATE, CardName.DUCHY, CardName.PROVINCE):
+        assert game.stock.quantity(card_name) == victory_qty
+    assert game.stock.quantity(CardName.CURSE) == curse_qty
+    assert game.stock.quantity(CardName.COPPER) == 60 - 7 * nb_players
+    assert game.state.stock.quantities[CardName.PROVINCE] == victory_qty
+
+
 def test_initial_malediction_2_players(game: Game) -> None:
     game.add_player(Player("1"))
     game.add_player(Player("2"))
@@ -84,3 +110,91 @@ def test_initial_malediction_4_players(game: Game) -> None:
     game.add_player(Player("4"))
     game.start()
     assert game.curse_qty == 30
+
+
+def new_game(
+    seed: int | None,
+    random_backend: RandomBackend = "random",
+) -> tuple[Game, Player]:
+    game = Game(MemoryRecord(), seed, random_backend)
+    player = Player("toto")
+    game.add_player(player)
+    game.add_player(Player("tata"))
+    game.start()
+    return game, player
+
+
+def draw_all(game: Game, player: Player) -> list[CardName]:
+    for _ in range(5):
+        player.start_turn()
+        player.end_turn()
+    return [*game.kingdom, *player.hand, *player.deck]
+
+
+def test_same_seed_same_game() -> None:
+    game, player = new_game(seed=7)
+    cards = draw_all(game, player)
+    other_game, other_player = new_game(seed=7)
+    assert draw_all(other_game, other_player) == cards
+    assert isinstance(game.record, MemoryRecord)
+    assert game.record.game_record.seed == 7
+    assert new_game(seed=None)[0].seed != new_game(seed=None)[0].seed
+
+
+def test_games_do_not_share_random_state() -> None:
+    game, player = new_game(seed=7)
+    expected = draw_all(game, player)
+    game, player = new_game(seed=7)
+    other_game, other_player = new_game(seed=8)
+    random.seed(0)
+    random.shuffle(list(range(10)))
+    draw_all(other_game, other_player)
+    assert draw_all(game, player) == expected
+
+
+def test_numpy_random_backend() -> None:
+    pytest.importorskip("numpy")
+    game, player = new_game(seed=7, random_backend="numpy")
+    cards = draw_all(game, player)
+    other_game, other_player = new_game(seed=7, random_backend="numpy")
+    assert draw_all(other_game, other_player) == cards
+    assert game.shuffle_random is not game.random
+    clone = game.clone()
+    assert draw_all(clone, clone.players[0]) == draw_all(game, player)
+
+
+def test_numpy_random_backend_negative_seed() -> None:
+    pytest.importorskip("numpy")
+    game, player = new_game(seed=-5, random_backend="numpy")
+    cards = draw_all(game, player)
+    other_game, other_player = new_game(seed=-5, random_backend="numpy")
+    assert draw_all(other_game, other_player) == cards
+
+
+def test_clone(game_with_two_players: tuple[Game, Player, Player]) -> None:
+    game, player, _ = game_with_two_players
+    player.start_turn()
+    clone = game.clone()
+    same_future = game.clone()
+    clone_player = clone.players[0]
+    assert clone.state == game.state
+    assert isinstance(clone.record, NullRecord)
+    assert clone_player.game is clone
+    assert clone_player.state_machine == player.state_machine
+
+    clone_player.buy(CardName.COPPER)
+    while CardName.ESTATE in clone.stock:
+        clone.stock.remove(CardName.ESTATE)
+    assert clone.stock.quantity(CardName.COPPER) == game.copper_qty - 1
+    assert clone_player.possession.nb_cards == player.possession.nb_cards + 1
+    assert CardName.ESTATE not in clone.supply.piles(2)
+    assert CardName.ESTATE in game.supply.piles(2)
+    assert player.purchases_left == 1
+
+    for current_game in (game, same_future):
+        for _ in range(4):
+            for current_player in current_game.players:
+                if current_player.playing:
+                    current_player.end_turn()
+                current_player.start_turn()
+    assert same_future.state == game.state
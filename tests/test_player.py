@@ -1,6 +1,6 @@
 import pytest
 
-from dopynion.cards import CardName
+from dopynion.cards import Card, CardContainer, CardName
 from dopynion.exceptions import (
     ActionDuringBuyError,
     InvalidActionError,
@@ -65,3 +65,91 @@ def test_discard_valid_card(empty_player: Player) -> None:
 
     assert len(player.discard) == 1
     assert len(player.hand) == 4
+
+
+def test_discard_several_cards(empty_player: Player) -> None:
+    player = empty_player
+    player.hand.append_several(2, CardName.CELLAR)
+    player.hand.append(CardName.VILLAGE)
+    player.start_turn()
+
+    with pytest.raises(InvalidDiscardError):
+        player.discard_cards([CardName.CELLAR, CardName.VILLAGE, CardName.VILLAGE])
+    assert len(player.hand) == 3
+
+    player.discard_cards([CardName.CELLAR, CardName.VILLAGE, CardName.CELLAR])
+    assert not player.hand
+    assert player.discard.cellar_qty == 2
+    assert player.discard.village_qty == 1
+
+
+def test_draw(empty_player: Player) -> None:
+    player = empty_player
+    player.deck.append_several(2, CardName.GOLD)
+    player.discard.append_several(3, CardName.SILVER)
+
+    assert player.draw(3) == 3
+    assert player.hand.gold_qty == 2
+    assert player.hand.silver_qty == 1
+    assert len(player.deck) == 2
+    assert not player.discard
+
+    drawn_cards = CardContainer()
+    assert player.draw(4, drawn_cards) == 2
+    assert list(drawn_cards) == [CardName.SILVER, CardName.SILVER]
+    assert not player.deck
+    assert player.draw(1) == 0
+
+
+def recompute_score(player: Player) -> int:
+    cards = [
+        *player.hand,
+        *player.discard,
+        *player.deck,
+        *player.played_cards,
+    ]
+    return (
+        sum(Card.class_(card_name).victory_points for card_name in cards)
+        + cards.count(CardName.GARDENS) * (len(cards) // 10)
+        + cards.count(CardName.FAIRGROUNDS) * (len(set(cards)) // 5)
+    )
+
+
+def test_score_follows_cards(empty_player: Player) -> None:
+    player = empty_player
+    assert player.score()["score"] == 0
+
+    player.deck.append_several(8, CardName.COPPER)
+    player.deck.append(CardName.GARDENS)
+    player.deck.prepend(CardName.FAIRGROUNDS)
+    player.discard.append_several(2, CardName.PROVINCE)
+    player.hand.append(CardName.CURSE)
+    assert player.score()["score"] == recompute_score(player) == 12 - 1 + 1 + 1
+
+    player.hand.append_several(3, CardName.ESTATE)
+    player.hand.append(CardName.SILVER)
+    assert player.score()["score"] == recompute_score(player) == 12 - 1 + 3 + 1 + 1
+
+    player.discard.empty_to(player.deck)
+    player.hand.empty_to(player.played_cards)
+    player.played_cards.remove(CardName.CURSE)
+    player.deck.pop(0)
+    assert player.score()["score"] == recompute_score(player)
+
+    drawn_cards = CardContainer()
+    player.deck.empty_to(drawn_cards)
+    assert player.score()["score"] == recompute_score(player)
+    drawn_cards.empty_to(player.discard)
+    assert player.score()["score"] == recompute_score(player)
+
+    player.discard.clear()
+    player.played_cards.clear()
+    assert player.possession.nb_cards == 0
+    assert player.possession.nb_distinct_cards == 0
+    assert player.score()["score"] == 0
+    assert player.score()["gardens_qty"] == 0
+
+
+def test_score_of_eliminated_player(player: Player) -> None:
+    player.eliminate()
+    assert player.score() == {"score": -10000}
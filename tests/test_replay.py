@@ -0,0 +1,200 @@
+import random
+from collections.abc import Callable
+
+import pytest
+
+from dopynion.data_model import CardName, Hand, ReplayCommand, ReplayRecord
+from dopynion.exceptions import (
+    HookError,
+    InvalidCommandError,
+    InvalidDiscardError,
+    InvalidRecordError,
+)
+from dopynion.game import Game
+from dopynion.player import DefaultPlayerHooks, Player, PlayerHooks
+from dopynion.record import MemoryRecord, Record
+from dopynion.replay import ReplayHooks, replay
+
+
+class TrashRefusedError(Exception):
+    pass
+
+
+class RefusingHooks(DefaultPlayerHooks):
+    def trash_card_from_hand(self, _decision_input: Hand) -> CardName:  # noqa: PLR6301
+        msg = "no card to trash"
+        raise TrashRefusedError(msg)
+
+
+class DiscardRefusedError(Exception):
+    pass
+
+
+class AttackRefusingHooks(DefaultPlayerHooks):
+    def discard_card_from_hand(self, _decision_input: Hand) -> CardName:  # noqa: PLR6301
+        msg = "no card to discard"
+        raise DiscardRefusedError(msg)
+
+
+@pytest.fixture(name="play_random_game")
+def _play_random_game(play_a_game: Callable[..., Game]) -> Callable[..., Game]:
+    def play_random_game(
+        game: Game,
+        nb_turns: int,
+        hooks_class: type[PlayerHooks] = DefaultPlayerHooks,
+        nb_players: int = 3,
+    ) -> Game:
+        rng = random.Random(1)  # noqa: S311
+
+        def play_turn(player: Player) -> None:
+            player.start_turn()
+            while player.actions_left and player.hand.contains_action():
+                player.action(rng.choice(list(player.hand.action_cards)))
+            while player.purchases_left and player.hand.contains_money():
+                buyables = game.supply.piles(player.money + player.hand.money)
+                if not buyables:
+                    break
+                try:
+                    player.buy(rng.choice([*buyables, CardName.PROVINCE]))
+                except InvalidCommandError:
+                    break
+            player.end_turn()
+
+        play_a_game(
+            game,
+            play_turn,
+            nb_players=nb_players,
+            nb_rounds=nb_turns,
+            hooks_class=hooks_class,
+            finish=False,
+        )
+        if not game.finished:
+            game.players[2].eliminate()
+        return game
+
+    return play_random_game
+
+
+def test_replay(play_random_game: Callable[..., Game]) -> None:
+    record = Record("replay")
+    game = Game(record, seed=0)
+    play_random_game(game, nb_turns=30)
+    path = record.save(game.state)
+
+    replay_record = ReplayRecord.model_validate_json(path.read_bytes())
+    assert replay_record.seed == game.seed
+    assert replay_record.kingdom == game.kingdom
+    assert any(command[1] == "HOOK" for command in replay_record.commands)
+    assert replay(replay_record) == record.game_record
+    assert Record.load(path) == record.game_record
+    assert len(record.game_record.model_dump_json()) > 5 * path.stat().st_size
+
+
+def test_replay_discards_and_hook_errors(play_random_game: Callable[..., Game]) -> None:
+    record = Record("replay")
+    game = Game(record, seed=0)
+    play_random_game(game, nb_turns=10, hooks_class=RefusingHooks)
+    player = game.players[0]
+    player.start_turn()
+    player.discard_one_card_from_hand(player.hand[0])
+    player.discard_cards([player.hand[0], player.hand[1]])
+    player.discard_cards([])
+    with pytest.raises(InvalidDiscardError):
+        player.discard_one_card_from_hand(CardName.PROVINCE)
+    player.end_turn()
+    path = record.save(game.state)
+
+    replay_record = ReplayRecord.model_validate_json(path.read_bytes())
+    hook_errors = [command for command in replay_record.commands if len(command) == 4]
+    assert hook_errors
+    assert hook_errors[0][2:] == (
+        f"{__name__}.TrashRefusedError",
+        "no card to trash",
+    )
+    assert any(command[1].startswith("DISCARD ") for command in replay_record.commands)
+    assert replay(replay_record) == record.game_record
+
+
+def test_replay_hook_errors_during_attack(
+    play_random_game: Callable[..., Game],
+) -> None:
+    record = Record("replay")
+    game = Game(record, seed=0)
+    play_random_game(game, nb_turns=15, hooks_class=AttackRefusingHooks, nb_players=4)
+    assert CardName.MILITIA in game.kingdom
+    path = record.save(game.state)
+
+    replay_record = ReplayRecord.model_validate_json(path.read_bytes())
+    commands = replay_record.commands
+    # an attacked player eliminated by its hook, before the hook of the next one
+    assert any(
+        command[1] == "HOOK ERROR"
+        and next_command[1] == "ELIMINATION"
+        and following[1] in {"HOOK", "HOOK ERROR"}
+        for command, next_command, following in zip(
+            commands, commands[1:], commands[2:], strict=False
+        )
+    )
+    assert replay(replay_record) == record.game_record
+
+
+def test_replayed_hook_errors() -> None:
+    commands: list[ReplayCommand] = [
+        (0, "HOOK ERROR", "builtins.ValueError", "invalid"),
+        (0, "HOOK ERROR", "dopynion.exceptions.InvalidDiscardError", "discard"),
+        (0, "HOOK ERROR", "builtins.UnicodeDecodeError", "unicode"),
+        (0, "HOOK ERROR", "mybot.BotError", "bot"),
+    ]
+    hooks = ReplayHooks(iter(commands), 0)
+    with pytest.raises(ValueError, match="invalid"):
+        hooks.confirm_discard_deck()
+    with pytest.raises(InvalidDiscardError, match="discard"):
+        hooks.confirm_discard_deck()
+    with pytest.raises(HookError, match="unicode") as error_info:
+        hooks.confirm_discard_deck()
+    assert repr(error_info.type) == "<class 'UnicodeDecodeError'>"
+    with pytest.raises(HookError, match="bot") as error_info:
+        hooks.confirm_discard_deck()
+    assert repr(error_info.type) == "<class 'mybot.BotError'>"
+    assert error_info.value.type_name == "mybot.BotError"
+
+
+def test_same_seed_same_game(play_random_game: Callable[..., Game]) -> None:
+    records = []
+    for _ in range(2):
+        record = MemoryRecord()
+        game = Game(record, seed=42)
+        play_random_game(game, nb_turns=10)
+        game.save()
+        records.append(record.game_record.model_dump(exclude={"date"}))
+    assert records[0] == records[1]
+
+
+def test_invalid_replay(play_random_game: Callable[..., Game]) -> None:
+    record = Record("replay")
+    game = Game(record)
+    play_random_game(game, nb_turns=3)
+    game.save()
+    assert record._replay_record is not None  # noqa: SLF001
+    replay_record = record._replay_record.model_copy()  # noqa: SLF001
+
+    replay_record.kingdom = replay_record.kingdom[::-1]
+    with pytest.raises(InvalidRecordError, match="kingdom"):
+        replay(replay_record)
+
+    replay_record.kingdom = game.kingdom
+    replay_record.commands = [(0, "START OF TURN"), (0, "HOOK", True)]
+    with pytest.raises(InvalidRecordError, match="HOOK"):
+        replay(replay_record)
+
+
+def test_replay_numpy_random_backend(play_random_game: Callable[..., Game]) -> None:
+    pytest.importorskip("numpy")
+    record = Record("replay")
+    game = Game(record, seed=0, random_backend="numpy")
+    play_random_game(game, nb_turns=10)
+    path = record.save(game.state)
+
+    replay_record = ReplayRecord.model_validate_json(path.read_bytes())
+    assert replay_record.random_backend == "numpy"
+    assert replay(replay_record) == record.game_record
@@ -0,0 +1,205 @@
+import datetime
+import os
+import zipfile
+from collections.abc import Callable
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from dopynion import retention
+from dopynion.catalog import CATALOG_NAME, Catalog
+from dopynion.event_index import EVENT_INDEX_NAME, EventIndex
+from dopynion.game import Game
+from dopynion.record import RECORD_NAME_FORMAT, Record, RecordReader
+from dopynion.retention import (
+    ARCHIVES_DIR_NAME,
+    Archives,
+    RetentionPolicy,
+    apply_retention,
+    game_date,
+    load_game,
+)
+
+NOW = datetime.datetime(2024, 6, 10, 12, tzinfo=datetime.UTC)
+
+
+@pytest.fixture(name="play_games")
+def _play_games(play_a_game: Callable[..., Game]) -> Callable[[int], Path]:
+    def play_games(nb_games: int) -> Path:
+        for _ in range(nb_games):
+            record = Record("jsonl")
+            play_a_game(Game(record))
+            RecordReader(record.path).index  # noqa: B018
+        return record.path.parent
+
+    return play_games
+
+
+def date_games(
+    records_dir: Path,
+    days_ago: list[float],
+    now: datetime.datetime = NOW,
+) -> list[str]:
+    paths = sorted(records_dir.glob("game__*.dop"))
+    names = []
+    for path, days in zip(paths, days_ago, strict=True):
+        date = now - datetime.timedelta(days=days)
+        name = date.strftime(RECORD_NAME_FORMAT)
+        path.rename(path.with_name(name))
+        os.utime(path.with_name(name), (date.timestamp(), date.timestamp()))
+        path.with_name(path.name + ".idx").unlink()
+        names.append(name)
+    return names
+
+
+def test_game_date() -> None:
+    date = game_date("game__2024_06_10__08_30_05_000012.dop")
+    paris = ZoneInfo("Europe/Paris")
+    assert date == datetime.datetime(2024, 6, 10, 8, 30, 5, 12, tzinfo=paris)
+
+
+def test_archive_and_read_in_place(play_games: Callable[[int], Path]) -> None:
+    records_dir = play_games(3)
+    expected = {
+        path.name: Record.load(path) for path in records_dir.glob("game__*.dop")
+    }
+    idx_files = list(records_dir.glob("*.idx"))
+    assert len(idx_files) == 3
+
+    now = datetime.datetime.now(tz=datetime.UTC) + datetime.timedelta(days=2)
+    report = apply_retention(records_dir, RetentionPolicy(), now)
+    assert sorted(report.archived) == sorted(expected)
+    assert report.deleted == []
+    assert list(records_dir.glob("game__*")) == []
+    archives = list((records_dir / ARCHIVES_DIR_NAME).glob("*.zip"))
+    assert len(archives) in {1, 2}  # unless run at midnight
+    with zipfile.ZipFile(archives[0]) as archive:
+        assert archive.infolist()[0].compress_type == zipfile.ZIP_LZMA
+    for name, game_record in expected.items():
+        assert load_game(records_dir, name) == game_record
+    with pytest.raises(FileNotFoundError):
+        load_game(records_dir, "game__2000_01_01__00_00_00_000000.dop")
+
+    report = apply_retention(records_dir, RetentionPolicy(), now)
+    assert report == ([], [])
+
+
+def test_archive_only_finished_or_idle_games(
+    play_games: Callable[[int], Path],
+    play_a_game: Callable[..., Game],
+) -> None:
+    records_dir = play_games(1)
+    finished = next(records_dir.glob("game__*.dop"))
+    record = Record("jsonl")
+    play_a_game(Game(record), finish=False)
+    unfinished = record.path
+    stray = records_dir / "game__stray.dop"
+    stray.touch()
+
+    now = datetime.datetime.now(tz=datetime.UTC) + datetime.timedelta(days=2)
+    for path in (finished, unfinished):
+        os.utime(path, (now.timestamp(), now.timestamp()))  # still written to
+    report = apply_retention(records_dir, RetentionPolicy(), now)
+    assert report.archived == [finished.name]
+    assert unfinished.exists()
+    assert stray.exists()
+
+    idle = now - datetime.timedelta(days=1, seconds=1)
+    os.utime(unfinished, (idle.timestamp(), idle.timestamp()))
+    report = apply_retention(records_dir, RetentionPolicy(), now)
+    assert report.archived == [unfinished.name]
+    assert stray.exists()
+    record.close()
+
+
+def test_per_day_archives(play_games: Callable[[int], Path]) -> None:
+    records_dir = play_games(4)
+    names = date_games(records_dir, [3, 2.9, 2, 0])
+    report = apply_retention(records_dir, RetentionPolicy(), NOW)
+    assert report.archived == sorted(names[:3])
+    archives = Archives(records_dir)
+    assert archives.index == {
+        names[0]: "games__2024_06_07.zip",
+        names[1]: "games__2024_06_07.zip",
+        names[2]: "games__2024_06_08.zip",
+    }
+    assert (records_dir / names[3]).exists()
+    assert set(archives.sizes()) == set(names[:3])
+
+
+def test_delete_past_horizon(play_games: Callable[[int], Path]) -> None:
+    records_dir = play_games(4)
+    names = date_games(records_dir, [40, 31, 10, 0])
+    with Catalog(records_dir / CATALOG_NAME) as catalog:
+        assert catalog.rebuild(records_dir) == 4
+    with EventIndex(records_dir / EVENT_INDEX_NAME) as event_index:
+        assert event_index.rebuild(records_dir) == 4
+
+    policy = RetentionPolicy(delete_after=datetime.timedelta(days=30))
+    report = apply_retention(records_dir, policy, NOW)
+    assert report.deleted == sorted(names[:2])
+    assert Archives(records_dir).index == {names[2]: "games__2024_05_31.zip"}
+    assert not (records_dir / ARCHIVES_DIR_NAME / "games__2024_05_01.zip").exists()
+    with Catalog(records_dir / CATALOG_NAME) as catalog:
+        assert {entry.name for entry in catalog.games()} == set(names[2:])
+    with EventIndex(records_dir / EVENT_INDEX_NAME) as event_index:
+        assert event_index.games() == set(names[2:])
+
+
+def test_rebuild_with_archived_games(play_games: Callable[[int], Path]) -> None:
+    records_dir = play_games(3)
+    names = date_games(records_dir, [3, 2, 0])
+    apply_retention(records_dir, RetentionPolicy(), NOW)
+    assert set(Archives(records_dir).index) == set(names[:2])
+
+    with Catalog(records_dir / CATALOG_NAME) as catalog:
+        assert catalog.rebuild(records_dir) == 3
+        entries = {entry.name: entry for entry in catalog.games()}
+    assert set(entries) == set(names)
+    assert entries[names[0]].scores == {"toto": 3, "tata": 3}
+    with EventIndex(records_dir / EVENT_INDEX_NAME) as event_index:
+        assert event_index.rebuild(records_dir) == 3
+        assert event_index.update(records_dir) == 0
+        assert event_index.games(kind="kingdom") == set(names)
+
+
+def test_delete_by_count_and_size(play_games: Callable[[int], Path]) -> None:
+    records_dir = play_games(5)
+    names = date_games(records_dir, [4, 3.5, 3, 2, 0])
+    apply_retention(records_dir, RetentionPolicy(), NOW)
+
+    policy = RetentionPolicy(max_games=4)
+    assert apply_retention(records_dir, policy, NOW).deleted == names[:1]
+    archives = Archives(records_dir)
+    assert set(archives.index) == set(names[1:4])
+    assert load_game(records_dir, names[2]).scores == {"toto": 3, "tata": 3}
+
+    sizes = archives.sizes() | {names[4]: (records_dir / names[4]).stat().st_size}
+    max_size = sizes[names[4]] + sizes[names[3]] + sizes[names[2]] // 2
+    policy = RetentionPolicy(max_size=max_size)
+    assert apply_retention(records_dir, policy, NOW).deleted == names[1:3]
+    assert set(Archives(records_dir).index) == {names[3]}
+
+
+def test_main(
+    capsys: pytest.CaptureFixture[str],
+    play_games: Callable[[int], Path],
+) -> None:
+    records_dir = play_games(3)
+    now = datetime.datetime.now(tz=datetime.UTC)
+    names = date_games(records_dir, [5, 2, 0], now)
+    retention.main(
+        [
+            "apply",
+            "--records-dir",
+            str(records_dir),
+            "--delete-after-days",
+            "3",
+        ],
+    )
+    assert "2 games archived, 1 deleted" in capsys.readouterr().out
+    retention.main(["read", names[1], "--records-dir", str(records_dir)])
+    assert '"scores":{"toto":3,"tata":3}' in capsys.readouterr().out
+    with pytest.raises(SystemExit):
+        retention.main(["read", "--records-dir", str(records_dir)])
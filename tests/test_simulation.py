@@ -0,0 +1,93 @@
+import json
+import random
+from pathlib import Path
+
+import pytest
+
+from dopynion import simulation
+from dopynion.cards import CardName
+from dopynion.game import Game
+from dopynion.player import Player
+from dopynion.record import NullRecord
+from dopynion.simulation import (
+    BigMoneyBot,
+    Bot,
+    GameResult,
+    RandomBot,
+    SimulationStats,
+    load_bot,
+    play_game,
+    simulate,
+)
+
+
+class CheaterBot(Bot):
+    def play_turn(self, player: Player) -> None:  # noqa: PLR6301
+        player.buy(CardName.PROVINCE)
+
+
+def test_load_bot() -> None:
+    assert isinstance(load_bot("big_money"), BigMoneyBot)
+    assert type(load_bot("tests.test_simulation:CheaterBot")).__name__ == "CheaterBot"
+    with pytest.raises(ValueError, match="unknown bot"):
+        load_bot("cheater")
+    with pytest.raises(TypeError, match="not a Bot"):
+        load_bot("dopynion.player:Player")
+
+
+def test_play_game() -> None:
+    result = play_game(["big_money", "random"], seed=3)
+    assert result == play_game(["big_money", "random"], seed=3)
+    assert result.winners == [0]
+    assert result.scores[0] > result.scores[1]
+    assert 0 < result.nb_turns < simulation.MAX_NB_TURNS
+
+    result = play_game(["tests.test_simulation:CheaterBot", "big_money"], seed=3)
+    assert result.scores[0] == -10000
+    assert result.winners == [1]
+
+
+def test_random_bot_own_generator() -> None:
+    game = Game(NullRecord(), seed=3)
+    for name in ("toto", "tata"):
+        game.add_player(Player(name))
+    game.start()
+    player = game.players[0]
+    player.start_turn()
+    state = game.random.getstate()
+    bot = RandomBot()
+    bot.random.seed("3 0")
+    bot.play_turn(player)
+    assert game.random.getstate() == state
+    assert bot.random.getstate() != random.Random("3 0").getstate()  # noqa: S311
+
+
+def test_simulation_stats() -> None:
+    stats = SimulationStats(["a", "b"])
+    stats.add(GameResult(1, [10, 5], [0], 20))
+    stats.add(GameResult(2, [8, 8], [0, 1], 30))
+    assert stats.nb_games == 2
+    assert stats.mean_length == 25
+    assert stats.bots[0] == ("a", 1.5, 0.75, 9)
+    assert stats.bots[1] == ("b", 0.5, 0.25, 6.5)
+    assert "75.0% wins" in str(stats)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_simulate(tmp_path: Path, workers: int) -> None:
+    output = tmp_path / "results.jsonl"
+    bot_names = ["big_money", "random"]
+    stats = simulate(bot_names, 6, seed=1, workers=workers, output=output)
+    assert stats.nb_games == 6
+    assert stats.bots[0].win_rate > 0.5
+    lines = output.read_text(encoding="utf-8").splitlines()
+    results = sorted(GameResult(**json.loads(line)) for line in lines)
+    assert results == sorted(play_game(bot_names, result.seed) for result in results)
+    assert stats.nb_wins == simulate(bot_names, 6, seed=1, workers=1).nb_wins
+
+
+def test_main(capsys: pytest.CaptureFixture[str]) -> None:
+    simulation.main(["big_money", "big_money", "--games", "3", "--workers", "1"])
+    out = capsys.readouterr().out
+    assert out.startswith("3 games")
+    assert "1 big_money" in out